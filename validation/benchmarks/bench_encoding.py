@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Benchmark the fast path of checkencoding.raise_if_mismatched_encodings.
+
+Times the fast (sniffing) path against the chardet-only path on generated
+multi-MB XML files and confirms that both paths give the same verdict.
+
+Run from the validation directory:
+$ python benchmarks/bench_encoding.py
+
+Copyright Ian Vermes 2019
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), "../validator")
+sys.path.insert(0, os.path.abspath(PACKAGE_DIR))
+
+from helpers.checkencoding import raise_if_mismatched_encodings  # noqa: E402
+import exceptions  # noqa: E402
+
+DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+RECORD = ("<document docid=\"jjs-{i}\"><article><title><italic>Title {i}"
+          "{extra}</italic></title></article></document>\n")
+SIZE_MB = 4
+REPEATS = 3
+
+
+def make_file(directory, name, extra):
+    """Write a SIZE_MB file of records and return its filename."""
+    filename = os.path.join(directory, name)
+    record_size = len(RECORD.format(i=0, extra=extra).encode("utf-8"))
+    count = (SIZE_MB << 20) // record_size
+    with open(filename, "w", encoding="utf-8") as handle:
+        handle.write(DECLARATION + "<issue>\n")
+        for i in range(count):
+            handle.write(RECORD.format(i=i, extra=extra))
+        handle.write("</issue>\n")
+    return filename
+
+
+def verdict(filename, fastpath):
+    try:
+        raise_if_mismatched_encodings(filename, fastpath=fastpath)
+    except exceptions.EncodingOperationError:
+        return "mismatch"
+    else:
+        return "match"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        files = {"ascii": make_file(directory, "ascii.xml", ""),
+                 "utf-8": make_file(directory, "utf8.xml", " café")}
+        print(f"{'file':<8}{'chardet (s)':>14}{'fast (s)':>12}"
+              f"{'speedup':>10}  verdict")
+        for name, filename in files.items():
+            timings = {}
+            verdicts = {}
+            for fastpath in (False, True):
+                timer = timeit.Timer(lambda: verdict(filename, fastpath))
+                timings[fastpath] = min(timer.repeat(REPEATS, number=1))
+                verdicts[fastpath] = verdict(filename, fastpath)
+            assert verdicts[True] == verdicts[False], name
+            speedup = timings[False] / timings[True]
+            print(f"{name:<8}{timings[False]:>14.4f}{timings[True]:>12.4f}"
+                  f"{speedup:>9.0f}x  {verdicts[True]}")
+
+
+if __name__ == '__main__':
+    main()
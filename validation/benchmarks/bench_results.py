@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Benchmark the memory held by the results of a large run.
+
+Builds the results of a generated run, one in a hundred failing its schema,
+and reports the bytes per file held by a list of ValidationResults & by a
+ResultStore, then the time to filter the store.
+
+Run from the validation directory:
+$ python benchmarks/bench_results.py
+
+Copyright Ian Vermes 2019
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), "../validator")
+sys.path.insert(0, os.path.abspath(PACKAGE_DIR))
+
+from helpers.result import ValidationResult, ResultStore  # noqa: E402
+import exceptions  # noqa: E402
+
+FILES = 200000
+FAIL_EVERY = 100
+REPEATS = 3
+
+
+def make_results():
+    for i in range(FILES):
+        filename = f"/archive/volume_{i % 50}/issue_{i}.xml"
+        exc = None
+        if i % FAIL_EVERY == 0:
+            exc = exceptions.SchemaValidationError(f"Bad {filename}")
+        yield ValidationResult(filename, exc)
+
+
+def measure(build):
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, size
+
+
+def build_store():
+    store = ResultStore()
+    store.extend(make_results())
+    return store
+
+
+def main():
+    results, list_size = measure(lambda: list(make_results()))
+    del results  # Else the store would share its interned filenames.
+    store, store_size = measure(build_store)
+    print(f"{FILES} files, 1 in {FAIL_EVERY} failing")
+    print(f"{'list':<8}{list_size / FILES:>8.0f} bytes per file")
+    print(f"{'store':<8}{store_size / FILES:>8.0f} bytes per file")
+    timing = min(timeit.repeat(lambda: store.filenames(passed_syntax=True,
+                                                       passed_schema=False),
+                               number=1, repeat=REPEATS))
+    print(f"filter failed schema: {timing * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
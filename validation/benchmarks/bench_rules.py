@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Benchmark the single-walk Rulebook against one XPath scan per rule.
+
+A generated document is checked with growing numbers of rules, each on one of
+a handful of tags. The per-rule scan evaluates ".//tag[test]" from the root
+for every rule, which is what the rules cost without the tag dispatch.
+
+Run from the validation directory:
+$ python benchmarks/bench_rules.py
+
+Copyright Ian Vermes 2019
+"""
+
+import os
+import sys
+import timeit
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), "../validator")
+sys.path.insert(0, os.path.abspath(PACKAGE_DIR))
+
+from helpers.checkrules import Rule, Rulebook, NAMESPACES  # noqa: E402
+
+from lxml import etree  # noqa: E402
+
+TAGS = ("page-range", "author", "aff", "doi", "isbn", "seqno")
+AUTHOR = ('<author affref="a{i}" id="x{i}"><ln>Smith</ln><fn>Jo</fn>'
+          '<aff affid="a{i}" id="y{i}">University</aff></author>')
+DOCUMENT = ('<document xmlns="https://www.jjs-online.net" docid="jjs-1">'
+            '<article><volume>12</volume><issue>1</issue>'
+            '<page-range><fpage>10</fpage><lpage>20</lpage></page-range>'
+            '<seqno>1</seqno><authgrp>{authors}</authgrp>'
+            '<doi>10.18647/12/JJS-2018</doi></article></document>')
+AUTHORS = 1000
+RULE_COUNTS = (2, 20, 100, 400)
+REPEATS = 5
+
+
+def make_rules(count):
+    return [Rule(f"rule-{i}", TAGS[i % len(TAGS)], "count(*) > 1000", "msg")
+            for i in range(count)]
+
+
+def per_rule_scans(rules):
+    return [etree.XPath(f".//jjs:{rule.tags[0]}[{rule.definition[2]}]",
+                        namespaces=NAMESPACES) for rule in rules]
+
+
+def main():
+    authors = "".join(AUTHOR.format(i=i) for i in range(AUTHORS))
+    root = etree.fromstring(DOCUMENT.format(authors=authors))
+    elements = sum(1 for _ in root.iter())
+    print(f"{elements} elements per document")
+    print(f"{'rules':>6}{'walk (ms)':>12}{'scans (ms)':>12}")
+    for count in RULE_COUNTS:
+        rules = make_rules(count)
+        rulebook = Rulebook(rules)
+        scans = per_rule_scans(rules)
+        walk = min(timeit.repeat(lambda: rulebook.check(root),
+                                 number=1, repeat=REPEATS))
+        scan = min(timeit.repeat(lambda: [xpath(root) for xpath in scans],
+                                 number=1, repeat=REPEATS))
+        print(f"{count:>6}{walk * 1000:>12.1f}{scan * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Benchmark streaming schema validation against the in-memory path.
+
+Validates generated bundles of document records, of growing size, with
+checkschema.validate_records and with a whole-tree parse & assertValid. Each
+run is in a fresh process so that its peak memory can be reported.
+
+Run from the validation directory:
+$ python benchmarks/bench_schema_stream.py
+
+Copyright Ian Vermes 2019
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), "../validator")
+sys.path.insert(0, os.path.abspath(PACKAGE_DIR))
+
+from helpers.settings_handler import get_settings  # noqa: E402
+from helpers import checkschema  # noqa: E402
+
+from lxml import etree  # noqa: E402
+
+RECORD = """<document xmlns="https://www.jjs-online.net" docid="jjs-{i}">
+  <article>
+    <volume>12</volume>
+    <issue>1</issue>
+    <date>Spring 2018</date>
+    <page-range><fpage>10</fpage><lpage>20</lpage></page-range>
+    <seqno>1</seqno>
+    <title><italic>A title</italic></title>
+    <authgrp>
+      <author affref="a1" id="x{i}"><ln>Smith</ln><fn>Jo</fn><aff affid="a1" id="y{i}">University</aff></author>
+    </authgrp>
+    <keyword>words</keyword>
+    <abstract>{text}</abstract>
+    <doi>10.18647/12/JJS-2018</doi>
+    <status/>
+  </article>
+</document>
+"""
+RECORD_COUNTS = (2000, 20000, 80000)
+TEXT = "Lorem ipsum dolor sit amet. " * 20
+
+
+def make_bundle(directory, count):
+    """Write a bundle of count records and return its filename."""
+    filename = os.path.join(directory, f"bundle_{count}.xml")
+    with open(filename, "w", encoding="utf-8") as handle:
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n<bundle>\n')
+        for i in range(count):
+            handle.write(RECORD.format(i=i, text=TEXT))
+        handle.write("</bundle>\n")
+    return filename
+
+
+def in_memory(filename):
+    schema = get_settings().schema
+    for record in etree.parse(filename).getroot():
+        schema.assertValid(record)
+
+
+def streaming(filename):
+    checkschema.validate_records(filename)
+
+
+def measure(func, filename, queue):
+    get_settings().schema  # Exclude the schema compile from the timing.
+    start = time.perf_counter()
+    func(filename)
+    elapsed = time.perf_counter() - start
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, peak_kib))
+
+
+def run(func, filename):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure,
+                                      args=(func, filename, queue))
+    process.start()
+    outcome = queue.get()
+    process.join()
+    return outcome
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'records':>8}{'MiB':>7}{'tree (s)':>10}{'stream (s)':>12}"
+              f"{'tree peak':>11}{'stream peak':>13}")
+        for count in RECORD_COUNTS:
+            filename = make_bundle(directory, count)
+            size = os.path.getsize(filename) / (1 << 20)
+            tree_time, tree_peak = run(in_memory, filename)
+            stream_time, stream_peak = run(streaming, filename)
+            print(f"{count:>8}{size:>7.0f}{tree_time:>10.2f}"
+                  f"{stream_time:>12.2f}{tree_peak >> 10:>8} MiB"
+                  f"{stream_peak >> 10:>10} MiB")
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,12 +12,47 @@ import unittest
 import os
 import glob
 import functools
+import pathlib
+import tempfile
 
 # To allow consistent imports of pkg modules
 tests.context.main()
 
+from helpers.enum import Mode
+from helpers.cache import hash_file
+import helpers.settings_handler as settings_handler
+
 HAS_ATTR_MESSAGE = '{} should have an attribute {}'
 
+SCHEMA_FILENAME = os.path.join(os.path.dirname(__file__), os.pardir,
+                               "schema", "article_candidate_schema.xsd")
+RESOURCE_DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<document xmlns="https://www.jjs-online.net" docid="jjs-{docid}">
+  <article>
+    <volume>12</volume>
+    <issue>{issue}</issue>
+    <date>Spring 2018</date>
+    <page-range><fpage>{fpage}</fpage><lpage>{lpage}</lpage></page-range>
+    <seqno>1</seqno>
+    <title><italic>A title</italic></{title}>
+    <authgrp>
+      <author affref="a1" id="x1"><ln>Smith</ln><fn>Jo</fn><aff affid="a1" id="y1">University</aff></author>
+    </authgrp>
+    <keyword>words</keyword>
+    <abstract>text</abstract>
+    <doi>10.18647/12/JJS-2018</doi>
+    <status/>
+  </article>
+</document>
+"""
+# Each file breaks one stage, named as ValidationTestCase.find_xml expects.
+RESOURCES = {
+    "valid/valid.xml": {},
+    "schema/illegal_schema_issue.xml": {"issue": 3},
+    "syntax/illegal_syntax_tag.xml": {"title": "titl"},
+    "rules/illegal_rules_pages.xml": {"fpage": 20, "lpage": 10},
+}
+
 
 class ExtendedTestCase(unittest.TestCase):
 
@@ -78,6 +113,58 @@ class ExtendedTestCase(unittest.TestCase):
             return
 
 
+class ResourceTestCase(ExtendedTestCase):
+    """A TestCase with XML resource files written to a temporary directory.
+
+    The settings of the class are a snapshot whose schema is the article
+    candidate schema, see helpers.settings_handler.install_snapshot, hence
+    worker processes share them. The files are those of RESOURCES.
+
+    Class attrs:
+        resource_dir(pathlib.Path)
+
+    Class methods:
+        make_resource: Write a document, see RESOURCE_DOCUMENT.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._tempdir = tempfile.TemporaryDirectory()
+        cls.resource_dir = pathlib.Path(cls._tempdir.name)
+        for name, fields in RESOURCES.items():
+            cls.make_resource(cls.resource_dir / name, **fields)
+        # A Settings singleton made by another test would be used instead.
+        cls._settings = settings_handler.Singleton._instances.pop(
+            settings_handler.Settings, None)
+        cls._snapshot = settings_handler._SNAPSHOT
+        snapshot = settings_handler.SettingsSnapshot(
+            Mode.TEST, str(cls.resource_dir / "log.txt"),
+            str(cls.resource_dir / "cache.sqlite"), SCHEMA_FILENAME,
+            hash_file(SCHEMA_FILENAME), (), (), None)
+        settings_handler.install_snapshot(snapshot)
+
+    @classmethod
+    def tearDownClass(cls):
+        settings_handler._SNAPSHOT = cls._snapshot
+        if cls._settings is not None:
+            settings_handler.Singleton._instances[
+                settings_handler.Settings] = cls._settings
+        cls._tempdir.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def make_resource(cls, filename, docid=1, issue=1, fpage=10, lpage=20,
+                      title="title"):
+        filename = pathlib.Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        document = RESOURCE_DOCUMENT.format(docid=docid, issue=issue,
+                                            fpage=fpage, lpage=lpage,
+                                            title=title)
+        filename.write_text(document, encoding="utf-8")
+        return filename
+
+
 class CommandLineTestCase(ExtendedTestCase):
 
     @classmethod
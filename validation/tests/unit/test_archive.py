@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of the validation of XML within zip & tar archives.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from helpers.archive import (ArchiveMember, UnreadableArchive, is_archive,
+                             iter_members, expand_archives)
+from helpers.enum import Passing
+from helpers.checksyntax import validate_syntax
+from helpers.cache import hash_file
+from helpers.result import ValidationResult
+from helpers.argparser import NextGenArgParse
+from checker import Checker
+
+import io
+import os
+import pathlib
+import pickle
+import tarfile
+import tempfile
+import zipfile
+
+VALID = b'<?xml version="1.0" encoding="UTF-8"?>\n<root><child/></root>\n'
+INVALID = b'<?xml version="1.0" encoding="UTF-8"?>\n<root><child></root>\n'
+MEMBERS = {"issue_1/valid.xml": VALID,
+           "issue_1/invalid.xml": INVALID,
+           "issue_1/readme.txt": b"Not XML",
+           "drafts/old.xml": VALID}
+
+
+def write_zip(filename):
+    with zipfile.ZipFile(filename, "w") as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+
+
+def write_tar(filename):
+    with tarfile.open(filename, "w:gz") as archive:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+class TestIterMembers(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.archives = {
+            "zip": os.path.join(self.tempdir.name, "delivery.zip"),
+            "tar.gz": os.path.join(self.tempdir.name, "delivery.tar.gz")}
+        write_zip(self.archives["zip"])
+        write_tar(self.archives["tar.gz"])
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_is_archive(self):
+        names = {"a.zip": True, "a.tar.gz": True, "a.TGZ": True,
+                 "a.tar": True, "a.xml": False, "a.gz": False}
+        for name, expected in names.items():
+            with self.subTest(name=name):
+                self.assertIs(is_archive(pathlib.Path(name)), expected)
+
+    def test_yields_xml_members_with_bytes(self):
+        for kind, filename in self.archives.items():
+            with self.subTest(kind=kind):
+                members = list(iter_members(filename))
+
+                self.assertEqual([m.name for m in members],
+                                 ["issue_1/valid.xml", "issue_1/invalid.xml",
+                                  "drafts/old.xml"])
+                self.assertEqual([m.data for m in members],
+                                 [VALID, INVALID, VALID])
+                self.assertEqual(str(members[0]),
+                                 f"{filename}/issue_1/valid.xml")
+
+    def test_include_and_exclude(self):
+        for kind, filename in self.archives.items():
+            with self.subTest(kind=kind):
+                members = iter_members(filename, include=["*.txt", "*.xml"],
+                                       exclude=["drafts/*", "invalid.xml"])
+
+                self.assertEqual([m.name for m in members],
+                                 ["issue_1/valid.xml", "issue_1/readme.txt"])
+
+    def test_expand_archives_keeps_other_filenames(self):
+        other = os.path.join(self.tempdir.name, "single.xml")
+
+        found = list(expand_archives([other, self.archives["zip"]]))
+
+        self.assertEqual(found[0], other)
+        self.assertTrue(all(isinstance(m, ArchiveMember) for m in found[1:]))
+        self.assertEqual(len(found), 4)
+
+    def test_member_is_picklable(self):
+        member = next(iter_members(self.archives["zip"]))
+
+        clone = pickle.loads(pickle.dumps(member))
+
+        self.assertEqual((clone.archive, clone.name, clone.data),
+                         (member.archive, member.name, member.data))
+
+
+class TestUnreadableArchives(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.other = os.path.join(self.tempdir.name, "other.xml")
+        with open(self.other, "wb") as handle:
+            handle.write(VALID)
+        self.archives = {}
+        for suffix, write in (("zip", write_zip), ("tar.gz", write_tar)):
+            filename = os.path.join(self.tempdir.name, f"truncated.{suffix}")
+            write(filename)
+            with open(filename, "r+b") as handle:
+                handle.truncate(os.path.getsize(filename) // 2)
+            self.archives[suffix] = filename
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_unreadable_archive_is_yielded_in_place_of_an_error(self):
+        for suffix, archive in self.archives.items():
+            with self.subTest(suffix=suffix):
+                items = list(expand_archives([archive, self.other]))
+
+                self.assertIsInstance(items[-2], UnreadableArchive)
+                self.assertEqual(str(items[-2]), archive)
+                self.assertEqual(items[-1], self.other)
+
+    def test_checker_fails_the_archive_and_carries_on(self):
+        filenames = [self.archives["zip"], self.archives["tar.gz"],
+                     self.other]
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                results = list(Checker().feed_many(
+                    expand_archives(filenames), jobs=jobs))
+                failed = [r for r in results if r.enum is Passing.FAILS]
+
+                self.assertEqual([r.filename for r in failed],
+                                 filenames[:2])
+                for result in failed:
+                    self.assertIsNotNone(result.exception.__cause__)
+                self.assertEqual(results[-1].filename, self.other)
+                self.assertTrue(results[-1].passed_syntax)
+
+
+class TestValidateMembers(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tempdir.name, "delivery.tar.gz")
+        write_tar(self.archive)
+        self.members = {m.name: m for m in iter_members(self.archive)}
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_validate_syntax_of_members(self):
+        for name, expected in (("issue_1/valid.xml", True),
+                               ("issue_1/invalid.xml", False)):
+            with self.subTest(name=name):
+                result = validate_syntax(self.members[name])
+
+                self.assertIs(bool(result), expected)
+                self.assertEqual(result.filename,
+                                 f"{self.archive}/{name}")
+
+    def test_result_filename_is_a_string(self):
+        result = ValidationResult(self.members["issue_1/valid.xml"], None)
+
+        self.assertIs(type(result.filename), str)
+
+    def test_checker_reports_member_path(self):
+        member = self.members["issue_1/invalid.xml"]
+
+        result = Checker().feed_in(member)
+
+        self.assertFalse(result.passed_syntax)
+        self.assertEqual(result.filename, str(member))
+
+    def test_hash_of_member_is_hash_of_its_bytes(self):
+        filename = os.path.join(self.tempdir.name, "valid.xml")
+        with open(filename, "wb") as handle:
+            handle.write(VALID)
+
+        self.assertEqual(hash_file(self.members["issue_1/valid.xml"]),
+                         hash_file(filename))
+
+    def test_argparser_accepts_archives(self):
+        path = NextGenArgParse.is_valid_path(self.archive)
+
+        self.assertEqual(path, pathlib.Path(self.archive))
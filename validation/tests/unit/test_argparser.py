@@ -16,8 +16,10 @@ import shlex
 import os
 import glob
 import pathlib
+import sys
 
 from contextlib import redirect_stderr
+from unittest import mock
 
 
 class CommandLineClassMethods(CommandLineTestCase):
@@ -183,5 +185,137 @@ class CommandLineArgumentTest(CommandLineTestCase):
         self.assertIsInstance(args.testmode, bool)
         self.assertFalse(args.testmode)
 
+    def test_parse_optional_argument_STREAM(self):
+        params = {"": False, "--stream": True}
+        for option, expected in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertIs(args.stream, expected)
+
+    def test_parse_optional_argument_REPORT(self):
+        params = {"": None, "--report out.ndjson": pathlib.Path("out.ndjson")}
+        for option, expected in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertEqual(args.report, expected)
+
+    def test_parse_optional_argument_SUMMARY(self):
+        params = {"": None, "--summary out.ndjson": pathlib.Path("out.ndjson")}
+        for option, expected in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertEqual(args.summary, expected)
+
+    def test_parse_optional_arguments_INCLUDE_EXCLUDE(self):
+        params = {"": (None, []),
+                  "--include *.xml --include *.jats":
+                      (["*.xml", "*.jats"], []),
+                  "--exclude drafts --exclude *_old.xml":
+                      (None, ["drafts", "*_old.xml"])}
+        for option, (include, exclude) in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertEqual(args.include, include)
+                self.assertEqual(args.exclude, exclude)
+
+    def test_parse_optional_argument_NO_RECURSE(self):
+        params = {"": True, "--no-recurse": False}
+        for option, expected in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertIs(args.recurse, expected)
+
+    def test_parse_optional_arguments_WATCH_POLL(self):
+        params = {"": (False, False), "--watch": (True, False),
+                  "--watch --poll": (True, True)}
+        for option, (watch, poll) in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertIs(args.watch, watch)
+                self.assertIs(args.poll, poll)
+
+    def test_parse_optional_arguments_JOURNAL_RESUME(self):
+        params = {"": (None, False),
+                  "--journal run.ndjson": (pathlib.Path("run.ndjson"), False),
+                  "--journal run.ndjson --resume":
+                      (pathlib.Path("run.ndjson"), True)}
+        for option, (journal, resume) in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertEqual(args.journal, journal)
+                self.assertIs(args.resume, resume)
+
+    def test_parse_optional_argument_JOBS(self):
+        params = {"": 1, "-j 4": 4, "--jobs 32": 32}
+        for option, expected in params.items():
+            with self.subTest(option=option):
+                cmd = "{} {}".format(shlex.quote(self.dir_valid), option)
+                cmd = shlex.split(cmd)
+
+                args = self.parser.parse_args(cmd)
+                self.assertEqual(args.jobs, expected)
+
+    def test_parse_optional_argument_JOBS_rejects_bad_values(self):
+        exit_code = 2
+        for value in ("0", "-1", "many"):
+            with self.subTest(value=value):
+                cmd = "{} --jobs {}".format(shlex.quote(self.dir_valid), value)
+                cmd = shlex.split(cmd)
+
+                with redirect_stderr(self.stderr_bypass):
+                    with self.assertRaises(SystemExit) as context:
+                        self.parser.parse_args(cmd)
+
+                self.assertEqual(context.exception.code, exit_code)
+
+
+class CommandLineGetArgs(CommandLineTestCase):
+
+    def get_args(self, *argv, search_dirs=True):
+        with mock.patch.object(sys, "argv", ["core.py", *argv]):
+            return NextGenArgParse().get_args(search_dirs=search_dirs)
+
+    def test_xmls_are_the_paths_given(self):
+        for search_dirs in (True, False):
+            with self.subTest(search_dirs=search_dirs):
+                args = self.get_args(self.dir_valid, search_dirs=search_dirs)
+
+                self.assertEqual(args.xmls, [pathlib.Path(self.dir_valid)])
+
+    def test_files_are_found_within_directories(self):
+        expected = glob.glob(os.path.join(self.dir_valid, "*.xml"))
+        self.assertGreater(len(expected), 0, msg="Precondition!")
+
+        args = self.get_args(self.dir_valid)
+
+        self.assertCountEqual(map(str, args.files), expected)
+
+    def test_files_are_not_found_without_search_dirs(self):
+        args = self.get_args(self.dir_valid, search_dirs=False)
+
+        self.assertFalse(hasattr(args, "files"))
+
+
 if __name__ == '__main__':
     unittest.main()
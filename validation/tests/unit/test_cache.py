@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of the persistent validation result cache.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from helpers.cache import ResultCache, hash_file, get_fingerprint
+from helpers.result import ValidationResult
+from helpers.enum import Passing
+from helpers.corpus import DocumentKeys
+import exceptions
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+
+class TestResultCache(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache_filename = os.path.join(self.tempdir.name, "cache.sqlite")
+        self.xml = os.path.join(self.tempdir.name, "doc.xml")
+        self.schema = os.path.join(self.tempdir.name, "schema.xsd")
+        for filename in (self.xml, self.schema):
+            with open(filename, "w") as handle:
+                handle.write("<root/>")
+        self.fingerprint = get_fingerprint(self.schema)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_failing_result(self):
+        cause = ValueError("Element 'root': No matching global declaration.")
+        try:
+            raise exceptions.SchemaValidationError() from cause
+        except exceptions.SchemaValidationError as exc:
+            return ValidationResult(self.xml, exc)
+
+    def test_digest_follows_file_content(self):
+        digest = hash_file(self.xml)
+
+        with open(self.xml, "a") as handle:
+            handle.write("\n")
+
+        self.assertNotEqual(digest, hash_file(self.xml))
+
+    def test_get_without_entry_is_None(self):
+        with ResultCache(self.cache_filename, self.fingerprint) as cache:
+            digest = cache.digest(self.xml)
+
+            self.assertIsNone(cache.get(self.xml, digest))
+
+    def test_put_then_get_round_trip(self):
+        results = {"passing": ValidationResult(self.xml, None),
+                   "failing": self.make_failing_result()}
+        for condition, result in results.items():
+            with self.subTest(condition=condition):
+                with ResultCache(self.cache_filename, self.fingerprint) as cache:
+                    digest = cache.digest(self.xml)
+                    cache.put(digest, result)
+
+                # Reopen to prove the entry is persistent.
+                with ResultCache(self.cache_filename, self.fingerprint) as cache:
+                    cached = cache.get(self.xml, digest)
+
+                self.assertIsInstance(cached, ValidationResult)
+                self.assertEqual(result.enum, cached.enum)
+                self.assertEqual(self.xml, cached.filename)
+
+        cause = cached.exception.__cause__
+        self.assertIsInstance(cached.exception, exceptions.SchemaValidationError)
+        self.assertIsInstance(cause, exceptions.DetachedCause)
+        self.assertEqual("ValueError", cause.name)
+
+    def test_put_then_get_keeps_cause_code_and_path(self):
+        cause = exceptions.DetachedCause("Element 'volume': Bad value.",
+                                         "DocumentInvalid", 2, 0,
+                                         code="SCHEMAV_CVC_DATATYPE_VALID_1_2_1",
+                                         path="/*/volume")
+        try:
+            raise exceptions.SchemaValidationError() from cause
+        except exceptions.SchemaValidationError as exc:
+            result = ValidationResult(self.xml, exc)
+
+        with ResultCache(self.cache_filename, self.fingerprint) as cache:
+            digest = cache.digest(self.xml)
+            cache.put(digest, result)
+            cached = cache.get(self.xml, digest).exception.__cause__
+
+        self.assertEqual(cached.code, cause.code)
+        self.assertEqual(cached.path, cause.path)
+
+    def test_get_names_the_file_looked_up(self):
+        copy = os.path.join(self.tempdir.name, "copy.xml")
+        with open(copy, "w") as handle:
+            handle.write("<root/>")
+        cause = ValueError("Premature end of data, line 1, column 8 "
+                           f"({os.path.basename(self.xml)}, line 1)")
+        try:
+            raise exceptions.ValidationError(f"Cannot read {self.xml}") \
+                from cause
+        except exceptions.ValidationError as exc:
+            result = ValidationResult(self.xml, exc)
+
+        with ResultCache(self.cache_filename, self.fingerprint) as cache:
+            cache.put(cache.digest(self.xml), result)
+            cached = cache.get(copy, cache.digest(copy))
+
+        self.assertEqual(f"Cannot read {copy}", str(cached.exception))
+        self.assertEqual("Premature end of data, line 1, column 8 "
+                         "(copy.xml, line 1)",
+                         str(cached.exception.__cause__))
+
+    def test_put_then_get_keys_round_trip(self):
+        keys = [DocumentKeys("jjs-1", "10.18647/12/JJS-2018", "12", "1", "1",
+                             "10", "20", 2)]
+        result = ValidationResult(self.xml, None)
+
+        with ResultCache(self.cache_filename, self.fingerprint) as cache:
+            digest = cache.digest(self.xml)
+            cache.put(digest, result)
+            # Test1 - no keys were stored
+            self.assertIsNone(cache.get_keys(digest))
+
+            cache.put(digest, result, keys=keys)
+            # Test2 - keys come back as DocumentKeys
+            self.assertEqual(cache.get_keys(digest), keys)
+
+    def test_outdated_table_is_replaced(self):
+        connection = sqlite3.connect(self.cache_filename)
+        with connection:
+            connection.execute("CREATE TABLE results (digest TEXT)")
+        connection.close()
+
+        with ResultCache(self.cache_filename, self.fingerprint) as cache:
+            digest = cache.digest(self.xml)
+            cache.put(digest, ValidationResult(self.xml, None))
+
+            self.assertIsNotNone(cache.get(self.xml, digest))
+
+    def test_new_fingerprint_invalidates_entries(self):
+        with ResultCache(self.cache_filename, self.fingerprint) as cache:
+            digest = cache.digest(self.xml)
+            cache.put(digest, ValidationResult(self.xml, None))
+
+        with open(self.schema, "a") as handle:
+            handle.write("<!-- schema change -->")
+        fingerprint = get_fingerprint(self.schema)
+
+        self.assertNotEqual(self.fingerprint, fingerprint)
+        with ResultCache(self.cache_filename, fingerprint) as cache:
+            self.assertIsNone(cache.get(self.xml, digest))
+        with ResultCache(self.cache_filename, self.fingerprint) as cache:
+            self.assertIsNone(cache.get(self.xml, digest))
+
+    def test_fingerprint_includes_extra_values(self):
+        rules_v1 = get_fingerprint(self.schema, extra=["rules-1"])
+        rules_v2 = get_fingerprint(self.schema, extra=["rules-2"])
+
+        self.assertNotEqual(rules_v1, rules_v2)
+        self.assertNotEqual(self.fingerprint, rules_v1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,21 +5,31 @@
 Copyright Ian Vermes 2019
 """
 
-from tests.base_testcases import ExtendedTestCase
-from checker import Checker
+from tests.base_testcases import ResourceTestCase
+from checker import Checker, get_run_fingerprint
+from helpers.checkrules import validate_rules
 from helpers.checkschema import validate_schema
 from helpers.checksyntax import validate_syntax
+from helpers.checkencoding import validate_encoding
 from helpers.result import ValidationResult
+from helpers.enum import Passing
+from helpers.cache import ResultCache
+from helpers.corpus import CorpusIndex, extract_file_keys
 import exceptions
 
+from unittest import mock
 import functools
+import multiprocessing
 import pathlib
 import os
+import shutil
+import tempfile
 
-class TestChecker(ExtendedTestCase):
+class TestChecker(ResourceTestCase):
 
     @classmethod
     def setUpClass(cls):
+        super().setUpClass()
         cls.resources = cls.get_resource_files()
         cls.Checker = functools.partial(Checker)
 
@@ -38,10 +48,11 @@ class TestChecker(ExtendedTestCase):
         self.assertIsInstance(values, tuple)
 
         # Test3 - correct member count
-        self.assertEqual(len(values), 2)
+        self.assertEqual(len(values), 4)
 
         # Test4 - correct member identities
-        expected = [validate_schema, validate_syntax]
+        expected = [validate_rules, validate_schema, validate_syntax,
+                    validate_encoding]
         for func in expected:
             self.assertIn(func, values)
 
@@ -80,16 +91,256 @@ class TestChecker(ExtendedTestCase):
                 with self.assertRaises(expected_exception) as _:
                     method(input)
 
+    def test_method_FEED_IN_parses_file_once(self):
+        checker = self.Checker()
+        input_file = self.resources[True][0]
+
+        with mock.patch("helpers.checkschema.parse_xml") as reparse:
+            result = checker.feed_in(input_file)
+
+        # Test1 - the schema stage used the tree from the syntax stage
+        reparse.assert_not_called()
+
+        # Test2 - the pipeline still reached a verdict
+        self.assertIsInstance(result, ValidationResult)
+        self.assertTrue(result)
+
+    def test_method_FEED_IN_stream_mode_keys_records_as_validated(self):
+        input_files = self.resources[True] + self.resources[False]
+        for filename in input_files:
+            with self.subTest(filename=filename.name):
+                index = CorpusIndex()
+                expected = self.Checker(index=index)._feed(filename, True)
+                streaming_checker = self.Checker(stream=True, index=index)
+
+                with mock.patch("checker.extract_file_keys",
+                                wraps=extract_file_keys) as reparse:
+                    result, keys = streaming_checker._feed(filename, True)
+
+                # Test1 - only a file failing its schema is parsed again
+                self.assertEqual(reparse.called,
+                                 result.passed_syntax
+                                 and not result.passed_schema)
+
+                # Test2 - the keys match those of the tree
+                self.assertEqual(keys, expected[1])
+
+    def test_method_FEED_IN_reads_file_once(self):
+        checker = self.Checker(stream=True)
+        input_file = self.resources[True][0]
+
+        with mock.patch("helpers.source.open", create=True,
+                        wraps=open) as spy:
+            result = checker.feed_in(input_file)
+
+        # Test1 - every stage, parsing or not, shared one read of the file
+        spy.assert_called_once()
+        self.assertTrue(result)
+
+    def test_method_FEED_IN_fails_mismatched_encoding_at_encoding_stage(self):
+        checker = self.Checker()
+        data = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<root>caf\xe9</root>\n').encode("latin-1")
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "mismatched.xml")
+            with open(filename, "wb") as handle:
+                handle.write(data)
+            for source in (filename, data):
+                with self.subTest(source=type(source).__name__):
+                    if isinstance(source, bytes):
+                        result = checker.validate_bytes(source)
+                    else:
+                        result = checker.feed_in(source)
+
+                    self.assertIs(result.enum, Passing.ENCODING)
+                    self.assertIsInstance(result.exception,
+                                          exceptions.EncodingValidationError)
+
+    def test_method_FEED_MANY(self):
+        method_name = "feed_many"
+        checker = self.Checker()
+        input_files = self.resources[True] + self.resources[False]
+        expected = [checker.feed_in(f) for f in input_files]
+
+        # Test1
+        self.assertHasAttr(checker, method_name)
+
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                results = checker.feed_many(input_files, jobs=jobs)
+
+                # Test2 - results stream back lazily
+                self.assertNotIsInstance(results, (list, tuple))
+
+                # Test3 - results keep the input order and verdicts
+                results = list(results)
+                self.assertEqual(len(expected), len(results))
+                for exp, res in zip(expected, results):
+                    self.assertIsInstance(res, ValidationResult)
+                    self.assertEqual(str(exp.filename), str(res.filename))
+                    self.assertEqual(exp.enum, res.enum)
+
+        # Test4 - a bad job count is refused
+        with self.assertRaises(ValueError):
+            list(checker.feed_many(input_files, jobs=0))
+
+    def test_method_FEED_MANY_fails_files_not_found(self):
+        valid_xml = self.resources[True][0]
+        input_files = [valid_xml, pathlib.Path("foobar.xml"), valid_xml]
+
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                results = list(self.Checker().feed_many(input_files,
+                                                        jobs=jobs))
+
+                # Test1 - the run goes on past the missing file
+                self.assertEqual([bool(r) for r in results],
+                                 [True, False, True])
+
+                # Test2 - the missing file fails, caused by its absence
+                cause = results[1].exception.__cause__
+                self.assertEqual(results[1].filename, "foobar.xml")
+                self.assertIs(results[1].enum, Passing.FAILS)
+                self.assertIn("foobar.xml", str(cause))
+
+    def test_method_FEED_MANY_bounds_the_files_taken_ahead(self):
+        jobs, chunksize = 2, 1
+        taken = []
+
+        def filenames():
+            for _ in range(50):
+                taken.append(None)
+                yield self.resources[True][0]
+
+        results = self.Checker().feed_many(filenames(), jobs=jobs,
+                                           chunksize=chunksize)
+        try:
+            next(results)
+            ahead = len(taken)
+        finally:
+            results.close()
+
+        self.assertLessEqual(ahead, 2 * jobs * chunksize + 1)
+
+    def test_method_FEED_MANY_spawns_its_workers(self):
+        # Forking while e.g. an ErrorLogger thread holds a lock is unsafe.
+        with mock.patch("multiprocessing.get_context",
+                        wraps=multiprocessing.get_context) as get_context:
+            results = list(self.Checker().feed_many(self.resources[True],
+                                                    jobs=2))
+
+        get_context.assert_called_once_with("spawn")
+        self.assertEqual(len(results), len(self.resources[True]))
+
+    def test_method_FEED_IN_stream_mode_agrees(self):
+        input_files = self.resources[True] + self.resources[False]
+        checker = self.Checker()
+        streaming_checker = self.Checker(stream=True)
+
+        for filename in input_files:
+            with self.subTest(filename=filename.name):
+                expected = checker.feed_in(filename)
+                result = streaming_checker.feed_in(filename)
+
+                self.assertEqual(expected.enum, result.enum)
+                self.assertEqual(type(expected.exception),
+                                 type(result.exception))
+
+    def test_method_VALIDATE_BYTES_and_STREAM_agree(self):
+        input_files = self.resources[True] + self.resources[False]
+        checker = self.Checker()
+
+        for filename in input_files:
+            with self.subTest(filename=filename.name):
+                with open(filename, "rb") as handle:
+                    data = handle.read()
+                expected = checker.feed_in(filename)
+
+                # Test1 - bytes, and a memoryview of them
+                for buffer in (data, memoryview(data)):
+                    result = checker.validate_bytes(buffer, name="queued")
+                    self.assertEqual(expected.enum, result.enum)
+                    self.assertEqual("queued", result.filename)
+
+                # Test2 - a stream is named after its file
+                with open(filename, "rb") as handle:
+                    result = checker.validate_stream(handle)
+                self.assertEqual(expected.enum, result.enum)
+                self.assertEqual(str(filename), result.filename)
+
+    def test_method_FEED_IN_reuses_cached_results(self):
+        input_files = self.resources[True][0], self.resources[False][0]
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache_filename = os.path.join(tempdir, "cache.sqlite")
+            with ResultCache(cache_filename, "fingerprint") as cache:
+                checker = self.Checker(cache=cache)
+                expected = [checker.feed_in(f) for f in input_files]
+
+                with mock.patch.object(checker, "_validate") as validate:
+                    results = [checker.feed_in(f) for f in input_files]
+
+        # Test1 - the second pass never validated
+        validate.assert_not_called()
+
+        # Test2 - cached verdicts match the originals
+        for exp, res in zip(expected, results):
+            self.assertEqual(exp.enum, res.enum)
+            self.assertEqual(type(exp.exception), type(res.exception))
+
+    def test_method_FEED_MANY_indexes_keys_across_documents(self):
+        valid_xml = self.resources[True][0]
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            duplicate = os.path.join(tempdir, "duplicate.xml")
+            shutil.copyfile(valid_xml, duplicate)
+            input_files = [valid_xml, duplicate]
+            cache_filename = os.path.join(tempdir, "cache.sqlite")
+
+            for jobs, cached in ((1, False), (2, False), (1, True), (2, True)):
+                with self.subTest(jobs=jobs, cached=cached):
+                    cache = ResultCache(cache_filename, "fp") if cached else None
+                    index = CorpusIndex()
+                    checker = self.Checker(cache=cache, index=index)
+
+                    list(checker.feed_many(input_files, jobs=jobs))
+                    if cache is not None:
+                        cache.close()
+
+                    # Test1 - both copies share each key, cached or not
+                    expected = {str(valid_xml), duplicate}
+                    collisions = list(index.collisions())
+                    self.assertGreater(len(collisions), 0)
+                    for rule, key, locations in collisions:
+                        self.assertEqual({f for f, _ in locations}, expected)
+
+                    # Test2 - a failing result per copy
+                    results = index.results()
+                    self.assertEqual({r.filename for r in results}, expected)
+
+    def test_run_fingerprint_depends_on_stream_mode(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            schema = os.path.join(tempdir, "schema.xsd")
+            with open(schema, "w") as handle:
+                handle.write("<schema/>")
+            settings = mock.Mock()
+            settings.schema_registry.filenames = [schema]
+
+            in_memory = get_run_fingerprint(settings)
+            streamed = get_run_fingerprint(settings, stream=True)
+
+            self.assertNotEqual(in_memory, streamed)
+            self.assertEqual(in_memory, get_run_fingerprint(settings))
+
     @classmethod
     def get_resource_files(cls):
         glob_pattern = "*.xml"
-        directories = {True: ["tests/resources/valid"],
-                       False: ["tests/resources/schema", "tests/resources/syntax"]
-        }
+        directories = {True: ["valid"], False: ["schema", "syntax"]}
         files = {}
         for validity, dir_list in directories.items():
             for directory in dir_list:
-                path = pathlib.Path(directory)
+                path = cls.resource_dir / directory
                 if not path.exists():
                     raise NotADirectoryError("Precondition " + str(path))
                 else:
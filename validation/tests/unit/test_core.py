@@ -6,9 +6,13 @@
 Copyright Ian Vermes 2018
 """
 from tests.base_testcases import ExtendedTestCase
+from helpers.enum import Passing
 import core
 import exceptions
 
+from unittest import mock
+import contextlib
+import io
 import unittest
 import os
 
@@ -47,5 +51,48 @@ class TestGlobals(ExtendedTestCase):
                         msg=f"path:{repr(path)} does not lead to a file.")
 
 
+class TestWatch(ExtendedTestCase):
+
+    def watch(self, batches, feed_in):
+        # Watch the batches of filenames, returning the results emitted.
+        watcher = mock.Mock(include=("*.xml", ), exclude=())
+        watcher.__iter__ = mock.Mock(return_value=iter(batches))
+        checker = mock.Mock()
+        checker.feed_in.side_effect = feed_in
+        emitted = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            core._watch(checker, watcher,
+                        lambda result, verbose: emitted.append(result), None)
+        watcher.close.assert_called_once_with()
+        return emitted
+
+    def test_unreadable_file_fails_and_the_watch_goes_on(self):
+        passing = mock.Mock(filename="b.xml", enum=Passing.PASSING)
+        feed_in = {"a.xml": PermissionError(13, "Permission denied"),
+                   "b.xml": passing}.get
+
+        def raise_or_return(filename):
+            outcome = feed_in(filename)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        emitted = self.watch([["a.xml"], ["b.xml"]], raise_or_return)
+
+        self.assertEqual(len(emitted), 2)
+        self.assertEqual(emitted[0].filename, "a.xml")
+        self.assertIs(emitted[0].enum, Passing.FAILS)
+        self.assertIsInstance(emitted[0].exception.__cause__, PermissionError)
+        self.assertIs(emitted[1], passing)
+
+    def test_removed_file_is_skipped(self):
+        errors = [exceptions.FileNotFound("a.xml"),
+                  FileNotFoundError(2, "No such file or directory")]
+
+        emitted = self.watch([["a.xml", "b.xml"]], errors)
+
+        self.assertEqual(emitted, [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of the checks of keys across the documents of a run.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from helpers.corpus import (CorpusIndex, DocumentKeys, extract_keys,
+                            extract_file_keys)
+from helpers.enum import Passing
+from helpers.result import ValidationResult
+import exceptions
+
+from lxml import etree
+
+import os
+import tempfile
+import unittest
+
+DOCUMENT = """<document xmlns="https://www.jjs-online.net" docid="jjs-{seqno}">
+  <article>
+    <volume>12</volume>
+    <issue>1</issue>
+    <seqno>{seqno}</seqno>
+    <doi>{doi}</doi>
+  </article>
+</document>"""
+
+
+def make_keys(doi, seqno, volume="12", issue="1", fpage=None, lpage=None,
+              lineno=1):
+    return DocumentKeys(f"jjs-{seqno}", doi, volume, issue, seqno, fpage,
+                        lpage, lineno)
+
+
+class TestExtractKeys(ExtendedTestCase):
+
+    def test_keys_of_a_document(self):
+        xml = DOCUMENT.format(seqno="3", doi="10.18647/12/JJS-2018")
+        root = etree.fromstring(xml)
+
+        keys = extract_keys(root)
+
+        expected = [make_keys("10.18647/12/JJS-2018", "3")]
+        self.assertEqual(keys, expected)
+
+    def test_keys_of_a_bundle(self):
+        records = [DOCUMENT.format(seqno=str(i), doi=f"10.18647/12/JJS-20{i}")
+                   for i in range(10, 13)]
+        xml = "<bundle>" + "".join(records) + "</bundle>"
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "bundle.xml")
+            with open(filename, "w") as handle:
+                handle.write(xml)
+
+            keys = extract_keys(etree.parse(filename).getroot())
+            streamed_keys = extract_file_keys(filename)
+
+        self.assertEqual([k.seqno for k in keys], ["10", "11", "12"])
+        self.assertEqual(keys, streamed_keys)
+
+    def test_keys_include_the_page_range(self):
+        xml = DOCUMENT.format(seqno="3", doi="10.18647/12/JJS-2018")
+        xml = xml.replace("<seqno>", "<page-range><fpage>5</fpage>"
+                                     "<lpage>9</lpage></page-range><seqno>")
+        root = etree.fromstring(xml)
+
+        keys, = extract_keys(root)
+
+        self.assertEqual((keys.fpage, keys.lpage), ("5", "9"))
+
+    def test_missing_keys_are_None(self):
+        root = etree.fromstring('<document docid="jjs-1"/>')
+
+        keys, = extract_keys(root)
+
+        self.assertIsNone(keys.doi)
+        self.assertIsNone(keys.seqno)
+
+
+class TestCorpusIndex(ExtendedTestCase):
+
+    def setUp(self):
+        self.index = CorpusIndex()
+
+    def test_unique_keys_do_not_collide(self):
+        for i in range(100):
+            self.index.add(f"{i}.xml", [make_keys(f"doi-{i}", str(i))])
+
+        self.assertEqual(list(self.index.collisions()), [])
+        self.assertEqual(self.index.results(), [])
+
+    def test_shared_doi_collides(self):
+        self.index.add("a.xml", [make_keys("doi-1", "1", lineno=2)])
+        self.index.add("b.xml", [make_keys("doi-2", "2")])
+        self.index.add("c.xml", [make_keys("doi-1", "3", lineno=5)])
+
+        collisions = list(self.index.collisions())
+
+        expected = [("unique-doi", "doi-1", [("a.xml", 2), ("c.xml", 5)])]
+        self.assertEqual(collisions, expected)
+
+    def test_seqno_is_unique_within_volume_and_issue(self):
+        self.index.add("a.xml", [make_keys("doi-1", "1")])
+        self.index.add("b.xml", [make_keys("doi-2", "1", issue="2")])
+        self.index.add("c.xml", [make_keys("doi-3", "1", volume="13")])
+        self.index.add("d.xml", [make_keys("doi-4", "1")])
+
+        collisions = list(self.index.collisions())
+
+        expected = [("unique-seqno", ("12", "1", "1"),
+                     [("a.xml", 1), ("d.xml", 1)])]
+        self.assertEqual(collisions, expected)
+
+    def add_pages(self, page_ranges, issue="1"):
+        for i, (fpage, lpage) in enumerate(page_ranges):
+            keys = make_keys(f"doi-{issue}-{i}", f"{issue}{i}", issue=issue,
+                             fpage=str(fpage), lpage=str(lpage))
+            self.index.add(f"{issue}-{i}.xml", [keys])
+
+    def get_overlapping_files(self):
+        return [(earlier[1][0], later[1][0])
+                for _, earlier, later in self.index.overlaps()]
+
+    def test_adjoining_page_ranges_do_not_overlap(self):
+        self.add_pages([(21, 30), (1, 10), (10, 20), (31, 31), (31, 40)])
+
+        self.assertEqual(self.get_overlapping_files(), [])
+
+    def test_overlapping_page_ranges(self):
+        # Added out of order, the sweep sorts by fpage.
+        self.add_pages([(15, 25), (1, 20), (30, 40), (22, 28)])
+
+        overlapping = self.get_overlapping_files()
+
+        # 15-25 & 22-28 both overlap 1-20, which reaches furthest until
+        # 15-25 reaches further for 22-28.
+        expected = [("1-1.xml", "1-0.xml"), ("1-0.xml", "1-3.xml")]
+        self.assertEqual(overlapping, expected)
+
+    def test_page_ranges_are_grouped_by_issue(self):
+        self.add_pages([(1, 20)], issue="1")
+        self.add_pages([(10, 30)], issue="2")
+
+        self.assertEqual(self.get_overlapping_files(), [])
+
+    def test_overlap_results_fail_both_files(self):
+        self.add_pages([(1, 20), (15, 25), (30, 40)])
+
+        results = self.index.results()
+
+        self.assertEqual([r.filename for r in results],
+                         ["1-0.xml", "1-1.xml"])
+        for result in results:
+            with self.subTest(filename=result.filename):
+                self.assertIn("page-range-overlap", str(result.exception))
+
+    def test_results_fail_each_colliding_file(self):
+        self.index.add("a.xml", [make_keys("doi-1", "1")])
+        self.index.add("b.xml", [make_keys("doi-1", "1")])
+        self.index.add("c.xml", [make_keys("doi-3", "3")])
+
+        results = self.index.results()
+
+        self.assertEqual([r.filename for r in results], ["a.xml", "b.xml"])
+        for result in results:
+            with self.subTest(filename=result.filename):
+                self.assertIsInstance(result, ValidationResult)
+                self.assertEqual(result.enum, Passing.RULES)
+                self.assertIn("unique-doi", str(result.exception))
+                self.assertIn("unique-seqno", str(result.exception))
+                self.assertIsInstance(result.exception.__cause__,
+                                      exceptions.RuleViolation)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of the validation daemon and its client.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from checker import Checker
+from daemon import ValidationDaemon, _handle, _raise_exit
+import client
+import exceptions
+
+from unittest import mock
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+
+INVALID = b'<?xml version="1.0" encoding="UTF-8"?>\n<root><child></root>\n'
+
+
+class TestDaemonRequests(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.invalid = os.path.join(self.tempdir.name, "invalid.xml")
+        with open(self.invalid, "wb") as handle:
+            handle.write(INVALID)
+        self.missing = os.path.join(self.tempdir.name, "missing.xml")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def ask(self, message):
+        server, client_end = socket.socketpair()
+        with server, client_end:
+            client_end.sendall(message + b"\n")
+            _handle(server, Checker())
+            server.shutdown(socket.SHUT_WR)
+            with client_end.makefile("rb") as stream:
+                return [json.loads(line) for line in stream]
+
+    def test_one_record_per_file(self):
+        message = json.dumps({"paths": [self.invalid, self.missing]})
+
+        records = self.ask(message.encode())
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["filename"], self.invalid)
+        self.assertEqual(records[0]["passing"], "SYNTAX")
+        self.assertEqual(records[1]["filename"], self.missing)
+        self.assertIn("error", records[1])
+
+    def test_directories_are_searched(self):
+        message = json.dumps({"paths": [self.tempdir.name]})
+
+        records = self.ask(message.encode())
+
+        self.assertEqual([r["filename"] for r in records], [self.invalid])
+
+    def test_malformed_request_is_answered_with_an_error(self):
+        for message in (b"not json", b'{"paths": "a.xml"}', b"{}"):
+            with self.subTest(message=message):
+                records = self.ask(message)
+
+                self.assertEqual(len(records), 1)
+                self.assertIn("error", records[0])
+
+    def test_client_reports_an_absent_daemon(self):
+        socket_path = os.path.join(self.tempdir.name, "absent.sock")
+
+        with self.assertRaises(exceptions.DaemonError):
+            list(client.request([self.invalid], socket_path=socket_path))
+        with mock.patch("sys.stderr"):
+            status = client.main(["--socket", socket_path, self.invalid])
+        self.assertEqual(status, 2)
+
+
+class TestValidationDaemon(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tempdir.name, "daemon.sock")
+        self.invalid = os.path.join(self.tempdir.name, "invalid.xml")
+        with open(self.invalid, "wb") as handle:
+            handle.write(INVALID)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def start_daemon(self, workers=2):
+        daemon = ValidationDaemon(socket_path=self.socket_path,
+                                  workers=workers, cache=False)
+        # The settings are not needed by files failing on syntax.
+        with mock.patch.object(ValidationDaemon, "_setup", return_value=None):
+            context = multiprocessing.get_context("fork")
+            process = context.Process(target=daemon.serve_forever)
+            process.start()
+        deadline = time.monotonic() + 10
+        while not os.path.exists(self.socket_path):
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                self.fail("The daemon did not start listening.")
+            time.sleep(0.01)
+        return process
+
+    def test_serves_requests_until_terminated(self):
+        process = self.start_daemon()
+        try:
+            for _ in range(3):
+                records = list(client.request([self.invalid],
+                                              socket_path=self.socket_path,
+                                              timeout=10))
+
+                self.assertEqual([r["passing"] for r in records], ["SYNTAX"])
+        finally:
+            process.terminate()
+            process.join(10)
+
+        self.assertEqual(process.exitcode, 0)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_second_daemon_on_a_socket_is_refused(self):
+        process = self.start_daemon(workers=1)
+        try:
+            daemon = ValidationDaemon(socket_path=self.socket_path)
+
+            with self.assertRaises(exceptions.DaemonError):
+                daemon._bind()
+        finally:
+            process.terminate()
+            process.join(10)
+
+    def test_worker_is_stopped_if_the_daemon_is_stopped_as_it_forks(self):
+        daemon = ValidationDaemon(socket_path=self.socket_path, workers=1,
+                                  cache=False)
+        fork = os.fork
+        forked = []
+
+        def fork_then_terminate():
+            pid = fork()
+            if pid:
+                forked.append(pid)
+                os.kill(os.getpid(), signal.SIGTERM)
+            return pid
+
+        def serve():
+            daemon._listener = daemon._bind()
+            signal.signal(signal.SIGTERM, _raise_exit)
+            try:
+                with mock.patch("os.fork", fork_then_terminate):
+                    daemon._spawn(None)
+            except SystemExit:
+                pass
+            orphans = [pid for pid in forked if pid not in daemon._pids]
+            daemon.shutdown()
+            for pid in orphans:
+                os.kill(pid, signal.SIGKILL)
+            os._exit(1 if orphans else 0)
+
+        process = multiprocessing.get_context("fork").Process(target=serve)
+        process.start()
+        process.join(10)
+
+        self.assertEqual(process.exitcode, 0)
+
+    def test_client_main_exit_status(self):
+        process = self.start_daemon(workers=1)
+        try:
+            with mock.patch("builtins.print") as print_:
+                status = client.main(["--socket", self.socket_path,
+                                      self.invalid])
+        finally:
+            process.terminate()
+            process.join(10)
+
+        self.assertEqual(status, 1)
+        print_.assert_called_once()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of journaling validated files to resume a run.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from helpers.archive import ArchiveMember
+from helpers.journal import Journal
+from helpers.source import BytesSource
+from helpers.result import ValidationResult
+
+from unittest import mock
+import json
+import os
+import pathlib
+import tempfile
+
+
+class TestJournal(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tempdir.name)
+        self.filename = self.root / "run.ndjson"
+        self.xmls = []
+        for index in range(3):
+            xml = self.root / f"article_{index}.xml"
+            xml.write_bytes(b"<root/>")
+            self.xmls.append(xml)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def run_journal(self, filenames, fingerprint="fp", resume=False):
+        # Journal the filenames still pending, returning them.
+        with Journal(self.filename, fingerprint, resume=resume) as journal:
+            pending = list(journal.pending(filenames))
+            for filename in pending:
+                journal.record(ValidationResult(filename, None))
+        return pending
+
+    def test_resume_skips_journaled_files(self):
+        self.run_journal(self.xmls[:2])
+
+        pending = self.run_journal(self.xmls, resume=True)
+
+        self.assertEqual(pending, self.xmls[2:])
+
+    def test_without_resume_the_journal_starts_again(self):
+        self.run_journal(self.xmls)
+
+        pending = self.run_journal(self.xmls)
+
+        self.assertEqual(pending, self.xmls)
+
+    def test_other_fingerprint_is_not_skipped(self):
+        self.run_journal(self.xmls)
+
+        pending = self.run_journal(self.xmls, fingerprint="other",
+                                   resume=True)
+        resumed = self.run_journal(self.xmls, fingerprint="other",
+                                   resume=True)
+
+        self.assertEqual(pending, self.xmls)
+        self.assertEqual(resumed, [])
+
+    def test_modified_file_is_validated_again(self):
+        self.run_journal(self.xmls)
+        self.xmls[1].write_bytes(b"<root>modified</root>")
+
+        pending = self.run_journal(self.xmls, resume=True)
+
+        self.assertEqual(pending, [self.xmls[1]])
+
+    def test_file_modified_while_validated_is_validated_again(self):
+        with Journal(self.filename, "fp") as journal:
+            for filename in journal.pending(self.xmls):
+                if filename == self.xmls[1]:
+                    filename.write_bytes(b"<root>modified</root>")
+                journal.record(ValidationResult(filename, None))
+
+        pending = self.run_journal(self.xmls, resume=True)
+
+        self.assertEqual(pending, [self.xmls[1]])
+
+    def test_results_of_other_files_are_not_journaled(self):
+        with Journal(self.filename, "fp") as journal:
+            list(journal.pending(self.xmls[:1]))
+            journal.record(ValidationResult(self.xmls[1], None))
+
+        pending = self.run_journal(self.xmls, resume=True)
+
+        self.assertEqual(pending, self.xmls)
+
+    def test_line_cut_short_is_ignored(self):
+        self.run_journal(self.xmls[:1])
+        entry = {"filename": os.path.abspath(self.xmls[1])}
+        with open(self.filename, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry)[:20])
+
+        pending = self.run_journal(self.xmls, resume=True)
+        resumed = self.run_journal(self.xmls, resume=True)
+
+        self.assertEqual(pending, self.xmls[1:])
+        self.assertEqual(resumed, [])
+
+    def test_archive_members_are_journaled(self):
+        archive = self.root / "issue.zip"
+        archive.write_bytes(b"archive")
+        members = [ArchiveMember(archive, name, b"<root/>")
+                   for name in ("a.xml", "b.xml")]
+        self.run_journal(members[:1])
+
+        pending = self.run_journal(members, resume=True)
+
+        self.assertEqual([member.name for member in pending], ["b.xml"])
+
+    def test_bytes_are_not_journaled(self):
+        source = BytesSource(b"<root/>", name="upload.xml")
+        self.run_journal([source])
+
+        pending = self.run_journal([source], resume=True)
+
+        self.assertEqual(pending, [source])
+
+    def test_syncs_in_batches(self):
+        with Journal(self.filename, "fp", sync_lines=2,
+                     sync_interval=3600) as journal:
+            with mock.patch("os.fsync") as fsync:
+                for xml in journal.pending(self.xmls):
+                    journal.record(ValidationResult(xml, None))
+                batched = fsync.call_count
+                journal.close()
+
+        self.assertEqual(batched, 1)
+        self.assertEqual(fsync.call_count, 2)
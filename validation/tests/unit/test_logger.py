@@ -7,11 +7,14 @@ Copyright Ian Vermes 2018
 """
 
 from tests.base_testcases import ExtendedTestCase
+from checker import Checker
 import logger  # from validator import logger
 
 import unittest
 import os
 import queue
+import tempfile
+import threading
 
 
 class TestLoggerObject(ExtendedTestCase):
@@ -66,5 +69,121 @@ class TestLoggerObjectFunctionality(ExtendedTestCase):
         self.assertEqual(1, file_count, msg=f"Files: {os.listdir(self.log_dir)}")
 
 
+class TestLoggerListen(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.log_filename = os.path.join(self.tempdir.name, "log.txt")
+        self.error_stream = queue.Queue()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read_lines(self):
+        with open(self.log_filename) as handle:
+            return handle.read().splitlines()
+
+    def test_listen_logs_every_queued_error(self):
+        for error in ("first", "second"):
+            self.error_stream.put(error)
+        error_logger = logger.ErrorLogger(self.log_filename, self.error_stream)
+
+        error_logger.listen()
+
+        lines = self.read_lines()
+        self.assertTrue(lines[0].endswith("Errors: 2"))
+        self.assertEqual(lines[1:], ["first", "second", "* * *"])
+        self.assertTrue(self.error_stream.empty())
+
+    def test_listen_describes_failing_results(self):
+        data = b'<?xml version="1.0" encoding="UTF-8"?>\n<root><a></root>\n'
+        result = Checker().validate_bytes(data, name="upload.xml")
+        self.error_stream.put(result)
+        error_logger = logger.ErrorLogger(self.log_filename, self.error_stream)
+
+        error_logger.listen()
+
+        lines = self.read_lines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith(
+            "upload.xml    SYNTAX    SyntaxValidationError    "
+            "XMLSyntaxError: Opening and ending tag mismatch"),
+            msg=lines[1])
+        self.assertTrue(lines[1].endswith("(line 2, column 17)"),
+                        msg=lines[1])
+
+
+class TestLoggerThread(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.log_filename = os.path.join(self.tempdir.name, "log.txt")
+        self.error_stream = queue.Queue()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read_lines(self):
+        with open(self.log_filename) as handle:
+            return handle.read().splitlines()
+
+    def test_logs_errors_from_concurrent_producers(self):
+        def produce(name):
+            for i in range(100):
+                self.error_stream.put(f"{name} {i}")
+
+        with logger.ErrorLogger(self.log_filename, self.error_stream):
+            producers = [threading.Thread(target=produce, args=(name, ))
+                         for name in ("foo", "bar", "baz")]
+            for producer in producers:
+                producer.start()
+            for producer in producers:
+                producer.join()
+
+        lines = self.read_lines()
+        self.assertEqual(lines[-1], "* * *    Errors: 300")
+        self.assertEqual(len(lines[1:-1]), 300)
+        self.assertEqual([line for line in lines[1:-1] if line.startswith("foo")],
+                         [f"foo {i}" for i in range(100)])
+
+    def test_writes_batch_once_flush_size_is_reached(self):
+        error_logger = logger.ErrorLogger(self.log_filename, self.error_stream,
+                                          flush_size=1, flush_interval=3600)
+        error_logger.start()
+        try:
+            self.error_stream.put("first")
+            for _ in range(100):
+                if (os.path.isfile(self.log_filename)
+                        and "first" in self.read_lines()):
+                    break
+                threading.Event().wait(0.01)
+            self.assertIn("first", self.read_lines())
+        finally:
+            error_logger.stop()
+
+    def test_holds_errors_until_flush(self):
+        error_logger = logger.ErrorLogger(self.log_filename, self.error_stream,
+                                          flush_size=1 << 20,
+                                          flush_interval=3600)
+        error_logger.start()
+        try:
+            self.error_stream.put("first")
+            threading.Event().wait(0.05)
+            self.assertNotIn("first", self.read_lines())
+        finally:
+            error_logger.stop()
+
+        self.assertIn("first", self.read_lines())
+
+    def test_cannot_start_twice(self):
+        error_logger = logger.ErrorLogger(self.log_filename, self.error_stream)
+        error_logger.start()
+        try:
+            with self.assertRaises(RuntimeError):
+                error_logger.start()
+        finally:
+            error_logger.stop()
+
+
 if __name__ == '__main__':
     unittest.main()
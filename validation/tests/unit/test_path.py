@@ -15,6 +15,8 @@ import unittest
 import os
 import getpass
 import pathlib
+import tempfile
+from unittest import mock
 
 PathDetail = namedtuple("PathDetail", "name desc expandedname touched valid")
 
@@ -142,5 +144,78 @@ class TestExpandPath(ExtendedTestCase):
         kwargs = {"criteria_attr": "name", "exists": False, "dir_exists": False}
 
 
+class TestIterFiles(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tempdir.name)
+        names = ["a.xml", "notes.txt", "vol1/b.xml", "vol1/issue1/c.xml",
+                 "vol1/issue1/c.XML.bak", "vol2/d.xml", "drafts/e.xml"]
+        for name in names:
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def relative(self, files):
+        return sorted(path.relative_to(self.root).as_posix() for path in files)
+
+    def test_finds_xml_recursively(self):
+        files = under_consideration.iter_files([self.root])
+
+        self.assertEqual(self.relative(files),
+                         ["a.xml", "drafts/e.xml", "vol1/b.xml",
+                          "vol1/issue1/c.xml", "vol2/d.xml"])
+
+    def test_yields_paths_of_directory_before_subdirectories(self):
+        files = list(under_consideration.iter_files([self.root]))
+
+        self.assertEqual(files[0], self.root / "a.xml")
+        self.assertTrue(all(isinstance(f, pathlib.Path) for f in files))
+
+    def test_not_recursive(self):
+        files = under_consideration.iter_files([self.root], recursive=False)
+
+        self.assertEqual(self.relative(files), ["a.xml"])
+
+    def test_include_patterns(self):
+        files = under_consideration.iter_files([self.root],
+                                               include=["*.txt", "c.*"])
+
+        self.assertEqual(self.relative(files),
+                         ["notes.txt", "vol1/issue1/c.XML.bak",
+                          "vol1/issue1/c.xml"])
+
+    def test_exclude_by_name_or_relative_path(self):
+        params = {"drafts": ["a.xml", "vol1/b.xml", "vol1/issue1/c.xml",
+                             "vol2/d.xml"],
+                  "vol1/issue1": ["a.xml", "drafts/e.xml", "vol1/b.xml",
+                                  "vol2/d.xml"],
+                  "?.xml": []}
+        for pattern, expected in params.items():
+            with self.subTest(pattern=pattern):
+                files = under_consideration.iter_files([self.root],
+                                                       exclude=[pattern])
+
+                self.assertEqual(self.relative(files), expected)
+
+    def test_files_are_yielded_as_given(self):
+        path = self.root / "notes.txt"
+
+        files = list(under_consideration.iter_files([str(path)]))
+
+        self.assertEqual(files, [path])
+
+    def test_is_lazy(self):
+        scandir = mock.MagicMock(wraps=os.scandir)
+        with mock.patch("helpers.path.os.scandir", scandir):
+            files = under_consideration.iter_files([self.root])
+            next(files)
+
+            self.assertEqual(scandir.call_count, 1)
+
+
 if __name__ == '__main__':
     unittest.main()
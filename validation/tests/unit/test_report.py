@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of the NDJSON report of validation results.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from report import (NDJSONReport, ErrorSummary, result_to_record,
+                    error_signature)
+from helpers.result import ValidationResult
+import exceptions
+
+from lxml import etree
+
+import json
+import os
+import pickle
+import tempfile
+
+SCHEMA = b"""<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    targetNamespace="https://www.jjs-online.net" elementFormDefault="qualified">
+  <xs:element name="document"><xs:complexType><xs:sequence>
+    <xs:element name="volume" type="xs:int" maxOccurs="unbounded"/>
+    <xs:element name="issue" type="xs:int" minOccurs="0"/>
+  </xs:sequence></xs:complexType></xs:element>
+</xs:schema>"""
+DOCUMENT = """<document xmlns="https://www.jjs-online.net">
+<volume>1</volume><volume>{volume}</volume><issue>{issue}</issue></document>"""
+
+
+def make_syntax_failure(filename):
+    try:
+        etree.fromstring(b"<root>\n<unclosed></root>")
+    except etree.XMLSyntaxError as cause:
+        try:
+            raise exceptions.SyntaxValidationError(str(cause)) from cause
+        except exceptions.SyntaxValidationError as exc:
+            return ValidationResult(filename, exc)
+
+
+def make_schema_failure(filename, volume="1", issue="1"):
+    schema = etree.XMLSchema(etree.fromstring(SCHEMA))
+    document = etree.fromstring(DOCUMENT.format(volume=volume, issue=issue))
+    try:
+        schema.assertValid(document)
+    except etree.DocumentInvalid as cause:
+        try:
+            raise exceptions.SchemaValidationError() from cause
+        except exceptions.SchemaValidationError as exc:
+            return ValidationResult(filename, exc)
+
+
+class TestResultToRecord(ExtendedTestCase):
+
+    def test_passing_result_has_no_exception(self):
+        record = result_to_record(ValidationResult("good.xml", None))
+
+        self.assertEqual(record, {"filename": "good.xml",
+                                  "passing": "PASSING",
+                                  "exception": None,
+                                  "message": None,
+                                  "cause": None,
+                                  "line": None,
+                                  "column": None})
+
+    def test_failing_result_has_lxml_position(self):
+        record = result_to_record(make_syntax_failure("bad.xml"))
+
+        self.assertEqual(record["passing"], "SYNTAX")
+        self.assertEqual(record["exception"], "SyntaxValidationError")
+        self.assertEqual(record["cause"], "XMLSyntaxError")
+        self.assertEqual(record["line"], 2)
+        self.assertIsInstance(record["column"], int)
+
+    def test_detached_cause_keeps_original_name(self):
+        cause = exceptions.DetachedCause("Bad element", "DocumentInvalid",
+                                         lineno=7, column=3)
+        try:
+            raise exceptions.SchemaValidationError("Bad element") from cause
+        except exceptions.SchemaValidationError as exc:
+            result = ValidationResult("bad.xml", exc)
+
+        record = result_to_record(result)
+
+        self.assertEqual(record["cause"], "DocumentInvalid")
+        self.assertEqual((record["line"], record["column"]), (7, 3))
+
+    def test_rule_violation_has_line(self):
+        cause = exceptions.RuleViolation("Bad pages", "page-range-order", 12)
+        try:
+            raise exceptions.RuleValidationError("Bad pages") from cause
+        except exceptions.RuleValidationError as exc:
+            result = ValidationResult("bad.xml", exc)
+
+        record = result_to_record(result)
+
+        self.assertEqual(record["passing"], "RULES")
+        self.assertEqual(record["line"], 12)
+
+
+class TestNDJSONReport(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "report.ndjson")
+        self.results = [ValidationResult("good.xml", None),
+                        make_syntax_failure("bad.xml")]
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read_records(self):
+        with open(self.filename, encoding="utf-8") as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_writes_one_record_per_line(self):
+        with NDJSONReport(self.filename) as report:
+            for result in self.results:
+                report.write(result)
+
+        records = self.read_records()
+        self.assertEqual([r["filename"] for r in records],
+                         ["good.xml", "bad.xml"])
+
+    def test_holds_records_until_flush_lines(self):
+        report = NDJSONReport(self.filename, flush_lines=2,
+                              flush_interval=3600)
+        try:
+            report.write(self.results[0])
+            self.assertEqual(self.read_records(), [])
+
+            report.write(self.results[1])
+            self.assertEqual(len(self.read_records()), 2)
+        finally:
+            report.close()
+
+    def test_flushes_pending_records_after_interval(self):
+        report = NDJSONReport(self.filename, flush_lines=1000,
+                              flush_interval=0)
+        try:
+            report.write(self.results[0])
+
+            self.assertEqual(len(self.read_records()), 1)
+        finally:
+            report.close()
+
+    def test_append_keeps_earlier_records(self):
+        for _ in range(2):
+            with NDJSONReport(self.filename, append=True) as report:
+                report.write(self.results[0])
+
+        self.assertEqual(len(self.read_records()), 2)
+
+    def test_close_is_idempotent(self):
+        report = NDJSONReport(self.filename)
+        report.write(self.results[0])
+        report.close()
+        report.close()
+
+        self.assertEqual(len(self.read_records()), 1)
+
+
+class TestErrorSignature(ExtendedTestCase):
+
+    def test_passing_result_has_no_signature(self):
+        self.assertIsNone(error_signature(ValidationResult("good.xml", None)))
+
+    def test_schema_errors_differing_by_value_share_signature(self):
+        first = make_schema_failure("a.xml", volume="x")
+        second = make_schema_failure("b.xml", volume="y")
+
+        self.assertEqual(error_signature(first), error_signature(second))
+
+    def test_schema_signature_has_code_and_element_path(self):
+        result = make_schema_failure("a.xml", volume="x")
+
+        name, code, path = error_signature(result)
+
+        self.assertEqual(name, "SchemaValidationError")
+        self.assertEqual(code, "SCHEMAV_CVC_DATATYPE_VALID_1_2_1")
+        self.assertEqual(path, "/*/volume")
+
+    def test_schema_errors_on_other_elements_differ(self):
+        volume = make_schema_failure("a.xml", volume="x")
+        issue = make_schema_failure("b.xml", issue="x")
+
+        self.assertNotEqual(error_signature(volume), error_signature(issue))
+
+    def test_signature_survives_pickling(self):
+        result = make_schema_failure("a.xml", volume="x")
+
+        clone = pickle.loads(pickle.dumps(result))
+
+        self.assertEqual(error_signature(result), error_signature(clone))
+
+    def test_syntax_signature_is_lxml_error_type(self):
+        result = make_syntax_failure("bad.xml")
+
+        self.assertEqual(error_signature(result),
+                         ("SyntaxValidationError", "ERR_TAG_NAME_MISMATCH",
+                          None))
+
+    def test_signature_without_cause_ignores_values(self):
+        results = [ValidationResult(
+            name, exceptions.EncodingValidationError(
+                f"File '{name}' declares 'utf-{n}' at line {n}."))
+            for name, n in (("a.xml", 8), ("b.xml", 16))]
+
+        self.assertEqual(*[error_signature(r) for r in results])
+
+
+class TestErrorSummary(ExtendedTestCase):
+
+    def setUp(self):
+        self.results = [make_schema_failure(f"{i}.xml", volume=f"x{i}")
+                        for i in range(5)]
+        self.results.append(make_syntax_failure("bad.xml"))
+        self.results.append(ValidationResult("good.xml", None))
+
+    def test_groups_failures_by_signature_with_counts(self):
+        summary = ErrorSummary()
+        summary.extend(self.results)
+
+        groups = summary.groups()
+
+        self.assertEqual(len(summary), 2)
+        self.assertEqual([g["count"] for g in groups], [5, 1])
+        self.assertEqual(groups[0]["files"], [f"{i}.xml" for i in range(5)])
+        self.assertEqual(groups[0]["path"], "/*/volume")
+        self.assertIn("'x0'", groups[0]["cause_message"])
+
+    def test_files_are_capped_not_count(self):
+        summary = ErrorSummary(max_files=2)
+        summary.extend(self.results)
+
+        group = summary.groups()[0]
+
+        self.assertEqual(group["count"], 5)
+        self.assertEqual(len(group["files"]), 2)
+
+    def test_write_one_line_per_group(self):
+        summary = ErrorSummary()
+        summary.extend(self.results)
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "summary.ndjson")
+
+            summary.write(filename)
+
+            with open(filename, encoding="utf-8") as handle:
+                groups = [json.loads(line) for line in handle]
+        self.assertEqual(groups, summary.groups())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of the HTTP validation service.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from service import ValidationService
+
+from unittest import mock
+import concurrent.futures
+import http.client
+import json
+import os
+import signal
+import threading
+
+INVALID = b'<?xml version="1.0" encoding="UTF-8"?>\n<root><child></root>\n'
+
+
+class TestValidationService(ExtendedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = ValidationService(port=0, workers=1, queue_size=0,
+                                        max_body=1024)
+        # The settings are not needed by documents failing on syntax.
+        with mock.patch.object(ValidationService, "_setup",
+                               return_value=None):
+            cls.host, cls.port = cls.service.start()
+        cls.thread = threading.Thread(target=cls.service.serve_forever,
+                                      daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.shutdown()
+        cls.thread.join(10)
+
+    def request(self, method, path, body=None):
+        connection = http.client.HTTPConnection(self.host, self.port,
+                                                timeout=30)
+        try:
+            connection.request(method, path, body=body)
+            response = connection.getresponse()
+            return response, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def test_post_returns_the_result_as_json(self):
+        response, record = self.request("POST", "/validate?name=upload.xml",
+                                        body=INVALID)
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(record["filename"], "upload.xml")
+        self.assertEqual(record["passing"], "SYNTAX")
+        self.assertEqual(record["exception"], "SyntaxValidationError")
+
+    def test_full_service_refuses_at_once(self):
+        # Take the one slot, as a document being validated would.
+        self.assertTrue(self.service._slots.acquire(blocking=False))
+        try:
+            response, record = self.request("POST", "/validate",
+                                            body=INVALID)
+        finally:
+            self.service._slots.release()
+
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.getheader("Retry-After"), "1")
+        self.assertIn("error", record)
+
+    def test_failed_validation_is_a_server_error(self):
+        future = concurrent.futures.Future()
+        future.set_exception(RuntimeError("worker failed"))
+        with mock.patch.object(self.service, "submit", return_value=future):
+            response, record = self.request("POST", "/validate",
+                                            body=INVALID)
+
+        self.assertEqual(response.status, 500)
+        self.assertIn("RuntimeError: worker failed", record["error"])
+
+    def test_pool_is_replaced_once_a_worker_dies(self):
+        broken = self.service._pool
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+        # The pool breaks once it sees the worker is gone.
+        with self.assertRaises(concurrent.futures.process.BrokenProcessPool):
+            broken.submit(os.getpid).result(timeout=30)
+
+        response, record = self.request("POST", "/validate", body=INVALID)
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(record["passing"], "SYNTAX")
+        self.assertIsNot(self.service._pool, broken)
+
+    def test_oversized_body_is_refused(self):
+        response, _ = self.request("POST", "/validate", body=b" " * 2048)
+
+        self.assertEqual(response.status, 413)
+
+    def test_health_reports_capacity(self):
+        response, body = self.request("GET", "/health")
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, {"status": "ok", "in_flight": 0,
+                                "capacity": 1})
+
+    def test_unknown_path_is_not_found(self):
+        for method in ("GET", "POST"):
+            with self.subTest(method=method):
+                response, _ = self.request(method, "/other", body=b"")
+
+                self.assertEqual(response.status, 404)
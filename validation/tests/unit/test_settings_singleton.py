@@ -13,7 +13,13 @@ import exceptions  # from validator import exceptions
 from lxml import etree
 
 import unittest
+import unittest.mock
+import multiprocessing
 import os
+import pickle
+import shutil
+import tempfile
+import threading
 import time
 import pathlib
 from io import StringIO
@@ -150,7 +156,9 @@ class TestSettingsDataSingleton(INIandSettingsTestCase):
         cls.inifile = cls.find_and_get_path(
             INI_PARTIAL_NAME, PACKAGE_DIRECTORY)
 
-        cls.expected_attributes = ("log_filename", "mode", "schema")
+        cls.expected_attributes = ("log_filename", "cache_filename", "mode",
+                                   "schema", "schema_filename",
+                                   "schema_registry")
 
     def tearDown(self):
         # Reset the singleton so that singletons created between tests are unique.
@@ -320,5 +328,253 @@ class TestSettingsDataSingleton_Mode_Kwarg(INIandSettingsTestCase):
         self.assertEqual(set_length, len(results), msg=msg)
 
 
+class TestSchemaLoading(INIandSettingsTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.inifile = cls.find_and_get_path(
+            INI_PARTIAL_NAME, PACKAGE_DIRECTORY)
+        cls.schema_file = os.path.join(PACKAGE_DIRECTORY, "schema",
+                                       "article_candidate_schema.xsd")
+
+    def setUp(self):
+        settings_handler._compile_schema.cache_clear()
+
+    def tearDown(self):
+        settings_handler._compile_schema.cache_clear()
+        metaclass = settings_handler.Singleton
+        class_ = settings_handler.Settings
+        try:
+            metaclass.reset_singleton(class_)
+        except KeyError:
+            pass  # A test may not have created a singleton.
+
+    def test_load_schema_compiles_once_across_threads(self):
+        results = []
+
+        def load():
+            results.append(settings_handler.load_schema(self.schema_file))
+
+        threads = [threading.Thread(target=load) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        cache_info = settings_handler._compile_schema.cache_info()
+
+        # Test1
+        self.assertEqual(cache_info.misses, 1)
+        # Test2
+        self.assertIsInstance(results[0], etree.XMLSchema)
+        self.assertTrue(all(schema is results[0] for schema in results))
+
+    def test_settings_defers_compilation_to_first_access(self):
+        with unittest.mock.patch.object(settings_handler,
+                                        "_compile_schema") as compile_:
+            singleton = settings_handler.Settings(self.inifile)
+
+            # Test1
+            compile_.assert_not_called()
+
+            _ = singleton.schema
+
+        # Test2
+        compile_.assert_called_once_with(str(singleton.schema_filename))
+
+    def test_preload_schema_compiles_on_a_thread(self):
+        with unittest.mock.patch.object(settings_handler,
+                                        "_compile_schema") as compile_:
+            thread = settings_handler.preload_schema(self.inifile)
+            thread.join()
+
+        self.assertIsInstance(thread, threading.Thread)
+        compile_.assert_called_once()
+
+    def test_preload_schema_failure_is_raised_on_use(self):
+        error = etree.XMLSchemaParseError("Broken schema")
+        with unittest.mock.patch.object(settings_handler, "_compile_schema",
+                                        return_value=error):
+            with unittest.mock.patch("threading.excepthook") as excepthook:
+                settings_handler.preload_schema(self.inifile).join()
+            singleton = settings_handler.Settings(self.inifile)
+
+            with self.assertRaises(exceptions.SchemaSetupFailed):
+                singleton.schema
+        excepthook.assert_not_called()
+
+    def test_preload_schema_raises_other_errors_on_its_thread(self):
+        with unittest.mock.patch.object(settings_handler, "_compile_schema",
+                                        side_effect=TypeError("A bug")):
+            with unittest.mock.patch("threading.excepthook") as excepthook:
+                settings_handler.preload_schema(self.inifile).join()
+
+        excepthook.assert_called_once()
+        args = excepthook.call_args[0][0]
+        self.assertIsInstance(args.exc_value, TypeError)
+
+
+def _get_worker_settings():
+    settings = settings_handler.get_settings()
+    return type(settings).__name__, isinstance(settings.schema,
+                                               etree.XMLSchema)
+
+
+class TestSettingsSnapshot(INIandSettingsTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.inifile = cls.find_and_get_path(
+            INI_PARTIAL_NAME, PACKAGE_DIRECTORY)
+
+    def setUp(self):
+        self.settings = settings_handler.Settings(self.inifile)
+        self.snapshot = settings_handler.SettingsSnapshot.from_settings(
+            self.settings)
+
+    def tearDown(self):
+        settings_handler._SNAPSHOT = None
+        metaclass = settings_handler.Singleton
+        class_ = settings_handler.Settings
+        try:
+            metaclass.reset_singleton(class_)
+        except KeyError:
+            pass  # A test may not have created a singleton.
+
+    def test_snapshot_has_the_values_of_settings(self):
+        snapshot = self.snapshot
+
+        self.assertIs(snapshot.mode, self.settings.mode)
+        self.assertEqual(snapshot.log_filename, str(self.settings.log_filename))
+        self.assertEqual(snapshot.schema_filename,
+                         str(self.settings.schema_filename))
+        self.assertEqual(snapshot.schema_registry.filenames,
+                         self.settings.schema_registry.filenames)
+        self.assertIs(snapshot.schema, self.settings.schema)
+
+    def test_snapshot_is_immutable_and_picklable(self):
+        clone = pickle.loads(pickle.dumps(self.snapshot))
+
+        self.assertEqual(clone, self.snapshot)
+        with self.assertRaises(AttributeError):
+            self.snapshot.mode = None
+
+    def test_installed_snapshot_stands_in_for_settings(self):
+        settings_handler.Singleton.reset_singleton(settings_handler.Settings)
+
+        settings_handler.install_snapshot(self.snapshot)
+
+        self.assertIs(settings_handler.get_settings(), self.snapshot)
+        self.assertIs(settings_handler.current_snapshot(), self.snapshot)
+
+    def test_install_refuses_a_changed_schema(self):
+        snapshot = self.snapshot._replace(schema_digest="0" * 40)
+
+        with self.assertRaises(exceptions.SchemaSetupFailed):
+            settings_handler.install_snapshot(snapshot)
+
+    def test_spawned_worker_rebuilds_schema_from_snapshot(self):
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1, settings_handler.install_snapshot,
+                          (self.snapshot, )) as pool:
+            name, has_schema = pool.apply(_get_worker_settings)
+
+        self.assertEqual(name, "SettingsSnapshot")
+        self.assertTrue(has_schema)
+
+
+class TestSchemaRegistry(ExtendedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.schema_file = os.path.join(PACKAGE_DIRECTORY, "schema",
+                                       "article_candidate_schema.xsd")
+        cls.namespace = "https://www.jjs-online.net"
+
+    def setUp(self):
+        settings_handler._compile_schema.cache_clear()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.other_schema_file = os.path.join(self.tempdir.name, "other.xsd")
+        shutil.copyfile(self.schema_file, self.other_schema_file)
+        self.registry = settings_handler.SchemaRegistry(
+            self.schema_file,
+            versions={"1.0": self.schema_file, "2.0": self.other_schema_file},
+            namespaces={"urn:other": "2.0"},
+            attribute="version")
+
+    def tearDown(self):
+        settings_handler._compile_schema.cache_clear()
+        self.tempdir.cleanup()
+
+    def make_root(self, namespace=None, version=None):
+        tag = "document" if namespace is None else f"{{{namespace}}}document"
+        root = etree.Element(tag)
+        if version is not None:
+            root.set("version", version)
+        return root
+
+    def test_version_of_document(self):
+        cases = {"attribute": (self.make_root(self.namespace, "1.0"), "1.0"),
+                 "namespace": (self.make_root("urn:other"), "2.0"),
+                 "attribute wins": (self.make_root("urn:other", "1.0"), "1.0"),
+                 "unversioned": (self.make_root(self.namespace), None)}
+
+        for case, (root, expected) in cases.items():
+            with self.subTest(case=case):
+                self.assertEqual(self.registry.version_of(root), expected)
+                tree = etree.ElementTree(root)
+                self.assertEqual(self.registry.version_of(tree), expected)
+
+    def test_schema_for_routes_to_the_version_schema(self):
+        expected = settings_handler.load_schema(self.other_schema_file)
+
+        schema = self.registry.schema_for(self.make_root("urn:other"))
+
+        self.assertIs(schema, expected)
+
+    def test_unversioned_documents_get_the_default_schema(self):
+        expected = settings_handler.load_schema(self.schema_file)
+
+        schema = self.registry.schema_for(self.make_root(self.namespace))
+
+        self.assertIs(schema, expected)
+
+    def test_each_version_is_compiled_once(self):
+        roots = [self.make_root(version=version)
+                 for version in ("1.0", "2.0") * 10]
+
+        for root in roots:
+            self.registry.schema_for(root)
+        cache_info = settings_handler._compile_schema.cache_info()
+
+        # The default & version 1.0 share a file, hence two compilations.
+        self.assertEqual(cache_info.misses, 2)
+
+    def test_schema_that_fails_to_compile_is_compiled_once(self):
+        broken_schema_file = os.path.join(self.tempdir.name, "broken.xsd")
+        with open(broken_schema_file, "w") as handle:
+            handle.write("<schema/>")
+        registry = settings_handler.SchemaRegistry(broken_schema_file)
+
+        for _ in range(3):
+            with self.assertRaises(exceptions.SchemaSetupFailed) as context:
+                registry.schema_for(self.make_root())
+
+            self.assertIn("broken.xsd", str(context.exception))
+        cache_info = settings_handler._compile_schema.cache_info()
+
+        self.assertEqual(cache_info.misses, 1)
+
+    def test_unknown_version_raises_package_error(self):
+        root = self.make_root(version="9.9")
+
+        with self.assertRaises(exceptions.UnknownSchemaVersion):
+            self.registry.schema_for(root)
+
+    def test_filenames_are_unique(self):
+        expected = [self.schema_file, self.other_schema_file]
+
+        self.assertEqual(self.registry.filenames, expected)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of XML sources held in memory.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from helpers.source import (BytesSource, FileSource, read_stream,
+                            open_binary, parse_source, load_file)
+from helpers.checksyntax import validate_syntax
+from helpers.checkencoding import validate_encoding
+from helpers._check_shared import drain_xml
+from helpers.enum import Passing
+
+from lxml import etree
+
+import io
+import mmap
+import os
+import pickle
+import tempfile
+
+VALID = b'<?xml version="1.0" encoding="UTF-8"?>\n<root><child/></root>\n'
+INVALID = b'<?xml version="1.0" encoding="UTF-8"?>\n<root><child></root>\n'
+MISMATCHED = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<root>caf\xe9</root>\n').encode("latin-1")
+
+
+class TestBytesSource(ExtendedTestCase):
+
+    def test_bytes_are_shared(self):
+        source = BytesSource(VALID)
+
+        self.assertIs(source.data, VALID)
+
+    def test_memoryview_of_bytes_is_unwrapped(self):
+        source = BytesSource(memoryview(VALID))
+
+        self.assertIs(source.data, VALID)
+
+    def test_other_buffers_are_copied(self):
+        buffers = (bytearray(VALID), memoryview(VALID)[1:])
+        for buffer in buffers:
+            with self.subTest(buffer=type(buffer).__name__):
+                source = BytesSource(buffer)
+
+                self.assertIsInstance(source.data, bytes)
+                self.assertEqual(source.data, bytes(buffer))
+
+    def test_str_is_refused(self):
+        with self.assertRaises(TypeError):
+            BytesSource(VALID.decode())
+
+    def test_name(self):
+        self.assertEqual(str(BytesSource(VALID)), "<bytes>")
+        self.assertEqual(str(BytesSource(VALID, name="msg-1")), "msg-1")
+
+    def test_is_picklable(self):
+        source = BytesSource(VALID, name="msg-1")
+
+        clone = pickle.loads(pickle.dumps(source))
+
+        self.assertEqual((clone.data, clone.name), (source.data, source.name))
+
+    def test_stages_read_the_same_bytes_object(self):
+        source = BytesSource(VALID)
+
+        with open_binary(source) as handle:
+            self.assertIs(handle.read(), source.data)
+
+    def test_parse_source(self):
+        tree = parse_source(BytesSource(VALID))
+
+        self.assertIsInstance(tree, etree._ElementTree)
+        self.assertEqual(tree.getroot().tag, "root")
+
+    def test_errors_name_the_source(self):
+        source = BytesSource(INVALID, name="upload.xml")
+        parsers = {"parse_source": parse_source, "drain_xml": drain_xml}
+        for name, parse in parsers.items():
+            with self.subTest(parser=name):
+                with self.assertRaises(etree.XMLSyntaxError) as context:
+                    parse(source)
+
+                # lxml makes the name of a file object absolute.
+                filename = context.exception.filename
+                self.assertEqual(os.path.basename(filename), "upload.xml")
+                self.assertIn(f"{filename}:2:",
+                              str(context.exception.error_log))
+
+    def test_read_stream_takes_name_of_stream(self):
+        stream = io.BytesIO(VALID)
+        stream.name = "upload.xml"
+
+        source = read_stream(stream)
+
+        self.assertEqual((source.data, source.name), (VALID, "upload.xml"))
+
+
+class TestLoadFile(ExtendedTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "valid.xml")
+        with open(self.filename, "wb") as handle:
+            handle.write(VALID)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_small_file_is_read_into_bytes(self):
+        with load_file(self.filename) as source:
+            self.assertIsInstance(source, FileSource)
+            self.assertIsInstance(source.data, bytes)
+            self.assertEqual(str(source), self.filename)
+
+    def test_large_file_is_memory_mapped(self):
+        with load_file(self.filename, mmap_threshold=1) as source:
+            self.assertIsInstance(source.data, mmap.mmap)
+            with open_binary(source) as handle:
+                self.assertEqual(handle.read(), VALID)
+            tree = parse_source(source)
+
+        self.assertTrue(source.data.closed)
+        self.assertEqual(tree.getroot().tag, "root")
+        self.assertEqual(tree.docinfo.URL, self.filename)
+
+    def test_stages_agree_on_either_buffer(self):
+        params = {"valid": (VALID, Passing.PASSING, Passing.PASSING),
+                  "invalid": (INVALID, Passing.PASSING, Passing.SYNTAX),
+                  "mismatched encoding": (MISMATCHED, Passing.ENCODING,
+                                          Passing.SYNTAX)}
+        for condition, (data, encoding, syntax) in params.items():
+            with open(self.filename, "wb") as handle:
+                handle.write(data)
+            for threshold in (None, 1):
+                with self.subTest(condition=condition, threshold=threshold):
+                    with load_file(self.filename, threshold) as source:
+                        self.assertIs(validate_encoding(source).enum,
+                                      encoding)
+                        self.assertIs(validate_syntax(source).enum, syntax)
+
+    def test_is_picklable_by_filename(self):
+        with load_file(self.filename, mmap_threshold=1) as source:
+            clone = pickle.loads(pickle.dumps(source))
+        try:
+            self.assertEqual(clone.data, VALID)
+            self.assertEqual(str(clone), self.filename)
+        finally:
+            clone.close()
+
+
+class TestValidateSyntaxInMemory(ExtendedTestCase):
+
+    def test_validate_bytes(self):
+        params = {"valid": (VALID, Passing.PASSING),
+                  "invalid": (INVALID, Passing.SYNTAX),
+                  "mismatched encoding": (MISMATCHED, Passing.SYNTAX)}
+        for condition, (data, expected) in params.items():
+            with self.subTest(condition=condition):
+                result = validate_syntax.validate_bytes(data, name=condition)
+
+                self.assertIs(result.enum, expected)
+                self.assertEqual(result.filename, condition)
+
+    def test_validate_stream(self):
+        result = validate_syntax.validate_stream(io.BytesIO(INVALID))
+
+        self.assertFalse(result)
+        self.assertEqual(result.filename, "<bytes>")
@@ -6,8 +6,8 @@
 Copyright Ian Vermes 2018
 """
 
-from tests.base_testcases import XMLValidationAbstractCase
-from helpers.checkencoding import handle_encoding_errors, EncodingOperations
+from tests.base_testcases import XMLValidationAbstractCase, ExtendedTestCase
+from helpers.checkencoding import EncodingOperations
 from helpers.enum import EncodingErrorCode
 
 import exceptions
@@ -16,7 +16,9 @@ from lxml import etree
 import chardet
 
 import os
+import tempfile
 import unittest
+import unittest.mock
 from itertools import chain
 
 
@@ -204,5 +206,68 @@ class TestEncodingOperations(XMLValidationAbstractCase):
 
                 self.assertEqual(isValid, assessment_flag)
 
+
+class TestEncodingOperationsStream(ExtendedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        declaration = '<?xml version="1.0" encoding="{}"?>\n'
+        body = "<a>" + "<b>{0}</b>\n" * 5000 + "</a>"
+        cls.contents = {
+            "utf-8": (declaration.format("utf-8")
+                      + body.format("café")).encode("utf-8"),
+            "ascii": (declaration.format("utf-8")
+                      + body.format("cafe")).encode("ascii"),
+            "no linebreak": (declaration.format("utf-8").strip()
+                             + "<a>café</a>").encode("utf-8")}
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write(self, content):
+        filename = os.path.join(self.tempdir.name, "case.xml")
+        with open(filename, "wb") as handle:
+            handle.write(content)
+        return filename
+
+    def test_stream_agrees_with_whole_file_reading(self):
+        func = EncodingOperations.get_detected_and_declared_encoding
+        for condition, content in self.contents.items():
+            filename = self.write(content)
+
+            with self.subTest(condition=condition):
+                expected = func(filename, return_declaration=True)
+                actual = func(filename, return_declaration=True, stream=True)
+
+                self.assertEqual(expected, actual)
+
+    def test_stream_stops_once_confident(self):
+        filename = self.write(self.contents["utf-8"])
+        chunk_size = 1024
+        handle = open(filename, "rb")
+        spy = unittest.mock.MagicMock(wraps=handle)
+        spy.__enter__.return_value = spy
+
+        with unittest.mock.patch("helpers.checkencoding.open", create=True,
+                                 return_value=spy):
+            encoding, _ = EncodingOperations.stream_file_encoding(
+                filename, chunk_size=chunk_size)
+        handle.close()
+
+        bytes_read = spy.read.call_count * chunk_size
+        self.assertEqual("utf-8", encoding)
+        self.assertLess(bytes_read, os.path.getsize(filename))
+
+    def test_stream_zeroth_line_is_the_declaration(self):
+        filename = self.write(self.contents["utf-8"])
+
+        _, line = EncodingOperations.stream_file_encoding(filename)
+
+        self.assertEqual(line, b'<?xml version="1.0" encoding="utf-8"?>\n')
+
+
 if __name__ == '__main__':
     unittest.main()
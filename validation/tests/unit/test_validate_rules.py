@@ -7,16 +7,185 @@ Copyright Ian Vermes 2018
 """
 
 from tests.base_testcases import ExtendedTestCase
-from helpers.checkrules import validate_rules
-from helpers.enum import EncodingErrorCode
-from helpers.result import ValidationResult
+from tests.validation_testcases import ValidationTestCase
+from helpers.checkrules import (validate_rules, check_rules, Rule,
+                                ReferenceRule, Rulebook, RULEBOOK)
+from helpers.enum import EncodingErrorCode, Passing
+from helpers.result import ValidationResult, cause_position
 
 from lxml import etree
 
 import exceptions
 
+from unittest import mock
+import os
+import pathlib
+import tempfile
 import unittest
 
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<document xmlns="https://www.jjs-online.net" docid="jjs-1">
+  <article>
+    <page-range><fpage>{fpage}</fpage><lpage>{lpage}</lpage></page-range>
+    <authgrp>
+      <author affref="{affref}" id="x1"><aff affid="a1" id="y1">U</aff></author>
+    </authgrp>
+  </article>
+</document>
+"""
+# The fixtures of TestValidateRulesFunction, a passing & a failing file per
+# rule of the RULEBOOK, named as ValidationTestCase.find_xml expects.
+FIXTURES = {
+    "valid/valid_rules_page_range_order.xml":
+        {"fpage": 10, "lpage": 10, "affref": "a1"},
+    "valid/valid_rules_affref_exists.xml":
+        {"fpage": 10, "lpage": 20, "affref": "a1"},
+    "rules/illegal_rules_page_range_order.xml":
+        {"fpage": 20, "lpage": 10, "affref": "a1"},
+    "rules/illegal_rules_affref_exists.xml":
+        {"fpage": 10, "lpage": 20, "affref": "a2"},
+}
+
+
+class TestValidateRulesFunction(ValidationTestCase, ExtendedTestCase):
+    """Some test methods are written in the first parent class
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tempdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tempdir.name)
+        for name, fields in FIXTURES.items():
+            fixture = root / name
+            fixture.parent.mkdir(exist_ok=True)
+            fixture.write_text(DOCUMENT.format(**fields), encoding="utf-8")
+        resource = root / "rules"
+        func = validate_rules
+        failing_enum = Passing.RULES
+
+        cls.preSetup(directory=resource, validator=func, enum=failing_enum,
+                     passing_directory=root / "valid")
+        cls.resource_dict = cls.get_resources()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tempdir.cleanup()
+
+    def test_each_rule_fails_its_fixture(self):
+        for rule in RULEBOOK.rules:
+            stem = "illegal_rules_" + rule.name.replace("-", "_")
+            with self.subTest(rule=rule.name):
+                filename = self.failing_directory / f"{stem}.xml"
+
+                result = self.validator(filename)
+
+                self.assertEqual(result.enum, self.failing_enum)
+                self.assertIn(rule.name, str(result.exception))
+
+
+class TestRules(ExtendedTestCase):
+
+    def make_root(self, fpage=10, lpage=20, affref="a1"):
+        xml = DOCUMENT.format(fpage=fpage, lpage=lpage, affref=affref)
+        return etree.fromstring(xml.encode("utf-8"))
+
+    def test_rules_are_compiled_once(self):
+        root = self.make_root()
+
+        with mock.patch("lxml.etree.XPath") as compile_:
+            for _ in range(3):
+                check_rules(root)
+
+        compile_.assert_not_called()
+
+    def test_rule_PAGE_RANGE_ORDER(self):
+        params = {(10, 20): 0, (10, 10): 0, (20, 10): 1}
+        for (fpage, lpage), expected in params.items():
+            with self.subTest(fpage=fpage, lpage=lpage):
+                root = self.make_root(fpage=fpage, lpage=lpage)
+
+                violations = check_rules(root)
+
+                self.assertEqual(len(violations), expected)
+                for violation in violations:
+                    self.assertEqual(violation.rule, "page-range-order")
+                    self.assertEqual(violation.lineno, 4)
+
+    def test_rule_AFFREF_EXISTS(self):
+        params = {"a1": 0, "a2": 1}
+        for affref, expected in params.items():
+            with self.subTest(affref=affref):
+                root = self.make_root(affref=affref)
+
+                violations = check_rules(root)
+
+                self.assertEqual(len(violations), expected)
+                for violation in violations:
+                    self.assertEqual(violation.rule, "affref-exists")
+                    self.assertEqual(violation.lineno, 6)
+
+    def test_custom_rules(self):
+        rulebook = Rulebook([
+            Rule("has-fpage", "lpage", "not(../jjs:fpage)", "msg"),
+            ReferenceRule("ref", "author", "id", "aff", "affid", "msg")])
+        root = self.make_root()
+
+        violations = check_rules(root, rulebook=rulebook)
+
+        self.assertEqual([v.rule for v in violations], ["ref"])
+
+    def test_rulebook_dispatches_elements_by_tag(self):
+        visited = []
+
+        class SpyRule(Rule):
+            def visit(self, element, tag, state):
+                visited.append((self.name, tag))
+                return []
+
+        rulebook = Rulebook([SpyRule("pages", "page-range", "true()", "msg"),
+                             SpyRule("affs", "aff", "true()", "msg"),
+                             SpyRule("absent", "isbn", "true()", "msg")])
+        root = self.make_root()
+
+        rulebook.check(root)
+
+        # Each element is only handed to the rules registered for its tag.
+        self.assertEqual(visited, [("pages", "page-range"), ("affs", "aff")])
+
+    def test_validator_reports_every_violation(self):
+        root = self.make_root(fpage=20, lpage=10, affref="a2")
+
+        result = validate_rules(root)
+
+        # Test1 - fails the rules stage
+        self.assertFalse(result)
+        self.assertEqual(result.enum, Passing.RULES)
+        self.assertIsInstance(result.exception, exceptions.RuleValidationError)
+        # Test2 - every violation is in the message
+        for rule in RULEBOOK.rules:
+            self.assertIn(rule.name, str(result.exception))
+        # Test3 - the first violation is the cause, with its position
+        cause = result.exception.__cause__
+        self.assertIsInstance(cause, exceptions.RuleViolation)
+        self.assertEqual(cause_position(cause), (4, None))
+
+    def test_validator_pipe_stream_checks_each_record(self):
+        records = [self.make_root(), self.make_root(affref="a2")]
+        bundle = etree.Element("bundle")
+        bundle.extend(records)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "bundle.xml")
+            etree.ElementTree(bundle).write(filename)
+
+            result, tree = validate_rules.pipe(filename, stream=True)
+            expected, _ = validate_rules.pipe(filename)
+
+        self.assertIsNone(tree)
+        self.assertFalse(result)
+        self.assertIn("affref-exists", str(result.exception))
+        self.assertEqual(str(expected.exception), str(result.exception))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,35 +6,156 @@
 Copyright Ian Vermes 2018
 """
 
-from tests.base_testcases import ExtendedTestCase
+from tests.base_testcases import ExtendedTestCase, ResourceTestCase
 from tests.validation_testcases import ValidationTestCase
-from helpers.checkschema import SchemaOperations, validate_schema
+from helpers.checkschema import (SchemaOperations, validate_schema,
+                                 validate_records)
 from helpers.enum import Passing
+from helpers.settings_handler import SchemaRegistry
 from helpers.result import ValidationResult
 
 from lxml import etree
 
 import exceptions
 
+from unittest import mock
 import unittest
+import os
 import sys
+import tempfile
 
 
-class TestValidateSchemaFunction(ValidationTestCase, ExtendedTestCase):
+class TestValidateSchemaFunction(ValidationTestCase, ResourceTestCase):
     """Some test methods are written in the first parent class
     """
 
     @classmethod
     def setUpClass(cls):
-        resource = "tests/resources/schema"
+        super().setUpClass()
+        resource = cls.resource_dir / "schema"
         func = validate_schema
         failing_enum = Passing.SCHEMA
 
-        cls.preSetup(directory=resource, validator=func, enum=failing_enum)
+        cls.preSetup(directory=resource, validator=func, enum=failing_enum,
+                     passing_directory=cls.resource_dir / "valid")
         cls.resource_dict = cls.get_resources()
 
     # Test specific to the schema_validator go here
 
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_bundle(self, filenames, root="bundle", before=(), after=()):
+        # Write the documents of the files under a root, between elements.
+        bundle = etree.Element(root)
+        bundle.extend(etree.Element(tag) for tag in before)
+        for filename in filenames:
+            bundle.append(etree.parse(str(filename)).getroot())
+        bundle.extend(etree.Element(tag) for tag in after)
+        bundle_filename = os.path.join(self.tempdir.name, "bundle.xml")
+        etree.ElementTree(bundle).write(bundle_filename, encoding="UTF-8",
+                                        xml_declaration=True)
+        return bundle_filename
+
+    def test_validator_pipe_stream_agrees(self):
+        for validity, files in self.resource_dict.items():
+            for filename in files:
+                with self.subTest(validity=validity, filename=filename.name):
+                    expected, _ = validate_schema.pipe(filename)
+                    result, tree = validate_schema.pipe(filename, stream=True)
+
+                    self.assertIsNone(tree)
+                    self.assertEqual(expected.enum, result.enum)
+
+    def test_validate_bytes_agrees(self):
+        for validity, files in self.resource_dict.items():
+            for filename in files:
+                with self.subTest(validity=validity, filename=filename.name):
+                    with open(filename, "rb") as handle:
+                        data = handle.read()
+
+                    expected = validate_schema(filename)
+                    result = validate_schema.validate_bytes(data, name="doc")
+
+                    self.assertEqual(expected.enum, result.enum)
+                    self.assertEqual("doc", result.filename)
+
+    def test_validate_records_of_a_bundle(self):
+        valid_files = self.resource_dict[True]
+        invalid_files = self.resource_dict[False]
+
+        # Test1 - every record is valid
+        bundle = self.make_bundle(valid_files * 3)
+        validate_records(bundle)
+
+        # Test2 - any invalid record fails the bundle
+        bundle = self.make_bundle(valid_files + invalid_files[:1])
+        with self.assertRaises(etree.DocumentInvalid):
+            validate_records(bundle)
+
+    def test_schema_that_fails_to_compile_fails_the_file(self):
+        filename = self.resource_dict[True][0]
+        missing = os.path.join(self.tempdir.name, "missing.xsd")
+        settings = mock.Mock(schema_registry=SchemaRegistry(missing))
+        with mock.patch("helpers.checkschema.get_settings",
+                        return_value=settings):
+            for stream in (False, True):
+                with self.subTest(stream=stream):
+                    result, _ = validate_schema.pipe(filename, stream=stream)
+
+                    cause = result.exception.__cause__
+                    self.assertEqual(result.enum, Passing.SCHEMA)
+                    self.assertIsInstance(cause, exceptions.SchemaSetupFailed)
+                    self.assertIn("missing.xsd", str(cause))
+
+    def test_bundle_verdict_is_the_same_in_both_modes(self):
+        valid_files = self.resource_dict[True]
+        invalid_files = self.resource_dict[False]
+        params = {True: valid_files * 2,
+                  False: valid_files + invalid_files[:1]}
+        for validity, files in params.items():
+            with self.subTest(validity=validity):
+                bundle = self.make_bundle(files)
+
+                in_memory, _ = validate_schema.pipe(bundle)
+                streamed, _ = validate_schema.pipe(bundle, stream=True)
+
+                self.assertEqual(in_memory.passed_schema, validity)
+                self.assertEqual(in_memory.enum, streamed.enum)
+
+    def test_only_records_may_be_bundled(self):
+        valid_files = self.resource_dict[True]
+        params = {"other root": {"root": "junk", "before": ["foo"]},
+                  "element before": {"before": ["foo"]},
+                  "element after": {"after": ["foo"]}}
+        for condition, kwargs in params.items():
+            with self.subTest(condition=condition):
+                bundle = self.make_bundle(valid_files, **kwargs)
+
+                for stream in (False, True):
+                    result, _ = validate_schema.pipe(bundle, stream=stream)
+
+                    cause = result.exception.__cause__
+                    self.assertEqual(result.enum, Passing.SCHEMA)
+                    self.assertIsInstance(cause, exceptions.UnexpectedElement)
+
+    def test_record_nested_in_another_element_fails(self):
+        bundle = etree.Element("bundle")
+        wrapper = etree.SubElement(bundle, "wrapper")
+        wrapper.append(etree.parse(str(self.resource_dict[True][0])).getroot())
+        filename = os.path.join(self.tempdir.name, "nested.xml")
+        etree.ElementTree(bundle).write(filename)
+
+        for stream in (False, True):
+            with self.subTest(stream=stream):
+                result, _ = validate_schema.pipe(filename, stream=stream)
+
+                self.assertEqual(result.enum, Passing.SCHEMA)
+                self.assertEqual(result.exception.__cause__.tag, "wrapper")
+
 
 
 class TestSchemaDependency(ExtendedTestCase):
@@ -66,5 +187,11 @@ class TestSchemaDependency(ExtendedTestCase):
 
         self.assertHasAttr(module, expected_attr)
 
+    def test_module_import_does_not_compile_schema(self):
+        with mock.patch("helpers.settings_handler._compile_schema") as compile_:
+            import helpers.checkschema
+
+        compile_.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
@@ -14,6 +14,9 @@ import exceptions
 
 from lxml import etree
 
+import codecs
+import os
+import tempfile
 import unittest
 
 
@@ -64,5 +67,61 @@ class TestValidateSyntaxFunction(ValidationTestCase, ExtendedTestCase):
                 self.assertIsInstance(error.exception, expected_exception, msg=msg)
 
 
+class TestMismatchedEncodingsFastPath(ExtendedTestCase):
+    """The fast path must give the same verdict as the chardet path."""
+
+    @classmethod
+    def setUpClass(cls):
+        declaration = '<?xml version="1.0" encoding="{}"?>\n'
+        body = "<a>{}</a>\n"
+        cls.contents = {
+            "ascii": (declaration.format("UTF-8") + body.format("text")).encode(),
+            "utf-8 body": (declaration.format("UTF-8")
+                           + body.format("café")).encode(),
+            "single line": body.format("text").strip().encode(),
+            "utf-8 BOM": codecs.BOM_UTF8 + (declaration.format("UTF-8")
+                                            + body.format("text")).encode(),
+            "utf-16": (declaration.format("UTF-16")
+                       + body.format("text")).encode("utf-16"),
+            "latin-1 declaration": (declaration.format("latin-1") + "é\n"
+                                    + body.format("é")).encode("latin-1"),
+            "escape sequence": (declaration.format("UTF-8").encode()
+                                + b"<a>\x1b$B</a>\n"),
+            "empty": b""}
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def verdict(self, filename, fastpath):
+        try:
+            raise_if_mismatched_encodings(filename, fastpath=fastpath)
+        except exceptions.EncodingOperationError:
+            return False
+        else:
+            return True
+
+    def test_fast_and_chardet_paths_agree(self):
+        for condition, content in self.contents.items():
+            filename = os.path.join(self.tempdir.name, "case.xml")
+            with open(filename, "wb") as handle:
+                handle.write(content)
+
+            with self.subTest(condition=condition):
+                fast = self.verdict(filename, fastpath=True)
+                slow = self.verdict(filename, fastpath=False)
+
+                self.assertEqual(slow, fast)
+
+    def test_ascii_file_passes(self):
+        filename = os.path.join(self.tempdir.name, "ascii.xml")
+        with open(filename, "wb") as handle:
+            handle.write(self.contents["ascii"])
+
+        self.assertTrue(self.verdict(filename, fastpath=True))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,10 +7,14 @@ Copyright Ian Vermes 2018
 """
 
 from tests.base_testcases import ExtendedTestCase
-from helpers.result import ValidationResult
+from helpers.result import ValidationResult, ResultStore
+from helpers.enum import Passing
 
 import exceptions as pkg_excs
 
+import pathlib
+import pickle
+
 
 class TestValidationResult(ExtendedTestCase):
 
@@ -143,3 +147,100 @@ class TestValidationResult(ExtendedTestCase):
         self.assertTrue(result.passed_schema)
         self.assertFalse(result.passed_rules)
         self.assertFalse(result)
+
+    def test_is_picklable_with_detached_cause(self):
+        filename = "FooBar.xml"
+        cause = ValueError("Unpicklable lxml errors are replaced")
+        try:
+            raise self.schema_exc(filename) from cause
+        except self.schema_exc as exc:
+            result = ValidationResult(filename, exc)
+
+        clone = pickle.loads(pickle.dumps(result))
+
+        self.assertEqual(result.filename, clone.filename)
+        self.assertEqual(result.enum, clone.enum)
+        self.assertIsInstance(clone.exception, self.schema_exc)
+        self.assertIsInstance(clone.exception.__cause__, pkg_excs.DetachedCause)
+        self.assertEqual(str(cause), str(clone.exception.__cause__))
+        self.assertEqual("ValueError", clone.exception.__cause__.name)
+
+    def test_has_no_instance_dict(self):
+        result = ValidationResult("FooBar.xml", None)
+
+        self.assertFalse(hasattr(result, "__dict__"))
+
+    def test_filename_is_interned(self):
+        # Build equal strings at runtime, as constants may already be shared.
+        names = ["".join(["Foo", "Bar.xml"]) for _ in range(2)]
+        self.assertIsNot(names[0], names[1])
+
+        results = [ValidationResult(name, None) for name in names]
+
+        self.assertIs(results[0].filename, results[1].filename)
+
+    def test_path_filename_is_kept_as_string(self):
+        result = ValidationResult(pathlib.Path("dir", "FooBar.xml"), None)
+
+        self.assertEqual(result.filename, str(pathlib.Path("dir", "FooBar.xml")))
+
+
+class TestResultStore(ExtendedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        excs = (None, pkg_excs.SyntaxValidationError,
+                pkg_excs.SchemaValidationError, pkg_excs.RuleValidationError)
+        cls.results = []
+        for i, exc in enumerate(excs * 3):
+            filename = f"file_{i}.xml"
+            exception = exc if exc is None else exc(f"Bad {filename}")
+            cls.results.append(ValidationResult(filename, exception))
+
+    def setUp(self):
+        self.store = ResultStore()
+        self.store.extend(self.results)
+
+    def test_len_and_iter_match_results(self):
+        expected = [(r.filename, r.enum) for r in self.results]
+
+        self.assertEqual(len(self.store), len(self.results))
+        self.assertEqual(list(self.store), expected)
+
+    def test_filenames_match_filtering_the_results(self):
+        flags = (None, True, False)
+        for syntax in flags:
+            for schema in flags:
+                for rules in flags:
+                    kwargs = {"passed_syntax": syntax,
+                              "passed_schema": schema,
+                              "passed_rules": rules}
+                    expected = [r.filename for r in self.results
+                                if all(value is None
+                                       or getattr(r, attr) == value
+                                       for attr, value in kwargs.items())]
+                    with self.subTest(**kwargs):
+                        self.assertEqual(self.store.filenames(**kwargs),
+                                         expected)
+                        self.assertEqual(self.store.count(**kwargs),
+                                         len(expected))
+
+    def test_failed_schema_excludes_syntax_failures(self):
+        found = self.store.filenames(passed_syntax=True, passed_schema=False)
+
+        enums = {r.filename: r.enum for r in self.results}
+        self.assertTrue(found)
+        self.assertTrue(all(enums[f] is Passing.SCHEMA for f in found))
+
+    def test_error_is_message_of_failures_only(self):
+        for index, result in enumerate(self.results):
+            with self.subTest(index=index):
+                if result:
+                    self.assertIsNone(self.store.error(index))
+                else:
+                    self.assertEqual(self.store.error(index),
+                                     str(result.exception))
+
+    def test_error_raises_index_error_beyond_store(self):
+        with self.assertRaises(IndexError):
+            self.store.error(len(self.results))
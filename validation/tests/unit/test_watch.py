@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""Unit test of watching directories for changed XML files.
+
+Copyright Ian Vermes 2019
+"""
+
+from tests.base_testcases import ExtendedTestCase
+from helpers.watch import InotifyWatcher, PollingWatcher, open_watcher
+from helpers.watch import _Watcher
+
+from unittest import mock
+import os
+import pathlib
+import tempfile
+import unittest
+
+try:
+    InotifyWatcher([]).close()
+except OSError:
+    HAS_INOTIFY = False
+else:
+    HAS_INOTIFY = True
+
+TIMEOUT = 5
+
+
+class WatcherTests(object):
+    # The behaviour shared by the watchers, mixed into a TestCase per watcher.
+
+    def make_watcher(self, paths, **kwargs):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tempdir.name).resolve()
+        self.existing = self.root / "existing.xml"
+        self.existing.write_bytes(b"<root/>")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_reports_created_and_modified_files(self):
+        with self.make_watcher([self.root]) as watcher:
+            created = self.root / "created.xml"
+            created.write_bytes(b"<root/>")
+            self.existing.write_bytes(b"<root>modified</root>")
+
+            changed = watcher.wait(timeout=TIMEOUT)
+
+        self.assertEqual(changed, sorted([created, self.existing]))
+
+    def test_ignores_unchanged_and_unmatched_files(self):
+        with self.make_watcher([self.root], exclude=["*_old.xml"]) as watcher:
+            (self.root / "notes.txt").write_bytes(b"notes")
+            (self.root / "draft_old.xml").write_bytes(b"<root/>")
+
+            changed = watcher.wait(timeout=0.5)
+
+        self.assertEqual(changed, [])
+
+    def test_reports_files_in_new_subdirectories(self):
+        with self.make_watcher([self.root]) as watcher:
+            subdirectory = self.root / "issue_1"
+            subdirectory.mkdir()
+            created = subdirectory / "article.xml"
+            created.write_bytes(b"<root/>")
+
+            changed = []
+            while created not in changed:
+                batch = watcher.wait(timeout=TIMEOUT)
+                if not batch:
+                    break
+                changed.extend(batch)
+
+        self.assertIn(created, changed)
+
+    def test_watches_files_given_by_name(self):
+        named = self.root / "named.jats"
+        named.write_bytes(b"<root/>")
+        with self.make_watcher([named]) as watcher:
+            named.write_bytes(b"<root>modified</root>")
+            self.existing.write_bytes(b"<root>modified</root>")
+
+            changed = watcher.wait(timeout=TIMEOUT)
+
+        self.assertEqual(changed, [named])
+
+
+@unittest.skipUnless(HAS_INOTIFY, "inotify is not available")
+class TestInotifyWatcher(WatcherTests, ExtendedTestCase):
+
+    def make_watcher(self, paths, **kwargs):
+        return InotifyWatcher(paths, **kwargs)
+
+    def test_reports_files_moved_into_place(self):
+        # Editors often save to a temporary file, then rename it.
+        with self.make_watcher([self.root]) as watcher:
+            temporary = self.root / ".existing.xml.swp"
+            temporary.write_bytes(b"<root>saved</root>")
+            os.replace(temporary, self.existing)
+
+            changed = watcher.wait(timeout=TIMEOUT)
+
+        self.assertEqual(changed, [self.existing])
+
+
+class TestPollingWatcher(WatcherTests, ExtendedTestCase):
+
+    def make_watcher(self, paths, **kwargs):
+        return PollingWatcher(paths, interval=0.05, **kwargs)
+
+
+class TestWatcherInterface(ExtendedTestCase):
+
+    def test_watcher_must_implement_wait(self):
+        class Watcher(_Watcher):
+            pass
+
+        with self.assertRaises(TypeError):
+            Watcher([])
+
+
+class TestOpenWatcher(ExtendedTestCase):
+
+    def test_falls_back_to_polling(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            with mock.patch("helpers.watch._get_libc", side_effect=OSError):
+                watcher = open_watcher([tempdir])
+            watcher.close()
+            forced = open_watcher([tempdir], poll=True)
+            forced.close()
+
+        self.assertIsInstance(watcher, PollingWatcher)
+        self.assertIsInstance(forced, PollingWatcher)
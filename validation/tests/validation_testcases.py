@@ -112,6 +112,24 @@ class ValidationTestCase():
         self.assertEqual(attribute_value, self.failing_enum)
 
 
+    def test_validator_pipe_returns_result_and_tree(self):
+        pipe = self.validator.func.pipe
+        valid_xml = self.resource_dict[True][0]
+        illegal_xml = self.resource_dict[False][0]
+
+        # Test1 - a passing stage hands on a tree
+        result, tree = pipe(valid_xml)
+        self.assertIsInstance(result, ValidationResult)
+        self.assertIsInstance(tree, etree._ElementTree)
+
+        # Test2 - a tree from an earlier stage is accepted
+        result, _ = pipe(valid_xml, etree.parse(str(valid_xml)))
+        self.assertTrue(result)
+
+        # Test3 - a failing stage still returns a result
+        result, _ = pipe(illegal_xml)
+        self.assertFalse(result)
+
     def test_validator_input_arg_does_not_raise_TypeError(self):
         validator = self.validator
         xml = self.resource_dict[True][0]  # Only need 1 file
@@ -134,7 +152,8 @@ class ValidationTestCase():
                     raise AssertionError(msg) from None
 
     @classmethod
-    def preSetup(cls, directory, validator, enum):
+    def preSetup(cls, directory, validator, enum,
+                 passing_directory="tests/resources/valid"):
         msg = cls._PRECONDITION_TEMPLATE
         assert inspect.isclass(validator), msg.format(str(validator))
         cls.validator = functools.partial(validator)
@@ -143,7 +162,7 @@ class ValidationTestCase():
         assert directory.exists(), msg.format(str(directory))
         cls.failing_directory = directory
 
-        passing_directory = pathlib.Path("tests/resources/valid")
+        passing_directory = pathlib.Path(passing_directory)
         assert passing_directory.exists(), msg.format(str(passing_directory))
         cls.passing_directory = passing_directory
 
@@ -5,36 +5,264 @@
 class:
     Checker
 
+function:
+    get_run_fingerprint
+
 Copyright Ian Vermes 2019
 """
 
+from helpers.checkrules import validate_rules, get_rules_fingerprint
 from helpers.checkschema import validate_schema
 from helpers.checksyntax import validate_syntax
+from helpers.checkencoding import validate_encoding
+from helpers.cache import ResultCache, get_fingerprint
+from helpers.corpus import extract_keys, extract_file_keys
+from helpers.source import BytesSource, load_file, read_stream
+from helpers.archive import UnreadableArchive
+from helpers.result import ValidationResult
+from helpers.settings_handler import current_snapshot, install_snapshot
 import exceptions
 
+import functools
+import multiprocessing
 import os
+import threading
+
+# The Checker of a worker process, set once by _init_worker.
+_WORKER_CHECKER = None
+
 
 class Checker():
     """Validate XML and generate reports on in valid XML.
 
+    The validators are run as a pipeline: the file is read from disk once, see
+    helpers.source.load_file, and its buffer is shared by every stage and the
+    cache. The encodings are checked on that buffer, then it is parsed once by
+    the syntax stage and the resulting tree is handed to each subsequent
+    stage.
+
+    Kwargs:
+        cache(helpers.cache.ResultCache, None): If given, files whose content
+            was validated on a previous run are not revalidated.
+        stream(bool): If True no stage keeps a tree, so memory use does not
+            grow with the file size; each stage parses the buffer itself.
+        index(helpers.corpus.CorpusIndex, None): If given, the keys of each
+            document are added to the index, for checks across documents.
+
     Methods:
         feed_in
+        feed_many
+        validate_bytes
+        validate_stream
 
     Attrs:
         validators
+        cache
+        stream
+        index
     """
 
-    def __init__(self):
-        validators = [validate_schema, validate_syntax]
+    def __init__(self, cache=None, stream=False, index=None):
+        validators = [validate_rules, validate_schema, validate_syntax,
+                      validate_encoding]
         validators.sort()
         self.validators = tuple(validators)
+        self.cache = cache
+        self.stream = stream
+        self.index = index
 
     def feed_in(self, filename):
-        if not os.path.isfile(filename):
+        result, keys = self._feed(filename, want_keys=self.index is not None)
+        self._index(filename, keys)
+        return result
+
+    def validate_bytes(self, data, name=None):
+        """Validate XML held in memory, without writing it to disk.
+
+        The stages share the buffer, see helpers.source.BytesSource.
+
+        Args:
+            data(bytes, bytearray, memoryview)
+        Kwargs:
+            name(str, None): The filename of the result.
+        Return:
+            ValidationResult
+        """
+        return self.feed_in(BytesSource(data, name=name))
+
+    def validate_stream(self, stream, name=None):
+        """Validate XML read from a binary file-like object.
+
+        Args:
+            stream: Has a read method returning bytes.
+        Kwargs:
+            name(str, None): The filename of the result, by default the name
+                attribute of the stream.
+        Return:
+            ValidationResult
+        """
+        return self.feed_in(read_stream(stream, name=name))
+
+    def _index(self, filename, keys):
+        if self.index is not None and keys is not None:
+            self.index.add(filename, keys)
+
+    def _feed(self, filename, want_keys=False):
+        # Get the result & DocumentKeys of the file, the keys may be None
+        # unless wanted.
+        if isinstance(filename, BytesSource):
+            return self._feed_source(filename, want_keys)
+        elif isinstance(filename, UnreadableArchive):
+            return filename.to_result(), None
+        elif not os.path.isfile(filename):
             raise exceptions.FileNotFound(str(filename))
+        with load_file(filename) as source:
+            return self._feed_source(source, want_keys)
+
+    def _feed_source(self, filename, want_keys=False):
+        if self.cache is None:
+            return self._validate(filename, want_keys)
+        else:
+            digest = self.cache.digest(filename)
+            result = self.cache.get(filename, digest)
+            keys = None if result is None else self.cache.get_keys(digest)
+            if result is None or (want_keys and keys is None):
+                result, keys = self._validate(filename, want_keys)
+                self.cache.put(digest, result, keys=keys)
+            return result, keys
+
+    def _validate(self, filename, want_keys=False):
+        tree = None
+        # Streamed records are keyed as the schema stage validates them,
+        # rather than by another parse.
+        streamed_keys = [] if self.stream and want_keys else None
+        for validation_func in self.validators:
+            kwargs = {"stream": self.stream}
+            if (validation_func is validate_schema
+                    and streamed_keys is not None):
+                kwargs["on_record"] = lambda record: streamed_keys.extend(
+                    extract_keys(record))
+            result, tree = validation_func.pipe(filename, tree, **kwargs)
+            if not result:
+                break
+        # Keys are cheap to take from a tree but need a parse without one.
+        if tree is not None:
+            keys = extract_keys(tree.getroot())
+        elif not result.passed_syntax:
+            keys = []
+        elif streamed_keys is not None and result.passed_schema:
+            keys = streamed_keys
+        elif want_keys:
+            # The schema stage stopped at an invalid record.
+            keys = extract_file_keys(filename)
+        else:
+            keys = None
+        return result, keys
+
+    def feed_many(self, filenames, jobs=1, chunksize=1):
+        """Validate many files, yielding results in the order of filenames.
+
+        With more than one job the files are spread across a process pool.
+        Each worker builds its own Checker once, hence the XSD is compiled once
+        per worker rather than once per file. Workers are spawned, as this
+        process may be running threads, e.g. a logger.ErrorLogger, and are
+        sent a snapshot of its settings, see helpers.settings_handler. At most
+        2 * jobs * chunksize files are taken from filenames ahead of their
+        results, hence the members of an archive are not all held at once.
+        A file that is not found, e.g. removed since it was listed, fails
+        rather than ending the run.
+
+        Args:
+            filenames(iterable): str, pathlib.Path or BytesSource items,
+                e.g. archive members, see helpers.archive.expand_archives.
+        Kwargs:
+            jobs(int): Number of worker processes, 1 validates in this process.
+            chunksize(int): Files sent to a worker at a time.
+        Yields:
+            ValidationResult
+        Exceptions:
+            ValueError
+        """
+        if jobs < 1:
+            raise ValueError(f"Expected a positive number of jobs, got {jobs}.")
+        elif jobs == 1:
+            for filename in filenames:
+                result, keys = _feed_found(self, filename,
+                                           want_keys=self.index is not None)
+                self._index(filename, keys)
+                yield result
         else:
-            for validation_func in self.validators:
-                result = validation_func(filename)
-                if not result:
-                    break
-            return result
+            # The worker opens its own connection to the cache file.
+            if self.cache is None:
+                cache_args = None
+            else:
+                cache_args = (self.cache.filename, self.cache.fingerprint)
+            initargs = (cache_args, self.stream, current_snapshot())
+            feed = functools.partial(_worker_feed,
+                                     want_keys=self.index is not None)
+            # The pool takes its input as fast as it can, hence the slots.
+            slots = threading.Semaphore(2 * jobs * chunksize)
+            stop = threading.Event()
+            filenames = _take_slots(filenames, slots, stop)
+            # Forking a process running threads is unsafe, hence spawn.
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(jobs, _init_worker, initargs) as pool:
+                try:
+                    for result, keys in pool.imap(feed, filenames, chunksize):
+                        slots.release()
+                        self._index(result.filename, keys)
+                        yield result
+                finally:
+                    # Free the feeder of the pool if it waits on a slot.
+                    stop.set()
+                    slots.release()
+
+
+def get_run_fingerprint(settings, stream=False):
+    """Get the fingerprint of what the verdicts of a run depend upon.
+
+    That is the schemas, the rules and whether documents are streamed, hence
+    cached verdicts & journals of one kind of run are not used by another.
+
+    Args:
+        settings(Settings, SettingsSnapshot)
+    Kwargs:
+        stream(bool): See Checker.
+    Return:
+        str: See helpers.cache.get_fingerprint.
+    """
+    schemas = [filename for filename in settings.schema_registry.filenames
+               if os.path.isfile(filename)]
+    extra = [*get_rules_fingerprint(), f"stream={bool(stream)}"]
+    return get_fingerprint(*schemas, extra=extra)
+
+
+def _feed_found(checker, filename, want_keys=False):
+    # Feed a file, failing it if not found rather than raising.
+    try:
+        return checker._feed(filename, want_keys)
+    except exceptions.FileNotFound as err:
+        exc = exceptions.ValidationError()
+        exc.__cause__ = err
+        return ValidationResult(filename, exc), None
+
+
+def _take_slots(items, slots, stop):
+    # Yield each item once a slot is free, until stopped.
+    for item in items:
+        slots.acquire()
+        if stop.is_set():
+            return
+        yield item
+
+
+def _init_worker(cache_args, stream, settings):
+    global _WORKER_CHECKER
+    if settings is not None:
+        install_snapshot(settings)
+    cache = None if cache_args is None else ResultCache(*cache_args)
+    _WORKER_CHECKER = Checker(cache=cache, stream=stream)
+
+
+def _worker_feed(filename, want_keys):
+    return _feed_found(_WORKER_CHECKER, filename, want_keys)
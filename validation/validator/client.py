@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""A thin client of the validation daemon, see daemon.py.
+
+The client imports nothing beyond the standard library, hence it starts in
+milliseconds: the daemon has already imported lxml and compiled the schema. A
+request is one JSON line naming files & directories, the reply one JSON line
+per file, see report.result_to_record, read until the daemon hangs up.
+
+Functions:
+    default_socket
+    request
+    main
+
+Copyright Ian Vermes 2019
+"""
+
+import exceptions
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+
+def default_socket():
+    """Get the socket path of the daemon of this user."""
+    name = f"next_gen_xml-{os.getuid()}.sock"
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def request(paths, socket_path=None, timeout=None):
+    """Validate files with the daemon, yielding a record per file.
+
+    Paths are sent as absolute paths, the daemon having its own working
+    directory. Directories are searched by the daemon for XML files.
+
+    Args:
+        paths(iterable): str or pathlib.Path items, files or directories.
+    Kwargs:
+        socket_path(str, None): Defaults to default_socket().
+        timeout(float, None): The most seconds to wait on the daemon.
+    Yields:
+        dict: A record, see report.result_to_record, or a record with a
+            filename & error key for a path that could not be validated.
+    Exceptions:
+        exceptions.DaemonError
+    """
+    if socket_path is None:
+        socket_path = default_socket()
+    message = {"paths": [os.path.abspath(path) for path in paths]}
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(socket_path)
+    except OSError as err:
+        connection.close()
+        errmsg = f"No validation daemon is listening on '{socket_path}'."
+        raise exceptions.DaemonError(errmsg) from err
+    with connection, connection.makefile("rwb") as stream:
+        stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        stream.flush()
+        for line in stream:
+            yield json.loads(line)
+
+
+def _format_record(record):
+    if "error" in record:
+        return f"{record['filename']}: {record['error']}"
+    detail = record["message"] or record["cause"] or ""
+    if record["line"] is not None:
+        detail = f"{detail} (line {record['line']})"
+    return f"{record['filename']}: {record['exception']}: {detail}"
+
+
+def main(argv=None):
+    """Validate the paths with the daemon, printing each failing file.
+
+    Return:
+        int: The exit status, 0 if every file passed, 1 if any failed and 2 if
+            the daemon could not be reached.
+    """
+    description = "Validate XML with a running validation daemon."
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("paths", metavar="PATHS", nargs="+",
+                        help="File, directory or archive paths.")
+    parser.add_argument("--socket", dest="socket_path", metavar="PATH",
+                        default=None,
+                        help=f"The socket of the daemon "
+                             f"(default: {default_socket()})")
+    parser.add_argument("--timeout", dest="timeout", metavar="SECONDS",
+                        default=None, type=float,
+                        help="The most seconds to wait on the daemon")
+    args = parser.parse_args(argv)
+    status = 0
+    try:
+        for record in request(args.paths, socket_path=args.socket_path,
+                              timeout=args.timeout):
+            if record.get("passing") != "PASSING":
+                print(_format_record(record))
+                status = 1
+    except (exceptions.DaemonError, OSError) as err:
+        print(err, file=sys.stderr)
+        status = 2
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
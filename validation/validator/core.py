@@ -9,10 +9,16 @@ XML is both well formed, valid and sematicly correct.
 Copyright Ian Vermes 2018
 """
 
+from checker import Checker, get_run_fingerprint
+from report import NDJSONReport, ErrorSummary
+from logger import ErrorLogger
+from helpers.archive import expand_archives, ARCHIVE_ERRORS
+from helpers.result import ValidationResult
 import exceptions
 import helpers
 
 import os
+import queue
 
 CORE_SETTINGS_FILENAME = os.path.join(os.path.dirname(__file__),
                                       "CORE_SETTINGS.ini")
@@ -33,8 +39,18 @@ class _TestingPrimitive():
         raise package_base_eror
 
 
-def main(directory, testmode=False):
-    """Validate the XML in the directory and reporting on each."""
+def main(directory, testmode=False, jobs=1, cache=True, stream=False,
+         report=None, summary=None, watch=None, journal=None, resume=False):
+    """Validate the XML in the directory and reporting on each.
+
+    Given a watcher, see helpers.watch.open_watcher, the files it reports as
+    created or modified are then validated as they change, until Ctrl-C.
+
+    Given a journal file, each validated file is journaled, and on resume the
+    files journaled by an earlier run are skipped and the report is added to,
+    see helpers.journal.Journal. Documents that are skipped are not checked
+    against those that are not.
+    """
     # Set the mode depending on the main Kwargs.
     if testmode is True:
         mode = helpers.settings_handler.Mode.TEST
@@ -50,13 +66,104 @@ def main(directory, testmode=False):
     # Feed errors to an error parser that works with the log file
     # Parse the xml with lxml and the XSD
     # Perform examinations that are beyond the scope of XSD
-
-    print(f"test mode: {settings.mode}")  # TODO remove one your integration tests are more fully written
-    print("done!") # TODO remove one your integration tests are more fully written
-    return
+    # Wait on any preload now, before the schema is fingerprinted.
+    settings.schema
+    fingerprint = get_run_fingerprint(settings, stream=stream)
+    if cache:
+        cache = helpers.cache.ResultCache(settings.cache_filename, fingerprint)
+    else:
+        cache = None
+    if journal is not None:
+        journal = helpers.journal.Journal(journal, fingerprint, resume=resume)
+        directory = journal.pending(directory)
+    index = helpers.corpus.CorpusIndex()
+    checker = Checker(cache=cache, stream=stream, index=index)
+    if report is not None:
+        report = NDJSONReport(report, append=resume)
+    errors_summary = ErrorSummary()
+    # Failures are logged on a thread while the files are validated.
+    errors = queue.Queue()
+    error_logger = ErrorLogger(settings.log_filename, errors)
+    error_logger.start()
+
+    def emit(result, verbose=False):
+        if report is not None:
+            report.write(result)
+        if not result:
+            errors.put(result)
+            errors_summary.add(result)
+        if verbose or not result:
+            print(result)
+
+    try:
+        for result in checker.feed_many(directory, jobs=jobs):
+            emit(result)
+            if journal is not None:
+                journal.record(result)
+        # Keys shared between documents are only known once all are seen.
+        for result in index.results():
+            emit(result)
+        if watch is not None:
+            _watch(checker, watch, emit, report)
+    finally:
+        error_logger.stop()
+        if cache is not None:
+            cache.close()
+        if report is not None:
+            report.close()
+        if journal is not None:
+            journal.close()
+    if summary is not None:
+        errors_summary.write(summary)
+
+
+def _watch(checker, watch, emit, report):
+    # Revalidate each file as it changes, with the schema already compiled.
+    # A revalidated document would collide with its own keys, hence there is
+    # no index across documents.
+    checker.index = None
+    print("Watching for changes, press Ctrl-C to stop.")
+    try:
+        for changed in watch:
+            for filename in expand_archives(changed, include=watch.include,
+                                            exclude=watch.exclude):
+                try:
+                    result = checker.feed_in(filename)
+                except (exceptions.FileNotFound, FileNotFoundError):
+                    continue  # Removed since it changed.
+                except ARCHIVE_ERRORS as err:
+                    # Unreadable, e.g. for its permissions or still being
+                    # written, which fails the file rather than the watch.
+                    result = _get_unreadable_result(filename, err)
+                emit(result, verbose=True)
+            if report is not None:
+                report.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watch.close()
+
+
+def _get_unreadable_result(filename, err):
+    # The failing result of a file that could not be read, see Passing.FAILS.
+    exc = exceptions.ValidationError()
+    exc.__cause__ = err
+    return ValidationResult(str(filename), exc)
 
 
 if __name__ == '__main__':
+    # Compile the schema while the command line is parsed & files are found.
+    helpers.settings_handler.preload_schema(CORE_SETTINGS_FILENAME)
     parser = helpers.argparser.NextGenArgParse()
     args = parser.get_args(search_dirs=True)
-    main(args.xmls, testmode=args.testmode)
+    if args.watch:
+        watch = helpers.watch.open_watcher(args.xmls, include=args.include,
+                                           exclude=args.exclude,
+                                           recursive=args.recurse,
+                                           poll=args.poll)
+    else:
+        watch = None
+    main(args.files, testmode=args.testmode, jobs=args.jobs, cache=args.cache,
+         stream=args.stream, report=args.report,
+         summary=args.summary, watch=watch, journal=args.journal,
+         resume=args.resume)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""A long-lived validation daemon, serving requests over a Unix socket.
+
+The daemon imports lxml and compiles every configured schema once, then forks
+its workers, which share the compiled schemas copy-on-write. The workers all
+accept connections on the one listening socket. A request is one JSON line
+naming files & directories, the reply one JSON line per file, see client.py,
+hence a request pays neither interpreter startup nor schema compilation.
+
+A worker that dies is replaced. The daemon stops on SIGTERM or SIGINT, then
+stops its workers and removes the socket.
+
+Classes:
+    ValidationDaemon
+
+Functions:
+    main
+
+Copyright Ian Vermes 2019
+"""
+
+from checker import Checker, get_run_fingerprint
+from client import default_socket
+from core import CORE_SETTINGS_FILENAME
+from report import result_to_record
+from helpers.archive import expand_archives
+from helpers.cache import ResultCache
+from helpers.corpus import CorpusIndex
+from helpers.enum import Mode
+from helpers.path import expandpath, iter_files
+from helpers.settings_handler import Settings, load_schema
+import exceptions
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import tarfile
+import time
+import traceback
+import zipfile
+
+# A worker dying within a second of its fork is replaced after this pause, so
+# a worker failing on start does not fork in a busy loop.
+_RESPAWN_DELAY = 0.5
+_MAX_REQUEST = 1 << 20
+
+
+class ValidationDaemon(object):
+    """Validate files on request, with schemas compiled once for all requests.
+
+    Kwargs:
+        socket_path(str, None): Defaults to client.default_socket().
+        workers(int): Number of worker processes forked.
+        testmode(bool): Use the Mode.TEST settings.
+        cache(bool): Reuse results cached by previous runs.
+        stream(bool): Validate without holding whole documents in memory.
+
+    Methods:
+        serve_forever
+        shutdown
+    """
+
+    def __init__(self, socket_path=None, workers=2, testmode=False,
+                 cache=True, stream=False):
+        if workers < 1:
+            raise ValueError(f"Expected a positive number of workers, "
+                             f"got {workers}.")
+        if socket_path is None:
+            socket_path = default_socket()
+        self.socket_path = str(socket_path)
+        self.workers = workers
+        self.mode = Mode.TEST if testmode else Mode.LIVE
+        self.cache = cache
+        self.stream = stream
+        self._listener = None
+        self._pids = {}
+
+    def serve_forever(self):
+        """Compile the schemas, fork the workers and supervise them.
+
+        Returns once the daemon is stopped by SIGTERM or SIGINT.
+
+        Exceptions:
+            exceptions.DaemonError: A daemon already listens on the socket.
+            exceptions.SchemaSetupFailed
+        """
+        cache_args = self._setup()
+        self._listener = self._bind()
+        previous = signal.signal(signal.SIGTERM, _raise_exit)
+        try:
+            for _ in range(self.workers):
+                self._spawn(cache_args)
+            while self._pids:
+                pid, _ = os.wait()
+                started = self._pids.pop(pid, None)
+                if started is None:
+                    continue
+                if time.monotonic() - started < 1.0:
+                    time.sleep(_RESPAWN_DELAY)
+                self._spawn(cache_args)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop the workers and remove the socket."""
+        for pid in list(self._pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self._pids):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            del self._pids[pid]
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+    def _setup(self):
+        # Compiled before the fork, hence shared by every worker.
+        ini_file = expandpath(CORE_SETTINGS_FILENAME, exists=True)
+        settings = Settings(ini_file, mode=self.mode)
+        settings.schema
+        schemas = [filename for filename in settings.schema_registry.filenames
+                   if os.path.isfile(filename)]
+        for filename in schemas:
+            load_schema(filename)
+        if not self.cache:
+            return None
+        # Each worker opens its own connection to the cache file.
+        fingerprint = get_run_fingerprint(settings, stream=self.stream)
+        return (settings.cache_filename, fingerprint)
+
+    def _bind(self):
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a daemon that did not stop cleanly.
+                os.unlink(self.socket_path)
+            else:
+                errmsg = (f"A validation daemon already listens on "
+                          f"'{self.socket_path}'.")
+                raise exceptions.DaemonError(errmsg)
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only this user may ask the daemon to read files.
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        listener.listen(128)
+        return listener
+
+    def _spawn(self, cache_args):
+        # A signal stopping the daemon between the fork and noting the pid
+        # would orphan the worker, hence it waits until both are done.
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK,
+                                      {signal.SIGINT, signal.SIGTERM})
+        try:
+            pid = os.fork()
+            if pid == 0:
+                status = 0
+                try:
+                    self._work(cache_args, mask)
+                except BaseException:
+                    traceback.print_exc()
+                    status = 1
+                finally:
+                    os._exit(status)
+            self._pids[pid] = time.monotonic()
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+
+    def _work(self, cache_args, mask):
+        # The daemon stops the workers, rather than a Ctrl-C reaching each.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        cache = None if cache_args is None else ResultCache(*cache_args)
+        checker = Checker(cache=cache, stream=self.stream)
+        while True:
+            connection, _ = self._listener.accept()
+            with connection:
+                try:
+                    _handle(connection, checker)
+                except OSError:
+                    pass  # The client hung up.
+
+
+def _handle(connection, checker):
+    # Answer one request, a JSON line, with a JSON line per file.
+    with connection.makefile("rwb") as stream:
+        try:
+            paths = json.loads(stream.readline(_MAX_REQUEST))["paths"]
+            if not isinstance(paths, list):
+                raise TypeError(paths)
+        except (ValueError, KeyError, TypeError):
+            _write(stream, {"filename": None,
+                            "error": "Expected a JSON object with a list of "
+                                     "paths."})
+            return
+        checker.index = CorpusIndex()
+        for path in paths:
+            try:
+                for filename in expand_archives(iter_files([path])):
+                    try:
+                        result = checker.feed_in(filename)
+                    except exceptions.FileNotFound:
+                        _write(stream, {"filename": str(filename),
+                                        "error": "File not found."})
+                    else:
+                        _write(stream, result_to_record(result))
+            except (OSError, zipfile.BadZipFile, tarfile.TarError) as err:
+                _write(stream, {"filename": path, "error": str(err)})
+        # Keys shared between documents are only known once all are seen.
+        for result in checker.index.results():
+            _write(stream, result_to_record(result))
+        checker.index = None
+        stream.flush()
+
+
+def _write(stream, record):
+    stream.write(json.dumps(record, ensure_ascii=False).encode("utf-8")
+                 + b"\n")
+
+
+def _raise_exit(signum, frame):
+    raise SystemExit(0)
+
+
+def main(argv=None):
+    """Run the validation daemon until it is stopped."""
+    description = ("Validate XML on request from client.py, with the schema "
+                   "compiled once.")
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--socket", dest="socket_path", metavar="PATH",
+                        default=None,
+                        help=f"The socket to listen on "
+                             f"(default: {default_socket()})")
+    parser.add_argument("-w", "--workers", dest="workers", metavar="N",
+                        default=2, type=int,
+                        help="Fork N worker processes (default: 2)")
+    parser.add_argument("-t", "--test", dest="testmode", action="store_true",
+                        help="If provided run in testmode")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help=("Revalidate every file rather than reuse "
+                              "results cached by previous runs"))
+    parser.add_argument("--stream", dest="stream", action="store_true",
+                        help=("Validate without holding whole documents in "
+                              "memory, for very large files"))
+    args = parser.parse_args(argv)
+    daemon = ValidationDaemon(socket_path=args.socket_path,
+                              workers=args.workers, testmode=args.testmode,
+                              cache=args.cache, stream=args.stream)
+    try:
+        daemon.serve_forever()
+    except exceptions.DaemonError as err:
+        print(err, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,6 +18,33 @@ class NextGenError(Exception):
 class SchemaSetupFailed(NextGenError):
     """Could not setup the Settings singleton."""
 
+
+class UnknownSchemaVersion(NextGenError):
+    """A document asks for a schema version that is not configured."""
+
+
+class UnexpectedElement(NextGenError):
+    """An element where a document record, or a bundle of them, is expected.
+
+    Args:
+        tag(str)
+    Kwargs:
+        lineno(int, None): The source line of the element.
+    """
+
+    def __init__(self, tag, lineno=None):
+        super().__init__(tag, lineno)
+        self.tag = tag
+        self.lineno = lineno
+
+    def __str__(self):
+        return (f"Expected a document record or a bundle of them, got "
+                f"'{self.tag}' (line {self.lineno})")
+
+    @property
+    def position(self):
+        return self.lineno, None
+
 # File operations
 
 class FileNotFound(NextGenError):
@@ -35,6 +62,11 @@ class ParentDirNotFound(DirNotFound):
 class UnnaceptableDirName(DirNotFound):
     """Cannot use empty string '' as local directory name, use './' instead."""
 
+# Daemon operations
+
+class DaemonError(NextGenError):
+    """Could not reach, or start, the validation daemon."""
+
 # Enum operations
 
 class UnexpectedEnum(NextGenError):
@@ -80,3 +112,54 @@ class SchemaValidationError(ValidationError):
 
 class RuleValidationError(ValidationError):
     """Validation error raised due to XML failing bespoke Python rules."""
+
+
+class RuleViolation(NextGenError):
+    """An element of a document that breaks a rule of checkrules.
+
+    Args:
+        message(str): What the rule requires.
+        rule(str): The name of the rule.
+    Kwargs:
+        lineno(int, None): The source line of the offending element.
+    """
+
+    def __init__(self, message, rule, lineno=None):
+        super().__init__(message, rule, lineno)
+        self.message = message
+        self.rule = rule
+        self.lineno = lineno
+
+    def __str__(self):
+        return f"{self.rule}: {self.message} (line {self.lineno})"
+
+    @property
+    def position(self):
+        return self.lineno, None
+
+
+class DetachedCause(NextGenError):
+    """Picklable stand-in for the lxml exception that caused a validation error.
+
+    Args:
+        message(str): The message of the original exception.
+        name(str): The class name of the original exception.
+    Kwargs:
+        lineno(int, None)
+        column(int, None)
+        code(str, None): The name of the lxml error type.
+        path(str, None): The element path the error refers to.
+    """
+
+    def __init__(self, message, name, lineno=None, column=None, code=None,
+                 path=None):
+        super().__init__(message, name, lineno, column, code, path)
+        self.message = message
+        self.name = name
+        self.lineno = lineno
+        self.column = column
+        self.code = code
+        self.path = path
+
+    def __str__(self):
+        return self.message
@@ -1,3 +1,9 @@
 import helpers.argparser
 import helpers.settings_handler
 import helpers.path
+import helpers.cache
+import helpers.corpus
+import helpers.archive
+import helpers.source
+import helpers.watch
+import helpers.journal
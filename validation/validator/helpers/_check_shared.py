@@ -8,14 +8,24 @@ Meta classes:
 
 Functions:
     parse_xml
+    drain_xml
+    iter_records
+    discard_element
 
 Copyright Ian Vermes 2019
 """
 
+from helpers.source import (BytesSource, read_stream, xml_source,
+                            parse_source)
+
 from lxml import etree
 
 import functools
 
+# A bundle holds many document records under another root element.
+RECORD_TAG = "{*}document"
+BUNDLE_TAG = "{*}bundle"
+
 @functools.total_ordering
 class SortableCallable(type):
     """Create class objects that behave like functions and are sortable.
@@ -25,12 +35,39 @@ class SortableCallable(type):
     hence calls of __new__ and __init__ methods will be ignored.
 
     The class objects are sorted by their class attribute .key.
+
+    The class objects also validate XML held in memory by validate_bytes and
+    validate_stream, see helpers.source.
     """
 
     def __call__(clsobj, *arg, **kwargs):
         result = clsobj._veneer(*arg, **kwargs)
         return result
 
+    def validate_bytes(clsobj, data, name=None):
+        """Validate XML held in memory, see helpers.source.BytesSource.
+
+        Args:
+            data(bytes, bytearray, memoryview)
+        Kwargs:
+            name(str, None): The filename of the result.
+        Return:
+            ValidationResult
+        """
+        return clsobj._veneer(BytesSource(data, name=name))
+
+    def validate_stream(clsobj, stream, name=None):
+        """Validate XML read from a binary file-like object.
+
+        Args:
+            stream: Has a read method returning bytes.
+        Kwargs:
+            name(str, None): By default the name attribute of the stream.
+        Return:
+            ValidationResult
+        """
+        return clsobj._veneer(read_stream(stream, name=name))
+
     def __lt__(this_clsobj, other_clsobj):
         """Sort by the .key attribute."""
         return this_clsobj.key < other_clsobj.key
@@ -44,7 +81,7 @@ def parse_xml(filename, *args, **kwargs):
     """Convenience function of etree.parse, supporting pathlib.Path arguments.
 
     Arg:
-        filename (str, pathlib.Path)
+        filename (str, pathlib.Path, helpers.source.BytesSource)
         *args
     Kwargs:
         **kwargs
@@ -56,6 +93,75 @@ def parse_xml(filename, *args, **kwargs):
     elif isinstance(filename, etree._ElementTree):
         tree = filename
     else:
-        filename = str(filename)
-        tree = etree.parse(filename, *args, **kwargs)
+        tree = parse_source(filename, *args, **kwargs)
     return tree
+
+
+def has_tag(element, tag):
+    """Check if an element has a tag, where the namespace "{*}" matches any.
+
+    Comments & processing instructions have no tag.
+
+    Arg:
+        element (etree._Element)
+        tag (str)
+    Return:
+        bool
+    """
+    if not isinstance(element.tag, str):
+        return False
+    elif tag.startswith("{*}"):
+        return etree.QName(element).localname == tag[3:]
+    return element.tag == tag
+
+
+def drain_xml(filename, **kwargs):
+    """Parse a file for the errors it raises, without keeping the tree.
+
+    Elements are discarded once parsed, hence memory use does not grow with
+    the size of the file.
+
+    Arg:
+        filename (str, pathlib.Path)
+    Kwargs:
+        **kwargs: Passed to etree.iterparse.
+    Exceptions:
+        etree.XMLSyntaxError
+    """
+    context = etree.iterparse(xml_source(filename), events=("end",),
+                              **kwargs)
+    for _, element in context:
+        discard_element(element)
+
+
+def iter_records(filename, tag=RECORD_TAG):
+    """Yield each record of a file as it is parsed, discarding it after.
+
+    Memory use is bound by the size of a record rather than of the file. A
+    file without records yields its root element instead.
+
+    Arg:
+        filename (str, pathlib.Path)
+    Kwargs:
+        tag (str): The tag of a record element.
+    Yields:
+        etree._Element
+    Exceptions:
+        etree.XMLSyntaxError
+    """
+    context = etree.iterparse(xml_source(filename), events=("end",),
+                              tag=tag)
+    records = 0
+    for _, record in context:
+        yield record
+        discard_element(record)
+        records += 1
+    if records == 0:
+        yield context.root
+
+
+def discard_element(element):
+    """Free an element, and its preceding siblings, during an iterparse."""
+    element.clear(keep_tail=True)
+    while element.getprevious() is not None:
+        del element.getparent()[0]
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""Validation of the XML members of zip & tar archives, without extraction.
+
+The members of an archive are read one at a time, in the order they are
+stored, and each is handed on with its bytes as a helpers.source.BytesSource,
+hence a member is parsed from memory just as a file is parsed from disk.
+Results name a member by the path of its archive and its path within, e.g.
+"issue_1.zip/article_3.xml". An archive that cannot be read, e.g. as it is
+truncated, is handed on as an UnreadableArchive after any members read before
+the error, hence it fails alone rather than ending the run.
+
+Classes:
+    ArchiveMember
+    UnreadableArchive
+
+Functions:
+    is_archive
+    iter_members
+    expand_archives
+
+Copyright Ian Vermes 2019
+"""
+
+from helpers.result import ValidationResult, detach_cause
+from helpers.source import BytesSource
+import exceptions
+
+import fnmatch
+import lzma
+import posixpath
+import tarfile
+import zipfile
+import zlib
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2",
+                    ".tar.xz", ".txz")
+# Raised on reading a corrupt or truncated archive, by its format or codec.
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError,
+                  zlib.error, lzma.LZMAError)
+
+
+class ArchiveMember(BytesSource):
+    """A file within an archive, with its bytes.
+
+    Args:
+        archive(str, pathlib.Path): The archive filename.
+        name(str): The path of the member within the archive.
+        data(bytes): The content of the member.
+
+    Attrs:
+        archive(str)
+        name(str)
+        data(bytes)
+    """
+
+    __slots__ = ("archive", )
+
+    def __init__(self, archive, name, data):
+        super().__init__(data, name=name)
+        self.archive = str(archive)
+
+    def __str__(self):
+        return f"{self.archive}/{self.name}"
+
+    def __reduce__(self):
+        return (self.__class__, (self.archive, self.name, self.data))
+
+
+class UnreadableArchive(object):
+    """An archive that could not be read, in place of its unread members.
+
+    Args:
+        archive(str, pathlib.Path): The archive filename.
+        error(Exception): The error raised on reading it, see ARCHIVE_ERRORS.
+
+    Methods:
+        to_result
+
+    Attrs:
+        archive(str)
+        error(Exception)
+    """
+
+    __slots__ = ("archive", "error")
+
+    def __init__(self, archive, error):
+        self.archive = str(archive)
+        self.error = error
+
+    def __str__(self):
+        return self.archive
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return f"<{name} {self.archive!r} {self.error!r}>"
+
+    def __reduce__(self):
+        # The error may hold an unpicklable stream.
+        return (self.__class__, (self.archive, detach_cause(self.error)))
+
+    def to_result(self):
+        """Get the failing ValidationResult of the archive, see Passing.FAILS.
+
+        Return:
+            ValidationResult: The exception is caused by the error.
+        """
+        exc = exceptions.ValidationError()
+        exc.__cause__ = self.error
+        return ValidationResult(self.archive, exc)
+
+
+def is_archive(filename):
+    """Check if a filename has the suffix of a zip or tar archive."""
+    return str(filename).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_members(filename, include=("*.xml", ), exclude=()):
+    """Yield the members of an archive, reading one at a time.
+
+    A tar archive is read as a stream, hence a compressed tar is decompressed
+    once whatever the number of members.
+
+    Args:
+        filename(str, pathlib.Path): A zip or tar archive, see is_archive.
+    Kwargs:
+        include(iterable): Glob patterns, a member is yielded if its name
+            matches any.
+        exclude(iterable): Glob patterns, a member is skipped if its name,
+            or its path within the archive, matches any.
+    Yields:
+        ArchiveMember
+    Exceptions:
+        zipfile.BadZipFile
+        tarfile.TarError
+        Any other of ARCHIVE_ERRORS, e.g. EOFError of a truncated tar.gz.
+    """
+    def wanted(path):
+        name = posixpath.basename(path)
+        return (any(fnmatch.fnmatch(name, pattern) for pattern in include)
+                and not any(fnmatch.fnmatch(name, pattern)
+                            or fnmatch.fnmatch(path, pattern)
+                            for pattern in exclude))
+
+    if str(filename).lower().endswith(".zip"):
+        with zipfile.ZipFile(filename) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and wanted(info.filename):
+                    yield ArchiveMember(filename, info.filename,
+                                        archive.read(info))
+    else:
+        with tarfile.open(filename, mode="r|*") as archive:
+            for info in archive:
+                if info.isfile() and wanted(info.name):
+                    # A stream must be read before the next member.
+                    with archive.extractfile(info) as handle:
+                        data = handle.read()
+                    yield ArchiveMember(filename, info.name, data)
+
+
+def expand_archives(filenames, include=("*.xml", ), exclude=()):
+    """Yield the filenames, with each archive replaced by its members.
+
+    The members of an archive that cannot be read are followed by an
+    UnreadableArchive, rather than an error.
+
+    Args:
+        filenames(iterable): str or pathlib.Path items.
+    Kwargs:
+        include(iterable): See iter_members.
+        exclude(iterable): See iter_members.
+    Yields:
+        str, pathlib.Path, ArchiveMember or UnreadableArchive
+    """
+    include = tuple(include)
+    exclude = tuple(exclude)
+    for filename in filenames:
+        if is_archive(filename):
+            try:
+                yield from iter_members(filename, include=include,
+                                        exclude=exclude)
+            except ARCHIVE_ERRORS as err:
+                yield UnreadableArchive(filename, err)
+        else:
+            yield filename
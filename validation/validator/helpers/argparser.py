@@ -6,8 +6,12 @@
 Copyright Ian Vermes 2018
 """
 
+from helpers.path import iter_files
+from helpers.archive import is_archive, expand_archives
+
 import argparse as py_argparse
 
+import itertools
 import os
 import pathlib
 
@@ -22,18 +26,21 @@ class NextGenArgParse(object):
     The file paths should be XML files, though the .xml file extension is not
     essential.
 
-    The directory path should contain XML files with .xml file extensions at the
-    next directory level. The search for .xml files is not recursive and hence
-    will not search through subdirectories.
+    The directory path should contain XML files with .xml file extensions. The
+    search is recursive unless --no-recurse is given, and the files it finds
+    are selected with --include & --exclude glob patterns.
+
+    The file paths may also be zip or tar archives, whose members are
+    selected by the same patterns and validated without extraction.
     """
 
     GLOB_PATTERN = "*.xml"
 
     @classmethod
     def searchdirectory(cls, filename):
-        """Search a directory and retrieve xml files within."""
-        path = pathlib.Path(filename)
-        files = list(path.glob(cls.GLOB_PATTERN))
+        """Search a directory and retrieve xml files within, not recursively."""
+        files = list(iter_files([filename], include=[cls.GLOB_PATTERN],
+                                recursive=False))
         return files
 
     @classmethod
@@ -42,20 +49,16 @@ class NextGenArgParse(object):
         filepath = pathlib.Path(filename)
         if filepath.exists():
             if filepath.is_dir():
-                xmls = list(filepath.glob(cls.GLOB_PATTERN))
-                if len(xmls) > 0:
-                    return_obj = filepath
-                else:
-                    msg = (f"Got a directory '{str(filepath)}' which does not "
-                           "contain any files that match the "
-                           f"'{cls.GLOB_PATTERN}' pattern.")
-                    return_obj = py_argparse.ArgumentTypeError(msg)
+                # Searched once, by get_args, for files matching --include.
+                return_obj = filepath
             elif filepath.is_file():
-                if filepath.suffix in cls.GLOB_PATTERN:
+                if (filepath.suffix in cls.GLOB_PATTERN
+                        or is_archive(filepath)):
                     return_obj = filepath
                 else:
                     msg = (f"Got a file '{str(filepath)}' which does not "
-                           f"satisfy the '{cls.GLOB_PATTERN}' pattern.")
+                           f"satisfy the '{cls.GLOB_PATTERN}' pattern and "
+                           "is not an archive.")
                     return_obj = py_argparse.ArgumentTypeError(msg)
             else:
                 return_obj = TypeError(filepath)
@@ -68,6 +71,19 @@ class NextGenArgParse(object):
         else:
             return return_obj
 
+    @classmethod
+    def is_positive_int(cls, string):
+        """Validate that the string is a whole number greater than zero."""
+        try:
+            value = int(string)
+        except ValueError:
+            value = 0
+        if value < 1:
+            msg = f"Got '{string}' but expected a whole number greater than 0."
+            raise py_argparse.ArgumentTypeError(msg)
+        else:
+            return value
+
     def _make_parser(self):
         description = 'Validate XML in a directory against a schema and python encoded rules.'
         parser = py_argparse.ArgumentParser(description=description)
@@ -82,37 +98,122 @@ class NextGenArgParse(object):
                             dest='testmode',
                             action='store_true',
                             help="If provided run in testmode")
+        parser.add_argument("-j", "--jobs",
+                            dest="jobs",
+                            metavar="N",
+                            default=1,
+                            type=lambda x: self.is_positive_int(x),
+                            help="Validate with N worker processes (default: 1)")
+        parser.add_argument("--no-cache",
+                            dest="cache",
+                            action="store_false",
+                            help=("Revalidate every file rather than reuse "
+                                  "results cached by previous runs"))
+        parser.add_argument("--stream",
+                            dest="stream",
+                            action="store_true",
+                            help=("Validate without holding whole documents "
+                                  "in memory, for very large files"))
+        parser.add_argument("--report",
+                            dest="report",
+                            metavar="FILE",
+                            default=None,
+                            type=pathlib.Path,
+                            help=("Write a JSON line per file to FILE as "
+                                  "each file is validated"))
+        parser.add_argument("--summary",
+                            dest="summary",
+                            metavar="FILE",
+                            default=None,
+                            type=pathlib.Path,
+                            help=("Write a JSON line per distinct error to "
+                                  "FILE, with the files failing with it"))
+        parser.add_argument("--include",
+                            dest="include",
+                            metavar="PATTERN",
+                            action="append",
+                            default=None,
+                            help=("Validate files in directories & archives "
+                                  "whose names match PATTERN, repeatable "
+                                  f"(default: {self.GLOB_PATTERN}); archives "
+                                  "within directories need a pattern too, "
+                                  "e.g. *.zip"))
+        parser.add_argument("--exclude",
+                            dest="exclude",
+                            metavar="PATTERN",
+                            action="append",
+                            default=[],
+                            help=("Skip files & directories whose names, or "
+                                  "paths within the searched directory, match "
+                                  "PATTERN, repeatable"))
+        parser.add_argument("--no-recurse",
+                            dest="recurse",
+                            action="store_false",
+                            help="Only search the top level of directories")
+        parser.add_argument("--journal",
+                            dest="journal",
+                            metavar="FILE",
+                            default=None,
+                            type=pathlib.Path,
+                            help=("Journal each validated file to FILE, so "
+                                  "that an interrupted run may be resumed"))
+        parser.add_argument("--resume",
+                            dest="resume",
+                            action="store_true",
+                            help=("Skip the files the --journal FILE records "
+                                  "as validated with the same schemas & "
+                                  "rules, and add to the --report FILE"))
+        parser.add_argument("--watch",
+                            dest="watch",
+                            action="store_true",
+                            help=("After validating, keep watching the paths "
+                                  "and revalidate each file created or "
+                                  "modified, until Ctrl-C"))
+        parser.add_argument("--poll",
+                            dest="poll",
+                            action="store_true",
+                            help=("Watch by polling for changes rather than "
+                                  "with inotify, e.g. on network shares"))
         return parser
 
     def get_args(self, search_dirs=True):
         """Get the argument object parsed from the command line args.
 
+        The positional arguments are kept as given, a list of pathlib.Path
+        items, as the xmls attribute.
+
         kwargs:
-            search_dirs (bool): By default, directory positional arguments are
-                replaced with a series of XML files found within the directory.
-                Otherwise the directory will be left untouched.
+            search_dirs (bool): By default, the XML files found within
+                directories & archives are given as the files attribute, a
+                one-shot iterator that searches as it is consumed, see
+                helpers.path.iter_files and helpers.archive.expand_archives.
+                Otherwise there is no files attribute.
         return:
             argparse.Namespace
         """
         parser = self._make_parser()
         args = parser.parse_args()
+        if args.resume and args.journal is None:
+            parser.error("--resume needs a --journal FILE.")
+        if args.include is None:
+            args.include = [self.GLOB_PATTERN]
         if search_dirs:
-            # Add files to a new list, clear and replace the original list.
-            new_list = []
-            for path in args.xmls:
-                if path.is_dir():
-                    files = self.searchdirectory(path)
-                    new_list.extend(files)
-                elif path.is_file():
-                    new_list.append(path)
-            args.xmls.clear()
-            for path in new_list:
-                args.xmls.append(path)
+            # Files are found as they are validated, though the first is
+            # sought now so that a search finding nothing is an error.
+            files = iter_files(args.xmls, include=args.include,
+                               exclude=args.exclude, recursive=args.recurse)
+            files = expand_archives(files, include=args.include,
+                                    exclude=args.exclude)
+            first = next(files, None)
+            if first is None:
+                patterns = ", ".join(f"'{p}'" for p in args.include)
+                parser.error("Got no files that match the "
+                             f"{patterns} pattern(s).")
+            args.files = itertools.chain([first], files)
             return args
         else:
             return args
 
-
 if __name__ == '__main__':
     import sys
     import pprint
@@ -129,6 +230,7 @@ if __name__ == '__main__':
         print("*** Use better testing args!")
         raise
     else:
+        args_search.files = list(args_search.files)
         detail_search = pprint.pformat(vars(args_search), indent=4)
         detail_nosearch = pprint.pformat(vars(args_no_search), indent=4)
         MSG_ARGSSEARCH = ("*** The processed args (search_dirs=True) are:"
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""A persistent, content-addressed store of validation results.
+
+Files are keyed by a hash of their bytes, hence an unchanged file is not
+revalidated on the next run. Each entry is stamped with a fingerprint of the
+schema (and any other validation resource) so a change to those resources
+invalidates every entry made against the old ones.
+
+Classes:
+    ResultCache
+
+Functions:
+    hash_file
+    get_fingerprint
+
+Copyright Ian Vermes 2019
+"""
+
+from helpers.result import ValidationResult, detach_cause
+from helpers.corpus import DocumentKeys
+from helpers.source import BytesSource, open_binary
+import exceptions
+
+import hashlib
+import json
+import os
+import sqlite3
+
+_CHUNK_SIZE = 1 << 20
+# Stand in for the filename in stored messages, entries are shared by every
+# file with the same content.
+_PATH_TOKEN = "\x1fpath\x1f"
+_NAME_TOKEN = "\x1fname\x1f"
+
+
+def hash_file(filename):
+    """Get the hex digest of the file's bytes.
+
+    Args:
+        filename(str, pathlib.Path, helpers.source.BytesSource)
+    Return:
+        str
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(filename, BytesSource):
+        # Hash the buffer in place, it may be a memory map.
+        digest.update(filename.data)
+        return digest.hexdigest()
+    with open_binary(filename) as handle:
+        for chunk in iter(lambda: handle.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_fingerprint(*filenames, extra=()):
+    """Get a digest identifying the files & values a verdict depends upon.
+
+    Args:
+        *filenames(str, pathlib.Path): e.g. the schema file.
+    Kwargs:
+        extra(iterable): str values e.g. a rule set version.
+    Return:
+        str
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for filename in filenames:
+        digest.update(hash_file(filename).encode())
+    for value in extra:
+        digest.update(str(value).encode())
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    """An SQLite backed cache of validation results.
+
+    Entries made under a different fingerprint are purged when the cache is
+    opened. Several processes may open the same file at once.
+
+    Args:
+        filename(str, pathlib.Path): SQLite database file.
+        fingerprint(str): See get_fingerprint.
+
+    Methods:
+        digest
+        get
+        get_keys
+        put
+        close
+    """
+
+    # Bump on changing _SCHEMA, the old table is then dropped on connecting.
+    _VERSION = 5
+    _SCHEMA = ("CREATE TABLE IF NOT EXISTS results ("
+               "digest TEXT PRIMARY KEY, fingerprint TEXT, passing INTEGER, "
+               "exc_name TEXT, exc_message TEXT, cause_name TEXT, "
+               "cause_message TEXT, lineno INTEGER, column INTEGER, "
+               "cause_code TEXT, cause_path TEXT, keys TEXT)")
+
+    def __init__(self, filename, fingerprint):
+        self.filename = str(filename)
+        self.fingerprint = fingerprint
+        self._connection = self._connect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _connect(self):
+        # A generous timeout as worker processes may share the file.
+        connection = sqlite3.connect(self.filename, timeout=60)
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            version, = connection.execute("PRAGMA user_version").fetchone()
+            if version != self._VERSION:
+                connection.execute("DROP TABLE IF EXISTS results")
+                connection.execute(f"PRAGMA user_version={self._VERSION}")
+            connection.execute(self._SCHEMA)
+            connection.execute("DELETE FROM results WHERE fingerprint != ?",
+                               (self.fingerprint,))
+        return connection
+
+    def digest(self, filename):
+        """Get the key of a file, see hash_file."""
+        return hash_file(filename)
+
+    def get(self, filename, digest):
+        """Get the cached result for a file or None if there is no entry.
+
+        Messages name this file, not the one the entry was made from.
+
+        Args:
+            filename(str, pathlib.Path): Becomes the filename of the result.
+            digest(str): See ResultCache.digest.
+        Return:
+            ValidationResult or None
+        """
+        query = ("SELECT exc_name, exc_message, cause_name, cause_message, "
+                 "lineno, column, cause_code, cause_path FROM results "
+                 "WHERE digest = ? AND fingerprint = ?")
+        row = self._connection.execute(query,
+                                       (digest, self.fingerprint)).fetchone()
+        if row is None:
+            return None
+        (exc_name, exc_message, cause_name, cause_message, lineno, column,
+         code, path) = row
+        exc_message = _fill_filename(exc_message, filename)
+        cause_message = _fill_filename(cause_message, filename)
+        if exc_name is None:
+            exception = None
+        else:
+            exc_type = getattr(exceptions, exc_name)
+            exception = exc_type(exc_message) if exc_message else exc_type()
+            if cause_name is not None:
+                exception.__cause__ = exceptions.DetachedCause(
+                    cause_message, cause_name, lineno, column, code=code,
+                    path=path)
+        return ValidationResult(filename, exception)
+
+    def get_keys(self, digest):
+        """Get the cached document keys of a file, see helpers.corpus.
+
+        Args:
+            digest(str): See ResultCache.digest.
+        Return:
+            list or None: DocumentKeys, None if there are none cached.
+        """
+        query = "SELECT keys FROM results WHERE digest = ? AND fingerprint = ?"
+        row = self._connection.execute(query,
+                                       (digest, self.fingerprint)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return [DocumentKeys(*values) for values in json.loads(row[0])]
+
+    def put(self, digest, result, keys=None):
+        """Store the result of validating the file with this digest.
+
+        The filename is cut from the messages, see ResultCache.get.
+
+        Args:
+            digest(str): See ResultCache.digest.
+            result(ValidationResult)
+        Kwargs:
+            keys(list, None): The DocumentKeys of the file.
+        """
+        exception = result.exception
+        exc_name = exc_message = None
+        cause_name = cause_message = lineno = column = code = path = None
+        if exception is not None:
+            exc_name = type(exception).__name__
+            exc_message = _strip_filename(str(exception), result.filename)
+            cause = detach_cause(exception.__cause__)
+            if cause is not None:
+                cause_name = cause.name
+                cause_message = _strip_filename(cause.message, result.filename)
+                lineno, column = cause.lineno, cause.column
+                code, path = cause.code, cause.path
+        keys = None if keys is None else json.dumps(keys)
+        row = (digest, self.fingerprint, result.enum.value, exc_name,
+               exc_message, cause_name, cause_message, lineno, column, code,
+               path, keys)
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO results VALUES "
+                                     "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     row)
+
+    def close(self):
+        self._connection.close()
+
+
+def _strip_filename(message, filename):
+    """Replace the path, then the base name, of the file with tokens."""
+    if message is None:
+        return None
+    path = str(filename)
+    message = message.replace(path, _PATH_TOKEN)
+    name = os.path.basename(path)
+    if name:
+        message = message.replace(name, _NAME_TOKEN)
+    return message
+
+
+def _fill_filename(message, filename):
+    """Undo _strip_filename for the file being looked up."""
+    if message is None:
+        return None
+    path = str(filename)
+    return (message.replace(_PATH_TOKEN, path)
+            .replace(_NAME_TOKEN, os.path.basename(path)))
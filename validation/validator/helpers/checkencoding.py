@@ -4,34 +4,221 @@
 
 
 Classes:
+    validate_encoding
     EncodingOperations
 
+Functions:
+    raise_if_mismatched_encodings
+
 Copyright Ian Vermes 2018
 """
 
 from helpers.result import ValidationResult
+from helpers.enum import Passing
+from helpers._check_shared import SortableCallable
+from helpers.source import BytesSource, open_binary
 import exceptions
 
 import chardet
 from lxml import etree
 
+import codecs
+import copy
+import io
 import os
 import enum
 import re
 import itertools
 
+# Byte order marks and the encoding chardet names on finding them, in the
+# order chardet checks them.
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, "UTF-8-SIG"),
+    ((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE), "UTF-32"),
+    (b"\xFE\xFF\x00\x00", "X-ISO-10646-UCS-4-3412"),
+    (b"\x00\x00\xFF\xFE", "X-ISO-10646-UCS-4-2143"),
+    ((codecs.BOM_LE, codecs.BOM_BE), "UTF-16"))
+# ASCII sequences that make chardet probe for escape based encodings.
+_ESCAPE_SEQUENCES = (b"\x1b", b"~{")
+_SNIFFABLE_ENCODINGS = frozenset(["ascii"] + [e for _, e in _BOM_ENCODINGS])
+_NON_ASCII = "non-ascii"
+_AMBIGUOUS = object()
+# Bytes of a memory map copied at a time by the scan for non-ASCII bytes.
+_ASCII_CHUNK = 1 << 20
+
+
+class validate_encoding(metaclass=SortableCallable):
+    """Check that the declared encoding of an XML file matches its content.
+
+    This is the first pipeline stage. It reads the buffer of the file, without
+    parsing it, see raise_if_mismatched_encodings.
+
+    Attr:
+        key(Passing enum): This is a sortable function-like class.
+    Arg:
+        filename(str, pathlib.Path, BytesSource)
+    Return:
+        ValidationResult
+    """
+
+    key = Passing.ENCODING
+
+    @classmethod
+    def _veneer(cls, filename):
+        result, _ = _validate_encoding(filename)
+        return result
+
+    @classmethod
+    def pipe(cls, filename, tree=None, stream=False):
+        """Validate and hand any tree on to the next pipeline stage.
+
+        Args:
+            filename(str, pathlib.Path, BytesSource)
+            tree(None): Encoding is the first stage, so there is no tree.
+        Kwargs:
+            stream(bool): Ignored, the encodings are checked without a tree.
+        Return:
+            ValidationResult, None
+        """
+        result, _ = _validate_encoding(filename)
+        return result, tree
+
+
+def _validate_encoding(filename):
+    try:
+        try:
+            raise_if_mismatched_encodings(filename)
+        except exceptions.EncodingOperationError as cause:
+            raise exceptions.EncodingValidationError() from cause
+    except exceptions.EncodingValidationError as exc:
+        exception = exc
+    else:
+        exception = None
+    return ValidationResult(filename, exception), None
+
+
+def raise_if_mismatched_encodings(filename, fastpath=True):
+    """Raises an exceptions if the zeroth line encoding & rest of file mismatch.
+
+    The encodings are those chardet would detect. By default they are first
+    sniffed from byte order marks and a scan for non-ASCII bytes, which is how
+    chardet itself settles the common cases, and chardet only runs when that
+    is ambiguous. Both paths give the same verdict.
+
+    The buffer of a BytesSource is sniffed in place, hence a memory mapped
+    file is not copied, see helpers.source.load_file.
+
+    Args:
+        filename(str, pathlib.Path, BytesSource)
+    Kwargs:
+        fastpath(bool): If False always detect the encodings with chardet.
+    Exceptions:
+        exceptions.EncodingOperationError
+    """
+    if fastpath and isinstance(filename, BytesSource):
+        zeroth_enc, rest_enc = _sniff_encodings(filename.data)
+    else:
+        with open_binary(filename) as handle:
+            if fastpath:
+                zeroth_enc, rest_enc = _sniff_encodings(handle.read())
+            else:
+                zeroth_enc, rest_enc = _detect_encodings(handle)
+
+    if zeroth_enc != rest_enc:
+        msg = ("The file encoding in the declaration and the encoding differ: "
+               f"zeroth line={zeroth_enc} & other lines={rest_enc}.")
+        raise exceptions.EncodingOperationError(msg)
+
+
+def _detect_encodings(handle):
+    # Get zeroth line encoding
+    line = handle.readline()
+    zeroth_enc = chardet.detect(line)["encoding"]
+    # Get encoding of the rest of the file.
+    rest_enc = _detect_lines_encoding(handle)
+    return zeroth_enc, rest_enc
+
+
+def _detect_lines_encoding(lines):
+    detector = chardet.UniversalDetector()
+    for line in lines:
+        detector.feed(line)
+        if detector.done:
+            break
+    detector.close()
+    return detector.result["encoding"]
+
+
+def _sniff_encodings(raw):
+    # The buffer may be bytes or a memory map, so only the zeroth line is
+    # sliced from it and the rest is read from an offset.
+    newline = raw.find(b"\n")
+    start = len(raw) if newline == -1 else newline + 1
+    line = raw[:start]
+    zeroth_enc = _sniff_encoding(line)
+    if zeroth_enc is _AMBIGUOUS:
+        zeroth_enc = chardet.detect(line)["encoding"]
+    rest_enc = _sniff_encoding(raw, start)
+    if rest_enc is _AMBIGUOUS:
+        if zeroth_enc in _SNIFFABLE_ENCODINGS:
+            # chardet never names non-ASCII bytes without a BOM as one of
+            # these, so the encodings differ whatever chardet would say.
+            rest_enc = _NON_ASCII
+        else:
+            rest_enc = _detect_lines_encoding(io.BytesIO(raw[start:]))
+    return zeroth_enc, rest_enc
+
+
+def _sniff_encoding(raw, start=0):
+    """Get the encoding chardet would detect, if it is certain without chardet.
+
+    Args:
+        raw(bytes, mmap.mmap)
+    Kwargs:
+        start(int): The offset at which to begin.
+    Return:
+        str, None or _AMBIGUOUS
+    """
+    if start >= len(raw):
+        return None
+    head = raw[start:start + 4]
+    for boms, encoding in _BOM_ENCODINGS:
+        if head.startswith(boms):
+            return encoding
+    if (_isascii(raw, start)
+            and not any(raw.find(seq, start) != -1
+                        for seq in _ESCAPE_SEQUENCES)):
+        return "ascii"
+    return _AMBIGUOUS
+
+
+def _isascii(raw, start=0):
+    if isinstance(raw, bytes):
+        return raw[start:].isascii() if start else raw.isascii()
+    return all(raw[i:i + _ASCII_CHUNK].isascii()
+               for i in range(start, len(raw), _ASCII_CHUNK))
+
 
 class EncodingOperations(object):
     """A collection of operations for examining file encodingsself.
 
+    Attrs:
+        CHUNK_SIZE(int): Bytes read at a time when streaming a file.
+        CONFIDENCE(float): chardet confidence at which streaming stops.
+
     Methods:
         get_detected_and_declared_encoding
         detect_file_encoding
+        stream_file_encoding
         grep_declaration_encoding
     """
 
+    CHUNK_SIZE = 1 << 16
+    CONFIDENCE = 0.95
+
     @classmethod
-    def get_detected_and_declared_encoding(cls, filename, return_declaration=False):
+    def get_detected_and_declared_encoding(cls, filename, return_declaration=False,
+                                           stream=False):
         """Get the 'chardet' detected encoding and the one in the delcaration.
 
         Get the file encoding by interpreting the bytestream and reading
@@ -43,18 +230,23 @@ class EncodingOperations(object):
             filname(str)
         Kwargs:
             return_declaration(bool): False by defaultself.
+            stream(bool): If True read the file in chunks, see
+                stream_file_encoding, otherwise read it whole.
 
         Return:
             str, str
         or with kwarg
             str, str, str
         """
-        with open(filename, "rb") as handle:
-            raw_file = handle.read()
-            handle.seek(0, 0)
-            raw_line = handle.readline()
+        if stream:
+            dectected_enc, raw_line = cls.stream_file_encoding(filename)
+        else:
+            with open(filename, "rb") as handle:
+                raw_file = handle.read()
+                handle.seek(0, 0)
+                raw_line = handle.readline()
 
-        dectected_enc = cls.detect_file_encoding(raw_file).lower()
+            dectected_enc = cls.detect_file_encoding(raw_file).lower()
 
         try:
             line = raw_line.decode(dectected_enc)
@@ -98,6 +290,59 @@ class EncodingOperations(object):
                 detected_enc = replacement_enc
         return detected_enc
 
+    @classmethod
+    def stream_file_encoding(cls, filename, chunk_size=None, confidence=None):
+        """Get the 'chardet' detected encoding and zeroth line, reading in chunks.
+
+        Chunks are fed to chardet until its confidence in an encoding reaches
+        the threshold or the file ends, hence memory use is bounded by the
+        chunk size whatever the size of the file. Pure ASCII is only confirmed
+        at the end of the file. The zeroth line is taken from the first chunk,
+        which is all of it if the chunk has no linebreak.
+
+        Like detect_file_encoding, 'ascii' is reported as 'utf-8'.
+
+        Args:
+            filename(str, pathlib.Path)
+        Kwargs:
+            chunk_size(int): Defaults to EncodingOperations.CHUNK_SIZE.
+            confidence(float): Defaults to EncodingOperations.CONFIDENCE.
+        Return:
+            str, bytes
+        """
+        if chunk_size is None:
+            chunk_size = cls.CHUNK_SIZE
+        if confidence is None:
+            confidence = cls.CONFIDENCE
+        detector = chardet.UniversalDetector()
+        with open(filename, "rb") as handle:
+            chunk = handle.read(chunk_size)
+            linebreak = chunk.find(b"\n")
+            if linebreak == -1:
+                raw_line = chunk
+            else:
+                raw_line = chunk[:linebreak + 1]
+            while chunk and not detector.done:
+                detector.feed(chunk)
+                if cls._get_interim_confidence(detector) >= confidence:
+                    break
+                chunk = handle.read(chunk_size)
+        detector.close()
+        detected_enc = detector.result["encoding"].lower()
+        if detected_enc == "ascii":
+            # Pure ASCII always decodes as UTF-8.
+            detected_enc = "utf-8"
+        return detected_enc, raw_line
+
+    @staticmethod
+    def _get_interim_confidence(detector):
+        # chardet only gives a confidence on close, hence close a copy. ASCII
+        # so far is not confidence, as a later chunk may not be.
+        result = copy.deepcopy(detector).close()
+        if result["encoding"] in (None, "ascii"):
+            return 0.0
+        return result["confidence"]
+
     @classmethod
     def grep_declaration_encoding(cls, string, strict=True):
         """Get the encoding substring from the declaration string.
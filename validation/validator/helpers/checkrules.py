@@ -2,20 +2,275 @@
 # -*- coding: utf-8 -*-
 """A collection of classes & functions for validating XML against special rules.
 
+Each rule is registered on the tag of the JJS elements it inspects. A Rulebook
+indexes its rules by tag and hands an element only to the rules registered for
+its tag. The elements are found by one XPath, compiled from the tests of every
+rule, with a branch per tag: the document is scanned once per tag rather than
+once per rule, and only elements that some rule must see reach Python.
 
 Classes:
-    SchemaOperations
+    Rule
+    ReferenceRule
+    Rulebook
+    validate_rules
 
 Functions:
-    validate_rules
+    check_rules
+    get_rules_fingerprint
 
 Copyright Ian Vermes 2019
 """
 
 from helpers.result import ValidationResult
+from helpers.enum import Passing
+from helpers._check_shared import SortableCallable, parse_xml, iter_records
 import exceptions
 
+from lxml import etree
+
+NAMESPACES = {"jjs": "https://www.jjs-online.net"}
+
+
+class Rule(object):
+    """A rule for the elements with a given tag.
+
+    Args:
+        name(str): Unique & short, e.g. "page-range-order".
+        tag(str): The local name, in the JJS namespace, of the elements the
+            rule inspects.
+        test(str): XPath, with the element as context node, that is true
+            when the element breaks the rule. Compiled once.
+        message(str): What the rule requires, for reporting.
+
+    Methods:
+        begin
+        visit
+        end
+
+    Attrs:
+        tags
+        predicate: XPath, true for the elements the rule must visit.
+        definition
+    """
+
+    def __init__(self, name, tag, test, message):
+        self.name = name
+        self.tags = (tag, )
+        self.predicate = test
+        self.message = message
+        self.definition = (name, tag, test)
+        self._test = etree.XPath(test, namespaces=NAMESPACES)
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return f"<{name} {self.name!r}>"
+
+    def begin(self):
+        """Get the state the rule keeps while walking one document."""
+        return None
+
+    def visit(self, element, tag, state):
+        """Inspect an element with one of the rule's tags.
+
+        Args:
+            element(etree._Element)
+            tag(str): The local name of the element.
+            state: See begin.
+        Return:
+            list: The nodes that break the rule.
+        """
+        return [element] if self._test(element) else []
+
+    def end(self, state):
+        """Get the nodes that break the rule once the walk is over."""
+        return []
+
+
+class ReferenceRule(Rule):
+    """A rule that each reference resolves to an identifier in the document.
+
+    References & identifiers are gathered during the walk and matched with a
+    set at its end, rather than searching the document once per reference.
+
+    Args:
+        name(str)
+        tag(str): The local name of the referring elements.
+        attribute(str): The attribute holding the reference.
+        target_tag(str): The local name of the identified elements.
+        target_attribute(str): The attribute holding the identifier.
+        message(str)
+    """
+
+    def __init__(self, name, tag, attribute, target_tag, target_attribute,
+                 message):
+        self.name = name
+        self.tags = (tag, target_tag)
+        self.predicate = "true()"
+        self.message = message
+        self.definition = (name, tag, attribute, target_tag, target_attribute)
+        self._tag = tag
+        self._attribute = attribute
+        self._target_tag = target_tag
+        self._target_attribute = target_attribute
+
+    def begin(self):
+        references, targets = [], set()
+        return references, targets
+
+    def visit(self, element, tag, state):
+        references, targets = state
+        if tag == self._tag:
+            reference = element.get(self._attribute)
+            if reference is not None:
+                references.append((reference, element))
+        if tag == self._target_tag:
+            targets.add(element.get(self._target_attribute))
+        return []
+
+    def end(self, state):
+        references, targets = state
+        return [element for reference, element in references
+                if reference not in targets]
+
+
+class Rulebook(object):
+    """Rules indexed by tag, whose elements are found by one compiled XPath.
+
+    The XPath is the union of a branch per tag, hence libxml2 scans the
+    document once per tag rather than once per rule. Each element found is
+    handed only to the rules registered for its tag.
+
+    Args:
+        rules(iterable): Rule instances.
+
+    Methods:
+        check
+        fingerprint
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._by_tag = {}
+        for rule in self.rules:
+            for tag in rule.tags:
+                self._by_tag.setdefault(tag, []).append(rule)
+        self._walk = etree.XPath(self._get_walk_path(), namespaces=NAMESPACES)
+
+    def _get_walk_path(self):
+        # Select an element when any rule for its tag needs to see it. The
+        # union of name tests is faster in libxml2 than one test of names.
+        branches = []
+        for tag, rules in self._by_tag.items():
+            predicates = " or ".join(f"({rule.predicate})" for rule in rules)
+            branches.append(f"descendant-or-self::jjs:{tag}[{predicates}]")
+        if not branches:
+            return "/.."
+        return " | ".join(branches)
+
+    def check(self, root):
+        """Get the violations of the rules by a document.
+
+        Args:
+            root(etree._Element): The root of a document.
+        Return:
+            list: exceptions.RuleViolation instances.
+        """
+        states = {rule: rule.begin() for rule in self.rules}
+        found = []
+        for element in self._walk(root):
+            tag = element.tag.rpartition("}")[2]
+            for rule in self._by_tag[tag]:
+                for node in rule.visit(element, tag, states[rule]):
+                    found.append(_violation(rule, node))
+        for rule in self.rules:
+            for node in rule.end(states[rule]):
+                found.append(_violation(rule, node))
+        return found
+
+    def fingerprint(self):
+        """Get values identifying the rules, see helpers.cache."""
+        return [value for rule in self.rules for value in rule.definition]
+
+
+RULEBOOK = Rulebook([
+    Rule("page-range-order", "page-range",
+         "number(jjs:fpage) > number(jjs:lpage)",
+         "The fpage must not be after the lpage."),
+    ReferenceRule("affref-exists",
+                  "author", "affref",
+                  "aff", "affid",
+                  "The affref must match the affid of an aff."),
+])
+
+
+def check_rules(root, rulebook=RULEBOOK):
+    """Get the violations of the rules by a document, see Rulebook.check."""
+    return rulebook.check(root)
+
+
+def get_rules_fingerprint(rulebook=RULEBOOK):
+    """Get values identifying the rules, for helpers.cache.get_fingerprint."""
+    return rulebook.fingerprint()
+
+
+def _violation(rule, element):
+    return exceptions.RuleViolation(rule.message, rule.name,
+                                    element.sourceline)
+
+
+class validate_rules(metaclass=SortableCallable):
+    """Check that an XML file satisfies the rules beyond the scope of XSD.
+
+    Attr:
+        key(Passing enum): This is a sortable function-like class.
+    Arg:
+        filename(str, pathlib.Path)
+    Return:
+        ValdiationResult
+    """
+
+    key = Passing.RULES
+
+    @classmethod
+    def _veneer(cls, filename):
+        result, _ = _validate_rules(filename)
+        return result
+
+    @classmethod
+    def pipe(cls, filename, tree=None, stream=False):
+        """Check a tree parsed by an earlier stage, parsing only if absent.
+
+        Args:
+            filename(str, pathlib.Path)
+            tree(etree._ElementTree, None)
+        Kwargs:
+            stream(bool): If True and there is no tree, check the file one
+                record at a time, see iter_records.
+        Return:
+            ValidationResult, etree._ElementTree or None
+        """
+        return _validate_rules(filename, tree=tree, stream=stream)
+
 
-def validate_rules(filename):
-    exception = exceptions.RuleValidationError("Not yet written")
-    return ValidationResult(filename, exception)
+def _validate_rules(filename, tree=None, stream=False):
+    if tree is None and stream:
+        roots = iter_records(filename)
+    else:
+        if tree is None:
+            tree = parse_xml(filename)
+        roots = [tree.getroot()]
+    # Each record is checked before the next is parsed.
+    violations = []
+    for root in roots:
+        violations.extend(check_rules(root))
+    try:
+        if violations:
+            lines = "\n".join(str(violation) for violation in violations)
+            msg = f"{len(violations)} rule violation(s):\n{lines}"
+            raise exceptions.RuleValidationError(msg) from violations[0]
+    except exceptions.RuleValidationError as exc:
+        exception = exc
+    else:
+        exception = None
+    result = ValidationResult(filename, exception)
+    return result, tree
@@ -7,20 +7,31 @@ Classes:
     SchemaOperations
     validate_schema
 
+Functions:
+    validate_tree
+    validate_records
+
 Copyright Ian Vermes 2019
 """
 
 from helpers.result import ValidationResult
 from helpers.settings_handler import get_settings
 from helpers.enum import Passing
-from helpers._check_shared import SortableCallable, parse_xml
+from helpers._check_shared import (SortableCallable, parse_xml, has_tag,
+                                   discard_element, RECORD_TAG, BUNDLE_TAG)
+from helpers.source import xml_source
 import exceptions
 
 from lxml import etree
 
-
-SETTINGS = get_settings()
-SCHEMA = SETTINGS.schema
+def __getattr__(name):
+    # Resolved on access, so importing this module neither creates the
+    # settings singleton nor compiles the schema.
+    if name == "SETTINGS":
+        return get_settings()
+    elif name == "SCHEMA":
+        return get_settings().schema
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class SchemaOperations:
@@ -31,6 +42,10 @@ class validate_schema(metaclass=SortableCallable):
     """Check that an XML file is valid against the schema file.
 
     Precondition: The schema file location is set in the package config file.
+    A document with a schema version is checked against the schema of that
+    version, see SchemaRegistry. A document whose schema cannot be compiled
+    fails, rather than the run. A file is a document record or a bundle of
+    them, see validate_tree.
 
     Attr:
         key(Passing enum): This is a sortable function-like class.
@@ -44,19 +59,128 @@ class validate_schema(metaclass=SortableCallable):
 
     @classmethod
     def _veneer(cls, filename):
-        return _validate_schema(filename)
+        result, _ = _validate_schema(filename)
+        return result
+
+    @classmethod
+    def pipe(cls, filename, tree=None, stream=False, on_record=None):
+        """Validate a tree parsed by an earlier stage, parsing only if absent.
+
+        Args:
+            filename(str, pathlib.Path)
+            tree(etree._ElementTree, None)
+        Kwargs:
+            stream(bool): If True and there is no tree, validate the file one
+                record at a time, see validate_records.
+            on_record(callable, None): See validate_records, only called when
+                streaming.
+        Return:
+            ValidationResult, etree._ElementTree or None
+        """
+        return _validate_schema(filename, tree=tree, stream=stream,
+                                on_record=on_record)
+
+
+def validate_tree(tree):
+    """Validate a parsed tree, one document record at a time if a bundle.
+
+    A tree whose root is a document record is validated whole. A bundle,
+    whose root is a BUNDLE_TAG element, is valid when it holds only records
+    and each is valid against the schema of its version. Any other root
+    fails. The verdict is that of validate_records on the file of the tree.
 
+    Arg:
+        tree(etree._ElementTree)
+    Exceptions:
+        etree.DocumentInvalid
+        exceptions.UnexpectedElement
+        exceptions.UnknownSchemaVersion
+        exceptions.SchemaSetupFailed
+    """
+    registry = get_settings().schema_registry
+    root = tree.getroot()
+    if has_tag(root, RECORD_TAG):
+        registry.schema_for(tree).assertValid(tree)
+    elif has_tag(root, BUNDLE_TAG):
+        for element in root:
+            _check_is_record(element)
+            if has_tag(element, RECORD_TAG):
+                registry.schema_for(element).assertValid(element)
+    else:
+        _raise_unexpected(root)
 
-def _validate_schema(filename):
+
+def validate_records(filename, on_record=None):
+    """Validate a file one document record at a time, discarding each after.
+
+    Memory use is bound by the size of a record rather than of the file. Each
+    record is checked against the schema of its own version. The file is a
+    record or a bundle of them, as for validate_tree.
+
+    Arg:
+        filename(str, pathlib.Path)
+    Kwargs:
+        on_record(callable, None): Called with each valid record before it is
+            discarded, e.g. to take its keys without another parse.
+    Exceptions:
+        etree.DocumentInvalid
+        exceptions.UnexpectedElement
+        exceptions.UnknownSchemaVersion
+        exceptions.SchemaSetupFailed
+    """
+    registry = get_settings().schema_registry
+    context = etree.iterparse(xml_source(filename), events=("end",),
+                              tag=RECORD_TAG)
+    for _, record in context:
+        parent = record.getparent()
+        if parent is not None:
+            # Only records may come before a record in a bundle.
+            in_bundle = (parent.getparent() is None
+                         and has_tag(parent, BUNDLE_TAG))
+            if not in_bundle:
+                _raise_unexpected(parent)
+            for sibling in record.itersiblings(preceding=True):
+                _check_is_record(sibling)
+        registry.schema_for(record).assertValid(record)
+        if on_record is not None:
+            on_record(record)
+        discard_element(record)
+    root = context.root
+    if not has_tag(root, RECORD_TAG):
+        if not has_tag(root, BUNDLE_TAG):
+            _raise_unexpected(root)
+        # Only records may follow the last record.
+        for element in root:
+            _check_is_record(element)
+
+
+def _check_is_record(element):
+    # Comments & processing instructions may sit between records.
+    if isinstance(element.tag, str) and not has_tag(element, RECORD_TAG):
+        _raise_unexpected(element)
+
+
+def _raise_unexpected(element):
+    raise exceptions.UnexpectedElement(element.tag, lineno=element.sourceline)
+
+
+def _validate_schema(filename, tree=None, stream=False, on_record=None):
     try:
         try:
-            tree = parse_xml(filename)
-            SCHEMA.assertValid(tree)
-        except etree.DocumentInvalid as cause:
+            if tree is None and stream:
+                validate_records(filename, on_record=on_record)
+            else:
+                if tree is None:
+                    tree = parse_xml(filename)
+                validate_tree(tree)
+        except (etree.DocumentInvalid,
+                exceptions.UnexpectedElement,
+                exceptions.UnknownSchemaVersion,
+                exceptions.SchemaSetupFailed) as cause:
             raise exceptions.SchemaValidationError() from cause
     except exceptions.SchemaValidationError as exc:
         exception = exc
     else:
         exception = None
     result = ValidationResult(filename, exception)
-    return result
+    return result, tree
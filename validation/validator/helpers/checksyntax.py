@@ -11,10 +11,11 @@ Copyright Ian Vermes 2019
 
 from helpers.result import ValidationResult
 from helpers.enum import Passing
-from helpers._check_shared import SortableCallable
+from helpers._check_shared import SortableCallable, drain_xml
+from helpers.source import parse_source
+from helpers.checkencoding import raise_if_mismatched_encodings
 import exceptions
 
-import chardet
 from lxml import etree
 
 MY_PARSER = etree.XMLParser(encoding=None)
@@ -23,6 +24,10 @@ MY_PARSER = etree.XMLParser(encoding=None)
 class validate_syntax(metaclass=SortableCallable):
     """Check that an XML file has valid syntax.
 
+    Called alone it also checks the encodings of the file, as validate_encoding
+    does, but as a pipeline stage it leaves them to the preceding encoding
+    stage.
+
     Attr:
         key(Passing enum): This is a sortable function-like class.
     Arg:
@@ -35,48 +40,44 @@ class validate_syntax(metaclass=SortableCallable):
 
     @classmethod
     def _veneer(cls, filename):
-        return _validate_syntax(filename)
-
+        result, _ = _validate_syntax(filename)
+        return result
 
-def _validate_syntax(filename):
+    @classmethod
+    def pipe(cls, filename, tree=None, stream=False):
+        """Validate and hand the parsed tree on to the next pipeline stage.
+
+        Args:
+            filename(str, pathlib.Path)
+            tree(None): Syntax is the first parsing stage, so any tree is
+                ignored.
+        Kwargs:
+            stream(bool): If True parse without keeping a tree, see drain_xml.
+        Return:
+            ValidationResult, etree._ElementTree or None
+        """
+        return _validate_syntax(filename, stream=stream, check_encodings=False)
+
+
+def _validate_syntax(filename, stream=False, check_encodings=True):
     try:
         causalgrp = (etree.XMLSyntaxError, exceptions.EncodingOperationError)
         try:
-            etree.parse(str(filename), parser=MY_PARSER)
+            if stream:
+                tree = None
+                drain_xml(filename)
+            else:
+                tree = parse_source(filename, parser=MY_PARSER)
             # Files with mismatched encodings may silently pass without raising
             # an exception.
-            raise_if_mismatched_encodings(filename)
+            if check_encodings:
+                raise_if_mismatched_encodings(filename)
         except causalgrp as cause:
             raise exceptions.SyntaxValidationError() from cause
     except exceptions.SyntaxValidationError as exc:
         exception = exc
+        tree = None
     else:
         exception = None
     result = ValidationResult(filename, exception)
-    return result
-
-
-def raise_if_mismatched_encodings(filename):
-    """Raises an exceptions if the zeroth line encoding & rest of file mismatch.
-
-    Exceptions:
-        exceptions.EncodingOperationError
-    """
-    key = "encoding"
-    with open(filename, "rb") as handle:
-        # Get zeroth line encoding
-        line = handle.readline()
-        zeroth_enc = chardet.detect(line)[key]
-        # Get encoding of the rest of the file.
-        detector = chardet.UniversalDetector()
-        for line in handle:
-            detector.feed(line)
-            if detector.done:
-                break
-        detector.close()
-        rest_enc = detector.result[key]
-
-    if zeroth_enc != rest_enc:
-        msg = ("The file encoding in the declaration and the encoding differ: "
-               "zeroth line={zeroth_enc} & other liens={rest_enc}.")
-        raise exceptions.EncodingOperationError(msg)
+    return result, tree
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""Checks of keys that must be unique across all the documents of a run.
+
+Each document is reduced to a small DocumentKeys record when it is validated,
+hence the checks need neither a second parse nor the trees of earlier
+documents. The records are indexed as they arrive and collisions, or
+overlapping page ranges, are reported once the run is over.
+
+Classes:
+    DocumentKeys
+    CorpusIndex
+
+Functions:
+    extract_keys
+    extract_file_keys
+
+Copyright Ian Vermes 2019
+"""
+
+from helpers.checkrules import NAMESPACES
+from helpers.result import ValidationResult
+from helpers._check_shared import iter_records
+import exceptions
+
+from lxml import etree
+
+import collections
+
+DocumentKeys = collections.namedtuple(
+    "DocumentKeys", ["docid", "doi", "volume", "issue", "seqno", "fpage",
+                     "lpage", "lineno"])
+
+_KEY_TAGS = ("doi", "volume", "issue", "seqno", "fpage", "lpage")
+_FIND_KEYS = etree.XPath(" | ".join(f"descendant::jjs:{tag}"
+                                    for tag in _KEY_TAGS),
+                         namespaces=NAMESPACES)
+_RECORD_PATH = ".//{*}document"
+
+
+def extract_keys(root):
+    """Get the keys of the document records at or under an element.
+
+    Args:
+        root(etree._Element): A document, or a bundle of documents.
+    Return:
+        list: DocumentKeys
+    """
+    if root.tag.rpartition("}")[2] == "document":
+        records = [root]
+    else:
+        records = root.iterfind(_RECORD_PATH)
+    return [_get_record_keys(record) for record in records]
+
+
+def extract_file_keys(filename):
+    """Get the keys of the document records of a file, parsing one at a time.
+
+    Args:
+        filename(str, pathlib.Path)
+    Return:
+        list: DocumentKeys
+    """
+    keys = []
+    for record in iter_records(filename):
+        keys.extend(extract_keys(record))
+    return keys
+
+
+def _get_record_keys(record):
+    values = {}
+    for element in _FIND_KEYS(record):
+        tag = element.tag.rpartition("}")[2]
+        values.setdefault(tag, (element.text or "").strip())
+    return DocumentKeys(record.get("docid"),
+                        *(values.get(tag) for tag in _KEY_TAGS),
+                        lineno=record.sourceline)
+
+
+def _get_pages(record):
+    try:
+        return int(record.fpage), int(record.lpage)
+    except (TypeError, ValueError):
+        return None
+
+
+class CorpusIndex(object):
+    """Check the documents of a run against each other.
+
+    Finds DOIs, and seqnos within a volume & issue, shared by documents. Each
+    key maps to the first document found with it, so adding a document is a
+    dict lookup per key and indexing a run of n documents is O(n).
+
+    Finds page ranges that overlap within a volume & issue. The ranges of an
+    issue are sorted and swept once, an O(n log n) check rather than
+    comparing every pair. Two ranges may share a boundary page.
+
+    Methods:
+        add
+        collisions
+        overlaps
+        results
+    """
+
+    _MESSAGES = {"unique-doi": "The doi {key} is not unique",
+                 "unique-seqno": "The seqno {key[2]} of volume {key[0]} issue "
+                                 "{key[1]} is not unique"}
+    _OVERLAP_MESSAGE = ("The pages {pages[0]}-{pages[1]} of volume {key[0]} "
+                        "issue {key[1]} overlap pages {other[0]}-{other[1]}")
+
+    def __init__(self):
+        self._first = {rule: {} for rule in self._MESSAGES}
+        self._collisions = {rule: {} for rule in self._MESSAGES}
+        self._page_ranges = {}
+
+    def add(self, filename, keys):
+        """Index the keys of a file.
+
+        Args:
+            filename(str, pathlib.Path)
+            keys(iterable): DocumentKeys, see extract_keys.
+        """
+        filename = str(filename)
+        for record in keys:
+            location = (filename, record.lineno)
+            if record.doi:
+                self._add("unique-doi", record.doi, location)
+            if record.seqno:
+                key = (record.volume, record.issue, record.seqno)
+                self._add("unique-seqno", key, location)
+            pages = _get_pages(record)
+            if pages is not None:
+                key = (record.volume, record.issue)
+                self._page_ranges.setdefault(key, []).append((pages,
+                                                              location))
+
+    def _add(self, rule, key, location):
+        first = self._first[rule].setdefault(key, location)
+        if first is not location:
+            self._collisions[rule].setdefault(key, [first]).append(location)
+
+    def collisions(self):
+        """Yield each key shared by documents.
+
+        Yields:
+            str, object, list: The rule name, the key & its (filename,
+            lineno) locations.
+        """
+        for rule, collisions in self._collisions.items():
+            for key, locations in collisions.items():
+                yield rule, key, locations
+
+    def overlaps(self):
+        """Yield each page range that overlaps an earlier range of its issue.
+
+        A range is paired with the earlier range reaching furthest, hence
+        each overlapping range is yielded once.
+
+        Yields:
+            tuple, tuple, tuple: The (volume, issue) key, then the earlier &
+            the overlapping range as ((fpage, lpage), (filename, lineno)).
+        """
+        for key, page_ranges in self._page_ranges.items():
+            page_ranges.sort(key=lambda page_range: page_range[0])
+            reach = None
+            for page_range in page_ranges:
+                (fpage, lpage), _ = page_range
+                if reach is not None and fpage < reach[0][1]:
+                    yield key, reach, page_range
+                if reach is None or lpage > reach[0][1]:
+                    reach = page_range
+
+    def results(self):
+        """Get a failing result for each file with a shared key or overlap.
+
+        Return:
+            list: ValidationResult instances, with RuleValidationErrors.
+        """
+        violations = {}
+        for rule, key, locations in self.collisions():
+            message = self._MESSAGES[rule].format(key=key)
+            for filename, lineno in locations:
+                others = ", ".join(f"{other} (line {other_lineno})"
+                                   for other, other_lineno in locations
+                                   if (other, other_lineno)
+                                   != (filename, lineno))
+                violation = exceptions.RuleViolation(
+                    f"{message}, also in {others}.", rule, lineno)
+                violations.setdefault(filename, []).append(violation)
+        for key, earlier, later in self.overlaps():
+            for this, other in ((earlier, later), (later, earlier)):
+                pages, (filename, lineno) = this
+                other_pages, (other_filename, other_lineno) = other
+                message = self._OVERLAP_MESSAGE.format(key=key, pages=pages,
+                                                       other=other_pages)
+                violation = exceptions.RuleViolation(
+                    f"{message} of {other_filename} (line {other_lineno}).",
+                    "page-range-overlap", lineno)
+                violations.setdefault(filename, []).append(violation)
+
+        results = []
+        for filename, found in violations.items():
+            lines = "\n".join(str(violation) for violation in found)
+            msg = f"{len(found)} rule violation(s):\n{lines}"
+            try:
+                raise exceptions.RuleValidationError(msg) from found[0]
+            except exceptions.RuleValidationError as exc:
+                results.append(ValidationResult(filename, exc))
+        return results
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""An append-only journal of the files a run has validated, for resuming.
+
+Each validated file is journaled as a JSON line with its verdict and the
+modification time & size it had before it was validated, under a header line
+giving the fingerprint of the run, see checker.get_run_fingerprint. Lines
+are written as they come and synced to disk in batches, hence a run that is
+killed loses at most a batch. A resumed run skips every file journaled under
+the same fingerprint that has not changed since, which costs a stat per file
+rather than a validation.
+
+Classes:
+    Journal
+
+Copyright Ian Vermes 2019
+"""
+
+from helpers.archive import ArchiveMember, UnreadableArchive
+from helpers.source import BytesSource, FileSource
+
+import json
+import os
+import time
+
+
+class Journal(object):
+    """Journal validated files and skip those journaled by an earlier run.
+
+    The journal is also a context manager, closing on exit. Files held in
+    memory, other than archive members, are never journaled. The files to
+    journal are those yielded by pending, whose stat is taken as they are
+    yielded, hence a file modified while it is validated is validated again
+    on resume.
+
+    Args:
+        filename(str, pathlib.Path)
+        fingerprint(str): See checker.get_run_fingerprint.
+    Kwargs:
+        resume(bool): Read the journal of an earlier run and add to it,
+            otherwise start a new journal.
+        sync_lines(int): The most lines written between syncs to disk.
+        sync_interval(float): The most seconds between syncs to disk.
+
+    Methods:
+        is_done
+        pending
+        record
+        sync
+        close
+    """
+
+    def __init__(self, filename, fingerprint, resume=False, sync_lines=1000,
+                 sync_interval=5.0):
+        self.filename = str(filename)
+        self.fingerprint = fingerprint
+        self.sync_lines = sync_lines
+        self.sync_interval = sync_interval
+        self._done, torn = self._load() if resume else ({}, False)
+        # Result filename to the key & stat of each file yielded by pending.
+        self._pending = {}
+        mode = "a" if resume else "w"
+        self._file = open(self.filename, mode=mode, encoding="utf-8")
+        if torn:
+            # End the line a crash cut short, so the header stands alone.
+            self._file.write("\n")
+        self._write({"fingerprint": fingerprint})
+        self.sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._done)
+
+    def is_done(self, filename):
+        """Check if a file was journaled, unchanged, under this fingerprint.
+
+        Args:
+            filename(str, pathlib.Path, ArchiveMember)
+        Return:
+            bool
+        """
+        key, path = _identify(filename)
+        if key is None or key not in self._done:
+            return False
+        return self._done[key] == _get_stat(path)
+
+    def pending(self, filenames):
+        """Yield the filenames that are not done, see is_done.
+
+        The stat of each is kept until its result is recorded.
+        """
+        for filename in filenames:
+            key, path = _identify(filename)
+            stat = None if key is None else _get_stat(path)
+            if stat is not None and self._done.get(key) == stat:
+                continue
+            if stat is not None:
+                self._pending[str(filename)] = (key, stat)
+            yield filename
+
+    def record(self, result):
+        """Journal the verdict of a file yielded by pending.
+
+        Args:
+            result(ValidationResult): Of a file yielded by pending, other
+                results are not journaled.
+        """
+        key, stat = self._pending.pop(result.filename, (None, None))
+        if key is None:
+            return
+        self._write({"filename": key, "mtime_ns": stat[0], "size": stat[1],
+                     "passing": result.enum.name})
+        self._unsynced += 1
+        if (self._unsynced >= self.sync_lines
+                or time.monotonic() - self._synced_at >= self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """Write the journaled lines through to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        """Sync the journal and close the file."""
+        if self._file.closed:
+            return
+        try:
+            self.sync()
+        finally:
+            self._file.close()
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _load(self):
+        # Get the files journaled under this fingerprint, and whether the
+        # last line was cut short.
+        done = {}
+        fingerprint = None
+        line = ""
+        try:
+            handle = open(self.filename, encoding="utf-8")
+        except FileNotFoundError:
+            return done, False
+        with handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash.
+                if "fingerprint" in entry:
+                    fingerprint = entry["fingerprint"]
+                elif fingerprint == self.fingerprint and "filename" in entry:
+                    done[entry["filename"]] = (entry["mtime_ns"],
+                                               entry["size"])
+        return done, bool(line) and not line.endswith("\n")
+
+
+def _identify(filename):
+    # Get the journal key of a file and the path whose stat it is known by.
+    if isinstance(filename, ArchiveMember):
+        archive = os.path.abspath(filename.archive)
+        return f"{archive}/{filename.name}", archive
+    elif isinstance(filename, UnreadableArchive):
+        archive = os.path.abspath(filename.archive)
+        return archive, archive
+    elif isinstance(filename, FileSource):
+        filename = filename.name
+    elif isinstance(filename, BytesSource):
+        return None, None
+    path = os.path.abspath(filename)
+    return path, path
+
+
+def _get_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
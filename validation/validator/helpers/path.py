@@ -3,12 +3,19 @@
 
 """OS and Path related convenience functions.
 
+Functions:
+    expandpath
+    iter_files
+    is_excluded
+
 Copyright Ian Vermes 2018
 """
 
 from helpers.enum import Check
 import exceptions
 
+import fnmatch
+import os
 import pathlib
 
 
@@ -62,3 +69,74 @@ def expandpath(filename, exists=False, dir_exists=True):
             raise exceptions.ParentDirNotFound(msg.format(file=filename.parent))
     else:
         return filename.absolute()
+
+
+def iter_files(paths, include=("*.xml", ), exclude=(), recursive=True):
+    """Yield the files at or under paths, as each is found.
+
+    Directories are read with os.scandir, hence a file is yielded before the
+    rest of the tree is listed. The files of a directory come before those
+    of its subdirectories. Symbolic links to directories are not followed.
+
+    Args:
+        paths(iterable): str or pathlib.Path items, files or directories.
+            Files are yielded whether or not they match the patterns.
+    Kwargs:
+        include(iterable): Glob patterns, a file in a directory is yielded if
+            its name matches any.
+        exclude(iterable): Glob patterns, a file or directory is skipped if
+            its name, or its path relative to the searched directory,
+            matches any.
+        recursive(bool): If False only the top level of a directory is read.
+    Yields:
+        pathlib.Path
+    """
+    include = tuple(include)
+    exclude = tuple(exclude)
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.is_dir():
+            yield from _scan_directory(path, include, exclude, recursive)
+        else:
+            yield path
+
+
+def _scan_directory(root, include, exclude, recursive):
+    pending = [os.fspath(root)]
+    while pending:
+        directory = pending.pop()
+        subdirectories = []
+        try:
+            entries = os.scandir(directory)
+        except (PermissionError, FileNotFoundError):
+            continue
+        with entries:
+            for entry in entries:
+                if exclude and is_excluded(entry.path, root, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif (entry.is_file()
+                      and any(fnmatch.fnmatch(entry.name, pattern)
+                              for pattern in include)):
+                    yield pathlib.Path(entry.path)
+        if recursive:
+            # Reversed so that the stack reads subdirectories in order.
+            pending.extend(reversed(subdirectories))
+
+
+def is_excluded(path, root, exclude):
+    """Check if a path matches an exclude pattern, see iter_files.
+
+    Args:
+        path(str, pathlib.Path): A file or directory under root.
+        root(str, pathlib.Path): The searched directory.
+        exclude(iterable): Glob patterns, matched to the name of the path and
+            to its posix path relative to root.
+    Return:
+        bool
+    """
+    name = os.path.basename(path)
+    relative = pathlib.PurePath(os.path.relpath(path, root)).as_posix()
+    return any(fnmatch.fnmatch(name, pattern)
+               or fnmatch.fnmatch(relative, pattern) for pattern in exclude)
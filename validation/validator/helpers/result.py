@@ -3,14 +3,25 @@
 
 """Validation results are objects spawned by validation classes and functions.
 
+Classes:
+    ValidationResult
+    ResultStore
+
 Copyright Ian Vermes 2019
 """
 
 
 import exceptions
 from helpers.enum import Passing
+from helpers.source import BytesSource
+
+from lxml import etree
 
+import array
+import itertools
 import os
+import re
+import sys
 
 
 class ValidationResult(object):
@@ -25,8 +36,12 @@ class ValidationResult(object):
     It also exposed the detailed status of which validation implementations
     it has thus far passed (if any).
 
+    The result has no instance __dict__, keeps its Passing value as an int
+    and interns its filename, which is shared with the caller's string.
+
     Args:
-        filename(str): XML filename.
+        filename(str): XML filename. A pathlib.Path or a BytesSource is kept
+            as a string.
         exception(Exception, None): Package validation errors or None if no
             exception was raised.
 
@@ -39,11 +54,13 @@ class ValidationResult(object):
         passed_schema(bool)
         passed_rules(bool)
     """
+    __slots__ = ("_filename", "_exc", "_passing")
+
     def __init__(self, filename, exc):
-        self._filename = filename
+        self._filename = _intern_filename(filename)
         self._issuitable_exception(exc)
         self._exc = exc
-        self._this_enum = Passing.from_exception(exc)
+        self._passing = Passing.from_exception(exc).value
 
     def __bool__(self):
         flag = all([self.passed_syntax, self.passed_schema, self.passed_rules])
@@ -60,6 +77,16 @@ class ValidationResult(object):
     def __str__(self):
         return str(repr(self))
 
+    def __reduce__(self):
+        """Pickle support, e.g. for results returned by worker processes.
+
+        The lxml cause of the exception cannot be pickled and is swapped for a
+        DetachedCause carrying the same message and position.
+        """
+        exc = self._exc
+        cause = None if exc is None else detach_cause(exc.__cause__)
+        return (_unpickle_result, (self._filename, exc, cause))
+
     def _issuitable_exception(self, exc):
         suitable = isinstance(exc, (type(None), exceptions.ValidationError))
         if suitable:
@@ -73,7 +100,7 @@ class ValidationResult(object):
 
     @property
     def enum(self):
-        return self._this_enum
+        return Passing(self._passing)
 
     @property
     def filename(self):
@@ -85,15 +112,212 @@ class ValidationResult(object):
 
     @property
     def passed_syntax(self):
-        flag = self._this_enum > Passing.SYNTAX
+        flag = self._passing > Passing.SYNTAX.value
         return flag
 
     @property
     def passed_schema(self):
-        flag = self._this_enum > Passing.SCHEMA
+        flag = self._passing > Passing.SCHEMA.value
         return flag
 
     @property
     def passed_rules(self):
-        flag = self._this_enum > Passing.RULES
+        flag = self._passing > Passing.RULES.value
         return flag
+
+
+class ResultStore(object):
+    """Columnar store of the verdicts of a run, for many results.
+
+    The Passing value of each result is one byte of an array, beside a list
+    of interned filenames. Only the messages of failing results are kept,
+    rather than their exceptions & lxml causes. Filtering translates the
+    array through a table of the wanted values, without a Python loop.
+
+    Methods:
+        append
+        extend
+        filenames
+        count
+        error
+    """
+
+    def __init__(self):
+        self._filenames = []
+        self._passing = array.array("B")
+        self._errors = {}
+
+    def __len__(self):
+        return len(self._passing)
+
+    def __iter__(self):
+        """Yield the filename & Passing enum of each stored result."""
+        for filename, value in zip(self._filenames, self._passing):
+            yield filename, Passing(value)
+
+    def append(self, result):
+        """Store the verdict of a ValidationResult.
+
+        Args:
+            result(ValidationResult)
+        """
+        if not result:
+            self._errors[len(self._passing)] = str(result.exception)
+        self._filenames.append(_intern_filename(result.filename))
+        self._passing.append(result.enum.value)
+
+    def extend(self, results):
+        """Store the verdicts of an iterable of ValidationResults."""
+        for result in results:
+            self.append(result)
+
+    def filenames(self, passed_syntax=None, passed_schema=None,
+                  passed_rules=None):
+        """Get the filenames of the results matching every given verdict.
+
+        Kwargs:
+            passed_syntax(bool, None): None places no condition.
+            passed_schema(bool, None)
+            passed_rules(bool, None)
+        Return:
+            list: str
+        """
+        table = _get_filter_table(passed_syntax, passed_schema, passed_rules)
+        selectors = self._passing.tobytes().translate(table)
+        return list(itertools.compress(self._filenames, selectors))
+
+    def count(self, passed_syntax=None, passed_schema=None,
+              passed_rules=None):
+        """Count the results matching every given verdict, see filenames."""
+        table = _get_filter_table(passed_syntax, passed_schema, passed_rules)
+        return self._passing.tobytes().translate(table).count(1)
+
+    def error(self, index):
+        """Get the message of a stored result, or None if it passed.
+
+        Args:
+            index(int): The position of the result in the store.
+        Return:
+            str or None
+        """
+        value = self._passing[index]  # Raises IndexError.
+        if value == Passing.PASSING.value:
+            return None
+        return self._errors[index % len(self._passing)]
+
+
+def _get_filter_table(passed_syntax, passed_schema, passed_rules):
+    # Map each byte, a Passing value, to 1 if it matches every condition.
+    conditions = ((passed_syntax, Passing.SYNTAX),
+                  (passed_schema, Passing.SCHEMA),
+                  (passed_rules, Passing.RULES))
+    table = bytearray(256)
+    for member in Passing:
+        if all(wanted is None or (member > stage) == wanted
+               for wanted, stage in conditions):
+            table[member.value] = 1
+    return bytes(table)
+
+
+def _intern_filename(filename):
+    if isinstance(filename, os.PathLike):
+        filename = os.fspath(filename)
+    elif isinstance(filename, BytesSource):
+        filename = str(filename)
+    if type(filename) is str:
+        filename = sys.intern(filename)
+    return filename
+
+
+def _unpickle_result(filename, exc, cause):
+    if exc is not None:
+        exc.__cause__ = cause
+    return ValidationResult(filename, exc)
+
+
+def cause_position(cause):
+    """Get the line & column an lxml exception (or its stand-in) refers to.
+
+    Args:
+        cause(Exception, None)
+    Return:
+        int or None, int or None
+    """
+    if isinstance(cause, exceptions.DetachedCause):
+        return cause.lineno, cause.column
+    position = getattr(cause, "position", None)
+    if position is not None:
+        return position
+    error_log = getattr(cause, "error_log", None)
+    if error_log:
+        first_error = error_log[0]
+        return first_error.line, first_error.column
+    return None, None
+
+
+def cause_signature(cause):
+    """Get the error code & element path an exception (or its stand-in) has.
+
+    Causes alike but for their values, e.g. the text of an element, share a
+    signature. The path is the lxml path without positions, the last step
+    named from the message where lxml gives "*" for namespaced elements.
+
+    Args:
+        cause(Exception, None)
+    Return:
+        str or None, str or None
+    """
+    if cause is None:
+        return None, None
+    if isinstance(cause, exceptions.DetachedCause):
+        return cause.code, cause.path
+    if isinstance(cause, exceptions.RuleViolation):
+        return cause.rule, None
+    if isinstance(cause, etree.XMLSyntaxError):
+        return _get_error_type_name(cause.code), None
+    error_log = getattr(cause, "error_log", None)
+    if error_log:
+        first_error = error_log[0]
+        path = _normalise_path(first_error.path, first_error.message)
+        return first_error.type_name, path
+    return type(cause).__name__, None
+
+
+_POSITION = re.compile(r"\[\d+\]")
+_MESSAGE_ELEMENT = re.compile(r"^Element '(?:\{[^}]*\})?([^']+)'")
+_ERROR_TYPE_NAMES = {}
+
+
+def _normalise_path(path, message):
+    if not path:
+        return None
+    path = _POSITION.sub("", path)
+    match = _MESSAGE_ELEMENT.match(message or "")
+    if match and path.endswith("/*"):
+        path = path[:-1] + match.group(1)
+    return path
+
+
+def _get_error_type_name(code):
+    if not _ERROR_TYPE_NAMES:
+        _ERROR_TYPE_NAMES.update((value, name) for name, value
+                                 in vars(etree.ErrorTypes).items()
+                                 if isinstance(value, int))
+    return _ERROR_TYPE_NAMES.get(code, str(code))
+
+
+def detach_cause(cause):
+    """Convert an lxml exception into a picklable DetachedCause.
+
+    Args:
+        cause(Exception, None)
+    Return:
+        exceptions.DetachedCause or None
+    """
+    if cause is None or isinstance(cause, exceptions.DetachedCause):
+        return cause
+    lineno, column = cause_position(cause)
+    code, path = cause_signature(cause)
+    name = type(cause).__name__
+    return exceptions.DetachedCause(str(cause), name, lineno, column,
+                                    code=code, path=path)
@@ -3,12 +3,22 @@
 
 """Reads a data config file to yield a data object with fixed attributes.
 
+A Settings singleton holds a config parser and compiled schemas, neither of
+which pickle. A SettingsSnapshot holds only its values, hence it is handed to
+worker processes, which install it to compile their own schema once.
+
 Classes:
     Settings
+    SettingsSnapshot
+    SchemaRegistry
 
 Functions:
     get_settings
     get_configfile
+    load_schema
+    preload_schema
+    current_snapshot
+    install_snapshot
 
 Copyright Ian Vermes 2018
 """
@@ -16,14 +26,21 @@ Copyright Ian Vermes 2018
 import exceptions
 import helpers.path
 from helpers.enum import Mode
+from helpers.cache import hash_file
 
 from lxml import etree
 
+import collections
 import configparser
+import functools
 import os
 import pathlib
+import threading
 
 _RELATIVE_INI_PATH = pathlib.Path("../CORE_SETTINGS.ini")
+_SCHEMA_LOCK = threading.Lock()
+# The snapshot of a worker process, set by install_snapshot.
+_SNAPSHOT = None
 
 class Singleton(type):
     """A meta class for creating instance patterns.
@@ -69,7 +86,11 @@ class Settings(metaclass=Singleton):
 
     Attributes:
         log_filename: The path for where the log file is expected to be written.
+        cache_filename: The path of the on-disk validation result cache.
         mode: Mode.LIVE or Mode.TEST, used internally and for external operations.
+        schema: The compiled XML schema, compiled on first access.
+        schema_filename: The path of the XML schema file.
+        schema_registry: Routes documents to the schema of their version.
     """
 
     @staticmethod
@@ -98,7 +119,9 @@ class Settings(metaclass=Singleton):
         # Calculated attributes
         try:
             self.__log_filename = self._attr_get_log_filename()
-            self.__schema = self._attr_get_schema_obj()
+            self.__cache_filename = self._attr_get_cache_filename()
+            self.__schema_filename = self._attr_get_schema_filename()
+            self.__schema_registry = self._attr_get_schema_registry()
         except Exception as err:
             raise exceptions.SchemaSetupFailed from err
 
@@ -129,10 +152,25 @@ class Settings(metaclass=Singleton):
     def log_filename(self):
         return self.__log_filename
 
-    #
+    # cache_filename
+    @property
+    def cache_filename(self):
+        return self.__cache_filename
+
+    # schema
     @property
     def schema(self):
-        return self.__schema
+        return self.schema_registry.get()
+
+    # schema_filename
+    @property
+    def schema_filename(self):
+        return self.__schema_filename
+
+    # schema_registry
+    @property
+    def schema_registry(self):
+        return self.__schema_registry
 
     def _attr_get_log_filename(self):
         option = "log_filename"
@@ -141,13 +179,205 @@ class Settings(metaclass=Singleton):
                                            exists=False, dir_exists=True)
         return filename
 
-    def _attr_get_schema_obj(self):
+    def _attr_get_cache_filename(self):
+        option = "cache_filename"
+        filename = self._get_value_from_config(option)
+        filename = helpers.path.expandpath(filename,
+                                           exists=False, dir_exists=True)
+        return filename
+
+    def _attr_get_schema_filename(self):
         option = "schema"
         filename = self._get_value_from_config(option)
-        filename = str(helpers.path.expandpath(filename, exists=True))
-        tree = etree.parse(filename)
-        schema = etree.XMLSchema(tree)
-        return schema
+        filename = helpers.path.expandpath(filename, exists=True)
+        return filename
+
+    def _attr_get_schema_registry(self):
+        versions = self._get_mapping_from_config("schema_versions")
+        for version, filename in versions.items():
+            # Checked on first use, as a version may never be asked for.
+            versions[version] = helpers.path.expandpath(filename,
+                                                        dir_exists=False)
+        namespaces = self._get_mapping_from_config("schema_namespaces")
+        attribute = self._get_value_from_config("schema_version_attribute")
+        registry = SchemaRegistry(self.schema_filename, versions=versions,
+                                  namespaces=namespaces,
+                                  attribute=attribute or None)
+        return registry
+
+    def _get_mapping_from_config(self, option):
+        # One "key = value" pair per line of a multiline value.
+        mapping = {}
+        for line in self._get_value_from_config(option).splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                mapping[key.strip()] = value.strip()
+        return mapping
+
+
+class SettingsSnapshot(collections.namedtuple(
+        "SettingsSnapshot", ["mode", "log_filename", "cache_filename",
+                             "schema_filename", "schema_digest",
+                             "schema_versions", "schema_namespaces",
+                             "schema_version_attribute"])):
+    """An immutable & picklable copy of the values of the Settings singleton.
+
+    It stands in for Settings where only values are needed, e.g. in a worker
+    process, see install_snapshot. The schemas are compiled by each process on
+    first use, and the digest of the default schema file guards against the
+    file changing after the snapshot was taken.
+
+    Attrs:
+        mode(Mode)
+        log_filename(str)
+        cache_filename(str)
+        schema_filename(str)
+        schema_digest(str): See helpers.cache.hash_file.
+        schema_versions(tuple): (version, schema file) pairs.
+        schema_namespaces(tuple): (namespace, version) pairs.
+        schema_version_attribute(str, None)
+        schema_registry: Routes documents to the schema of their version.
+        schema: The compiled default schema.
+
+    Methods:
+        from_settings
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Take a snapshot of a Settings singleton.
+
+        Args:
+            settings(Settings)
+        Return:
+            SettingsSnapshot
+        Exceptions:
+            exceptions.SchemaSetupFailed
+        """
+        registry = settings.schema_registry
+        try:
+            digest = hash_file(registry.default)
+        except OSError as err:
+            raise exceptions.SchemaSetupFailed from err
+        return cls(settings.mode, str(settings.log_filename),
+                   str(settings.cache_filename), registry.default, digest,
+                   tuple(registry.versions.items()),
+                   tuple(registry.namespaces.items()), registry.attribute)
+
+    @property
+    def schema_registry(self):
+        return _get_snapshot_registry(self)
+
+    @property
+    def schema(self):
+        return self.schema_registry.get()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_snapshot_registry(snapshot):
+    return SchemaRegistry(snapshot.schema_filename,
+                          versions=dict(snapshot.schema_versions),
+                          namespaces=dict(snapshot.schema_namespaces),
+                          attribute=snapshot.schema_version_attribute)
+
+
+class SchemaRegistry(object):
+    """Routes each document to the compiled schema of its schema version.
+
+    The version of a document is read from the version attribute of its root
+    element, failing that it is looked up by the namespace of the root element.
+    Documents with neither use the default schema. Each schema is compiled
+    once, when first needed, see load_schema.
+
+    Args:
+        default(str, pathlib.Path): The schema of unversioned documents.
+    Kwargs:
+        versions(dict): Version (str) to schema file (str, pathlib.Path).
+        namespaces(dict): Namespace (str) to version (str).
+        attribute(str, None): Name of the root attribute giving the version.
+
+    Methods:
+        version_of
+        filename_of
+        get
+        schema_for
+
+    Attrs:
+        filenames
+    """
+
+    def __init__(self, default, versions=None, namespaces=None,
+                 attribute=None):
+        self.default = str(default)
+        versions = versions or {}
+        self.versions = {version: str(filename)
+                         for version, filename in versions.items()}
+        self.namespaces = dict(namespaces or {})
+        self.attribute = attribute
+
+    @property
+    def filenames(self):
+        """Every schema file the registry may compile, default first."""
+        filenames = [self.default, *self.versions.values()]
+        return list(dict.fromkeys(filenames))
+
+    def version_of(self, tree):
+        """Get the schema version of a document or None if it has none.
+
+        Args:
+            tree(etree._ElementTree, etree._Element)
+        Return:
+            str, None
+        """
+        if isinstance(tree, etree._ElementTree):
+            root = tree.getroot()
+        else:
+            root = tree
+        version = None
+        if self.attribute is not None:
+            version = root.get(self.attribute)
+        if version is None:
+            namespace = etree.QName(root).namespace
+            version = self.namespaces.get(namespace)
+        return version
+
+    def filename_of(self, version=None):
+        """Get the schema file of the version, None being the default.
+
+        Exceptions:
+            exceptions.UnknownSchemaVersion
+        """
+        if version is None:
+            return self.default
+        try:
+            return self.versions[version]
+        except KeyError:
+            errmsg = f"No schema is configured for version '{version}'."
+            raise exceptions.UnknownSchemaVersion(errmsg) from None
+
+    def get(self, version=None):
+        """Get the compiled schema of the version, None being the default.
+
+        Exceptions:
+            exceptions.UnknownSchemaVersion
+            exceptions.SchemaSetupFailed
+        """
+        return load_schema(self.filename_of(version))
+
+    def schema_for(self, tree):
+        """Get the compiled schema that the document should be valid against.
+
+        Args:
+            tree(etree._ElementTree, etree._Element)
+        Return:
+            etree.XMLSchema
+        Exceptions:
+            exceptions.UnknownSchemaVersion
+            exceptions.SchemaSetupFailed
+        """
+        return self.get(self.version_of(tree))
 
 
 def get_configfile():
@@ -160,8 +390,110 @@ def get_configfile():
 
 
 def get_settings(filename=None, mode=None):
-    if filename is None:
+    if (filename is None and _SNAPSHOT is not None
+            and Settings not in Singleton._instances):
+        return _SNAPSHOT
+    elif filename is None:
         config_file = get_configfile()
     else:
         config_file = filename
     return Settings(config_file, mode=mode)
+
+
+def load_schema(filename):
+    """Get the compiled XML schema of the file, compiling it only once.
+
+    Safe to call from several threads: a caller waits on a compilation already
+    in progress rather than starting another. A schema that fails to compile
+    is not compiled again, every call raises its error.
+
+    Args:
+        filename(str, pathlib.Path)
+    Return:
+        etree.XMLSchema
+    Exceptions:
+        exceptions.SchemaSetupFailed
+    """
+    with _SCHEMA_LOCK:
+        schema = _compile_schema(str(filename))
+    if isinstance(schema, Exception):
+        errmsg = f"The schema '{filename}' could not be compiled: {schema}"
+        raise exceptions.SchemaSetupFailed(errmsg) from schema
+    return schema
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_schema(filename):
+    # The error of a failure is returned, hence cached, rather than raised.
+    try:
+        tree = etree.parse(filename)
+        schema = etree.XMLSchema(tree)
+    except (etree.LxmlError, OSError) as err:
+        return err
+    return schema
+
+
+def preload_schema(config_filename, mode=None):
+    """Compile the schema named by the config file on a background thread.
+
+    An error of the config file or schema is left for the first use of
+    Settings to raise, any other error is raised on the thread.
+
+    Args:
+        config_filename(str, pathlib.Path): Path to .INI file.
+    Kwargs:
+        mode(Mode): The mode whose schema is compiled, see Settings.
+    Return:
+        threading.Thread
+    """
+    def target():
+        try:
+            config = Settings._get_config(config_filename)
+            section = str(Mode.get_default() if mode is None else mode)
+            filename = helpers.path.expandpath(config.get(section, "schema"),
+                                               exists=True)
+            load_schema(filename)
+        except (exceptions.NextGenError, configparser.Error):
+            pass
+
+    thread = threading.Thread(target=target, name="preload_schema",
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+def current_snapshot():
+    """Get a snapshot of the settings of this process, if it has any.
+
+    Return:
+        SettingsSnapshot or None: None if neither the Settings singleton was
+            made nor a snapshot installed.
+    """
+    if Settings in Singleton._instances:
+        return SettingsSnapshot.from_settings(Settings._instances[Settings])
+    return _SNAPSHOT
+
+
+def install_snapshot(snapshot):
+    """Use a snapshot as the settings of this process, e.g. a worker process.
+
+    get_settings returns the snapshot unless the Settings singleton is made.
+    The default schema is compiled now, once per process.
+
+    Args:
+        snapshot(SettingsSnapshot)
+    Exceptions:
+        exceptions.SchemaSetupFailed: The schema file changed since the
+            snapshot was taken, or failed to compile.
+    """
+    global _SNAPSHOT
+    try:
+        digest = hash_file(snapshot.schema_filename)
+    except OSError as err:
+        raise exceptions.SchemaSetupFailed from err
+    if digest != snapshot.schema_digest:
+        errmsg = (f"The schema '{snapshot.schema_filename}' changed since the "
+                  "settings snapshot was taken.")
+        raise exceptions.SchemaSetupFailed(errmsg)
+    snapshot.schema
+    _SNAPSHOT = snapshot
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""Sources of XML other than files on disk, read by every validation stage.
+
+A stage reads its source through xml_source, open_binary or parse_source,
+hence a file is read from disk and a BytesSource from memory. The stages
+share the buffer of a BytesSource rather than copying it: lxml parses the
+bytes themselves and the encoding check reads the same bytes object.
+
+A FileSource is a file read from disk once, for every stage to share. Large
+files are memory mapped rather than read into a bytes object.
+
+Classes:
+    BytesSource
+    FileSource
+
+Functions:
+    load_file
+    read_stream
+    xml_source
+    open_binary
+    parse_source
+
+Copyright Ian Vermes 2019
+"""
+
+from lxml import etree
+
+import io
+import mmap
+import os
+
+# Files of at least this many bytes are memory mapped by load_file.
+MMAP_THRESHOLD = 16 << 20
+
+
+class BytesSource(object):
+    """XML held in memory, in place of a filename.
+
+    Args:
+        data(bytes, bytearray, memoryview): The XML. A memoryview of a whole
+            bytes object is unwrapped, any other buffer is copied once.
+    Kwargs:
+        name(str, None): Names the source in results, e.g. a queue message id.
+
+    Attrs:
+        data(bytes)
+        name(str)
+    """
+
+    __slots__ = ("data", "name")
+
+    def __init__(self, data, name=None):
+        self.data = _as_bytes(data)
+        self.name = "<bytes>" if name is None else str(name)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return f"<{name} {str(self)!r}>"
+
+    def __reduce__(self):
+        return (self.__class__, (self.data, self.name))
+
+
+def _as_bytes(data):
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, memoryview):
+        owner = data.obj
+        if (isinstance(owner, bytes) and data.contiguous
+                and data.nbytes == len(owner)):
+            return owner
+    elif not isinstance(data, bytearray):
+        raise TypeError(f"Expected bytes, bytearray or memoryview, got "
+                        f"{type(data).__name__}.")
+    return bytes(data)
+
+
+class FileSource(BytesSource):
+    """A file read once, whose buffer is shared by the validation stages.
+
+    Made by load_file. The buffer is a bytes object, or a read-only memory
+    map for large files, which is released by close. A FileSource is also a
+    context manager, closing on exit.
+
+    Args:
+        filename(str, pathlib.Path): Names the source in results.
+        data(bytes, mmap.mmap)
+
+    Methods:
+        close
+    """
+
+    __slots__ = ()
+
+    def __init__(self, filename, data):
+        # The buffer may be a memory map, hence it is not passed to
+        # BytesSource, which would copy it.
+        self.data = data
+        self.name = str(filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        # A memory map cannot be pickled, the file is read again instead.
+        return (load_file, (self.name, ))
+
+    def close(self):
+        """Release the memory map of the file, if it has one."""
+        if isinstance(self.data, mmap.mmap):
+            try:
+                self.data.close()
+            except BufferError:
+                # A parse still holds a view, the map is freed with it.
+                pass
+
+
+def load_file(filename, mmap_threshold=None):
+    """Read a file once, for every validation stage to share.
+
+    Args:
+        filename(str, pathlib.Path)
+    Kwargs:
+        mmap_threshold(int, None): Files of at least this many bytes are
+            memory mapped. Defaults to MMAP_THRESHOLD.
+    Return:
+        FileSource
+    Exceptions:
+        OSError
+    """
+    if mmap_threshold is None:
+        mmap_threshold = MMAP_THRESHOLD
+    with open(filename, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size and size >= mmap_threshold:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = handle.read()
+    return FileSource(filename, data)
+
+
+class _BufferReader(io.RawIOBase):
+    # A binary file over a buffer, e.g. a memory map, without copying it.
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        chunk = self._view[self._position:self._position + len(target)]
+        size = len(chunk)
+        target[:size] = chunk
+        self._position += size
+        return size
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def _open_buffer(data, name=None):
+    # lxml takes the URL of a file object from its name.
+    if isinstance(data, bytes):
+        handle = io.BytesIO(data)
+        raw = handle
+    else:
+        raw = _BufferReader(data)
+        handle = io.BufferedReader(raw)
+    if name is not None:
+        raw.name = name
+    return handle
+
+
+def read_stream(stream, name=None):
+    """Read a binary file-like object into a BytesSource.
+
+    Args:
+        stream: Has a read method returning bytes.
+    Kwargs:
+        name(str, None): Defaults to the name attribute of the stream.
+    Return:
+        BytesSource
+    """
+    if name is None:
+        name = getattr(stream, "name", None)
+    return BytesSource(stream.read(), name=name)
+
+
+def xml_source(filename):
+    """Get the argument for lxml to parse a file or a BytesSource.
+
+    A BytesSource is named by the file object, hence lxml gives its name in
+    errors and resolves relative references against it.
+
+    Args:
+        filename(str, pathlib.Path, BytesSource)
+    Return:
+        str or a binary file object over the buffer
+    """
+    if isinstance(filename, BytesSource):
+        return _open_buffer(filename.data, name=str(filename))
+    return str(filename)
+
+
+def open_binary(filename):
+    """Open a file or a BytesSource for reading bytes.
+
+    Reading the whole of a BytesSource of bytes returns its own bytes object,
+    a memory map is read without copying it whole.
+
+    Args:
+        filename(str, pathlib.Path, BytesSource)
+    Return:
+        A binary file object, to be closed by the caller.
+    """
+    if isinstance(filename, BytesSource):
+        return _open_buffer(filename.data)
+    return open(filename, "rb")
+
+
+def parse_source(filename, parser=None):
+    """Parse a file or a BytesSource, the latter straight from its bytes.
+
+    The name of a BytesSource is the base URL of its tree, as for a file.
+
+    Args:
+        filename(str, pathlib.Path, BytesSource)
+    Kwargs:
+        parser(etree.XMLParser, None)
+    Return:
+        etree._ElementTree
+    Exceptions:
+        etree.XMLSyntaxError
+    """
+    if isinstance(filename, BytesSource):
+        tree = etree.fromstring(filename.data, parser,
+                                base_url=str(filename))
+        return tree.getroottree()
+    return etree.parse(str(filename), parser)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""Watch directories for XML files that are created or modified.
+
+On Linux the kernel reports changes through inotify, hence a change is seen
+at once and nothing is read until it happens. Elsewhere, or if inotify is not
+available, the files are polled for changes to their modification time or
+size. Both watchers select files as helpers.path.iter_files does and report
+them in batches, each gathered over a short settling time, as an editor often
+writes a file more than once on saving.
+
+Classes:
+    InotifyWatcher
+    PollingWatcher
+
+Functions:
+    open_watcher
+
+Copyright Ian Vermes 2019
+"""
+
+from helpers.path import iter_files, is_excluded
+
+import abc
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import pathlib
+import select
+import struct
+import sys
+import time
+
+# inotify event masks, see inotify(7).
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 1 << 16
+
+
+class _Watcher(abc.ABC):
+    # The file selection & batching shared by the watchers, which implement
+    # wait.
+
+    def __init__(self, paths, include=("*.xml", ), exclude=(),
+                 recursive=True, settle=0.1):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.recursive = recursive
+        self.settle = settle
+        self._roots = []
+        self._files = set()
+        for path in paths:
+            path = pathlib.Path(path).absolute()
+            if path.is_dir():
+                self._roots.append(path)
+            else:
+                self._files.add(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            changed = self.wait()
+            if changed:
+                yield changed
+
+    @abc.abstractmethod
+    def wait(self, timeout=None):
+        """Wait for files to be created or modified.
+
+        Kwargs:
+            timeout(float, None): The most seconds to wait, None waits until
+                a file changes.
+        Return:
+            list: pathlib.Path of each changed file, sorted, or an empty list
+                if none changed before the timeout.
+        """
+
+    def close(self):
+        """Stop watching."""
+
+    def _is_wanted(self, path, root):
+        # Files given by name are watched whatever the patterns.
+        if path in self._files:
+            return True
+        elif root is None:
+            return False
+        return (any(fnmatch.fnmatch(path.name, pattern)
+                    for pattern in self.include)
+                and not is_excluded(path, root, self.exclude))
+
+
+class InotifyWatcher(_Watcher):
+    """Watch files through Linux inotify.
+
+    Directories created under a watched directory are watched in turn, and
+    the files already within them are reported.
+
+    Args:
+        paths(iterable): str or pathlib.Path items, files or directories.
+    Kwargs:
+        include(iterable): Glob patterns, see helpers.path.iter_files.
+        exclude(iterable): Glob patterns, see helpers.path.iter_files.
+        recursive(bool): If False only the top level of a directory is
+            watched.
+        settle(float): Seconds of quiet that end a batch of changes.
+
+    Methods:
+        wait
+        close
+
+    Exceptions:
+        OSError: inotify is not available.
+    """
+
+    def __init__(self, paths, include=("*.xml", ), exclude=(),
+                 recursive=True, settle=0.1):
+        super().__init__(paths, include=include, exclude=exclude,
+                         recursive=recursive, settle=settle)
+        self._libc = _get_libc()
+        fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._fd = fd
+        # Watch descriptor to its directory & the root it was found under,
+        # the root is None for the directory of a file given by name.
+        self._watches = {}
+        try:
+            for root in self._roots:
+                self._watch_tree(root, root)
+            for path in self._files:
+                self._watch(path.parent, None)
+        except OSError:
+            self.close()
+            raise
+
+    def wait(self, timeout=None):
+        if self._fd is None:
+            raise ValueError("Wait on a closed watcher.")
+        changed = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        while ready:
+            changed.update(self._read_events(os.read(self._fd, _READ_SIZE)))
+            ready, _, _ = select.select([self._fd], [], [], self.settle)
+        return sorted(path for path in changed if path.is_file())
+
+    def close(self):
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _watch(self, directory, root):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                          _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        # A directory both searched and holding a named file keeps its root.
+        if self._watches.get(wd, (None, None))[1] is None:
+            self._watches[wd] = (directory, root)
+
+    def _watch_tree(self, directory, root):
+        pending = [directory]
+        while pending:
+            directory = pending.pop()
+            try:
+                self._watch(directory, root)
+                entries = list(os.scandir(directory)) if self.recursive else []
+            except (PermissionError, FileNotFoundError):
+                continue
+            for entry in entries:
+                if (entry.is_dir(follow_symlinks=False)
+                        and not is_excluded(entry.path, root, self.exclude)):
+                    pending.append(pathlib.Path(entry.path))
+
+    def _read_events(self, data):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                # Events were dropped, hence report every watched file.
+                yield from self._all_files()
+                continue
+            if wd not in self._watches:
+                continue
+            directory, root = self._watches[wd]
+            if mask & _IN_IGNORED:
+                del self._watches[wd]
+                continue
+            path = directory / name
+            if mask & _IN_ISDIR:
+                if (root is not None and self.recursive
+                        and mask & (_IN_CREATE | _IN_MOVED_TO)
+                        and not is_excluded(path, root, self.exclude)):
+                    self._watch_tree(path, root)
+                    # Files may be written before the watch is added.
+                    yield from (p for p in iter_files(
+                        [path], include=self.include, exclude=self.exclude)
+                        if not is_excluded(p, root, self.exclude))
+            elif (mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO)
+                    and self._is_wanted(path, root)):
+                yield path
+
+    def _all_files(self):
+        yield from self._files
+        yield from iter_files(self._roots, include=self.include,
+                              exclude=self.exclude, recursive=self.recursive)
+
+
+class PollingWatcher(_Watcher):
+    """Watch files by polling their modification times & sizes.
+
+    Args:
+        paths(iterable): str or pathlib.Path items, files or directories.
+    Kwargs:
+        include(iterable): Glob patterns, see helpers.path.iter_files.
+        exclude(iterable): Glob patterns, see helpers.path.iter_files.
+        recursive(bool): If False only the top level of a directory is
+            watched.
+        interval(float): Seconds between polls.
+
+    Methods:
+        wait
+        close
+    """
+
+    def __init__(self, paths, include=("*.xml", ), exclude=(),
+                 recursive=True, interval=1.0):
+        super().__init__(paths, include=include, exclude=exclude,
+                         recursive=recursive, settle=0)
+        self.interval = interval
+        self._stats = self._scan()
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._poll()
+            if changed:
+                return changed
+            if deadline is None:
+                time.sleep(self.interval)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                time.sleep(min(self.interval, remaining))
+
+    def _poll(self):
+        stats = self._scan()
+        changed = sorted(path for path, stat in stats.items()
+                         if self._stats.get(path) != stat)
+        self._stats = stats
+        return changed
+
+    def _scan(self):
+        stats = {}
+        paths = [*self._roots, *(p for p in self._files if p.is_file())]
+        for path in iter_files(paths, include=self.include,
+                               exclude=self.exclude,
+                               recursive=self.recursive):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed since it was found.
+            stats[path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+
+def _get_libc():
+    if not sys.platform.startswith("linux"):
+        raise OSError(f"inotify is not available on {sys.platform}.")
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                       use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError("inotify is not available in the C library.")
+    return libc
+
+
+def open_watcher(paths, include=("*.xml", ), exclude=(), recursive=True,
+                 poll=False):
+    """Get an InotifyWatcher, or a PollingWatcher if inotify is unavailable.
+
+    Args:
+        paths(iterable): str or pathlib.Path items, files or directories.
+    Kwargs:
+        include(iterable): Glob patterns, see helpers.path.iter_files.
+        exclude(iterable): Glob patterns, see helpers.path.iter_files.
+        recursive(bool): If False only the top level of a directory is
+            watched.
+        poll(bool): If True always poll.
+    Return:
+        InotifyWatcher or PollingWatcher
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(paths, include=include, exclude=exclude,
+                                  recursive=recursive)
+        except OSError:
+            pass
+    return PollingWatcher(paths, include=include, exclude=exclude,
+                          recursive=recursive)
@@ -9,61 +9,159 @@ within a file to make said correction.
 Copyright Ian Vermes 2018
 """
 
+from helpers.result import ValidationResult
+from report import result_to_record
+
 import datetime
-from functools import wraps
+import queue
+import threading
+import time
 
 
 class ErrorLogger(object):
     """Digests error stream objects and writes them to a log file.
 
+    The errors are either logged after the fact by listen, or consumed by a
+    background thread while they are produced, between start & stop. The
+    thread gathers lines and writes them in one chunk once flush_size
+    characters are pending or flush_interval seconds have passed.
+
+    A failing ValidationResult is logged as a line giving its filename, the
+    stage it failed, its exception and the message & position of the cause.
+
     args:
         filename(str)
         error_stream(queue.Queue)
+    kwargs:
+        flush_size(int): The most characters held before writing.
+        flush_interval(float): The most seconds an error is held.
+
+    Methods:
+        listen
+        start
+        stop
     """
 
-    def __init__(self, filename, error_stream):
+    _STOP = object()
+
+    def __init__(self, filename, error_stream, flush_size=1 << 16,
+                 flush_interval=1.0):
         self.filename = filename
         self.stream = error_stream
-        self.add_linebreak_packaging = "{}\n"
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._thread = None
 
-    def add_linebreak(func):
-        """A decorator to add linebreaks to string returning functions."""
-        @wraps(func)
-        def magic(*args):
-            packaging = "{}\n"
-            return packaging.format(func(*args))
-        return magic
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
 
     def listen(self):
         """Process the queued exceptions and log them as a headed section."""
+        errors = list(self._drain())
         f = self._touch_file()
         try:
-            f.write(self._generate_header())
-            for i in range(self.stream.qsize()):
-                error = self.stream.get()
-                error_string = self._process_error(error)
-                f.write(error_string)
+            f.write(self._generate_header(len(errors)))
+            f.write("".join(self._process_error(error) for error in errors))
             f.write(self._generate_tail())
         finally:
             f.close()
 
+    def start(self):
+        """Log the errors put on the stream, on a thread, until stop."""
+        if self._thread is not None:
+            raise RuntimeError(f"{self.__class__.__name__} already started.")
+        self._thread = threading.Thread(target=self._consume,
+                                        name="ErrorLogger", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Log the errors already on the stream and end the thread."""
+        if self._thread is None:
+            return
+        self.stream.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _consume(self):
+        count = 0
+        pending = []
+        pending_size = 0
+        flushed_at = time.monotonic()
+        f = self._touch_file()
+        try:
+            f.write(self._generate_header())
+            while True:
+                timeout = flushed_at + self.flush_interval - time.monotonic()
+                try:
+                    error = self.stream.get(timeout=max(timeout, 0))
+                except queue.Empty:
+                    pass
+                else:
+                    if error is self._STOP:
+                        break
+                    line = self._process_error(error)
+                    pending.append(line)
+                    pending_size += len(line)
+                    count += 1
+                if (pending_size >= self.flush_size
+                        or time.monotonic() - flushed_at
+                        >= self.flush_interval):
+                    f.write("".join(pending))
+                    f.flush()
+                    pending.clear()
+                    pending_size = 0
+                    flushed_at = time.monotonic()
+            f.write("".join(pending))
+            f.write(self._generate_tail(count))
+        finally:
+            f.close()
+
+    def _drain(self):
+        # Unlike a loop over qsize, this takes every error put before it ends.
+        while True:
+            try:
+                yield self.stream.get_nowait()
+            except queue.Empty:
+                return
+
     def _touch_file(self):
         f = open(self.filename, mode='a+')
         return f
 
-    @add_linebreak
     def _process_error(self, item):
-        string = str(item)
-        return string
+        if isinstance(item, ValidationResult):
+            item = _describe_result(item)
+        return f"{item}\n"
 
-    @add_linebreak
-    def _generate_header(self):
-        count = self.stream.qsize()
+    def _generate_header(self, count=None):
         timestamp = datetime.datetime.now().ctime()
-        header = f"{timestamp}    Errors: {count}"
-        return header
+        if count is None:
+            return f"{timestamp}\n"
+        return f"{timestamp}    Errors: {count}\n"
+
+    def _generate_tail(self, count=None):
+        if count is None:
+            return "* * *\n"
+        return f"* * *    Errors: {count}\n"
+
 
-    @add_linebreak
-    def _generate_tail(self):
-        tail = "* * *"
-        return tail
+def _describe_result(result):
+    # The validation errors have no message of their own, the cause does.
+    record = result_to_record(result)
+    exc = result.exception
+    cause = None if exc is None else exc.__cause__
+    line = f"{record['filename']}    {record['passing']}"
+    if record["exception"] is not None:
+        line += f"    {record['exception']}"
+        if record["message"]:
+            line += f": {record['message']}"
+    if cause is not None:
+        line += f"    {record['cause']}: {cause}"
+    if record["line"] is not None:
+        line += f" (line {record['line']}, column {record['column']})"
+    # One error a line, whatever the messages hold.
+    return " ".join(line.splitlines())
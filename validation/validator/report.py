@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""This module writes machine readable reports of validation results.
+
+A report is NDJSON (JSON Lines): one JSON object per ValidationResult, written
+as the result is produced. Lines are gathered and written in batches of whole
+lines, hence a report may be tailed & ingested while a long run is underway.
+
+A summary groups the failing files by the signature of their error, hence one
+line stands for every file that failed alike, e.g. after a schema change.
+
+Classes:
+    NDJSONReport
+    ErrorSummary
+
+Functions:
+    result_to_record
+    error_signature
+
+Copyright Ian Vermes 2019
+"""
+
+from helpers.result import cause_position, cause_signature
+import exceptions
+
+import json
+import re
+import time
+
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\d+")
+
+
+def result_to_record(result):
+    """Get the JSON serialisable record of a ValidationResult.
+
+    Args:
+        result(ValidationResult)
+    Return:
+        dict: The filename, the name of its Passing enum, the class & message
+            of its exception, the class of the exception's cause and the line
+            & column that the cause refers to. Absent values are None.
+    """
+    exc = result.exception
+    cause = None if exc is None else exc.__cause__
+    line, column = cause_position(cause)
+    if isinstance(cause, exceptions.DetachedCause):
+        cause_name = cause.name
+    elif cause is not None:
+        cause_name = type(cause).__name__
+    else:
+        cause_name = None
+    record = {"filename": str(result.filename),
+              "passing": result.enum.name,
+              "exception": None if exc is None else type(exc).__name__,
+              "message": None if exc is None else str(exc),
+              "cause": cause_name,
+              "line": line,
+              "column": column}
+    return record
+
+
+class NDJSONReport(object):
+    """Write a record per ValidationResult to a file, one JSON object a line.
+
+    Records are held until flush_lines are pending or flush_interval seconds
+    have passed since the last flush, then written & flushed together. The
+    report is also a context manager, closing the file on exit.
+
+    Args:
+        filename(str, pathlib.Path)
+    Kwargs:
+        flush_lines(int): The most records held before writing.
+        flush_interval(float): The most seconds a record is held.
+        append(bool): Add to an existing report rather than truncate it.
+
+    Methods:
+        write
+        flush
+        close
+    """
+
+    def __init__(self, filename, flush_lines=1000, flush_interval=1.0,
+                 append=False):
+        self.filename = str(filename)
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        mode = "a" if append else "w"
+        self._file = open(self.filename, mode=mode, encoding="utf-8")
+        self._pending = []
+        self._flushed_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, result):
+        """Add the record of a ValidationResult to the report.
+
+        Args:
+            result(ValidationResult)
+        """
+        line = json.dumps(result_to_record(result), ensure_ascii=False)
+        self._pending.append(line + "\n")
+        if (len(self._pending) >= self.flush_lines
+                or time.monotonic() - self._flushed_at >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write the pending records to the file as whole lines."""
+        if self._pending:
+            self._file.write("".join(self._pending))
+            self._pending.clear()
+        self._file.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        """Flush the pending records and close the file."""
+        if self._file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+
+
+def error_signature(result):
+    """Get the signature of the error of a failing ValidationResult.
+
+    Results share a signature when their exceptions are of a class and their
+    causes have the same error code & element path, see cause_signature. A
+    result without a cause is signed by its message, less quoted values and
+    numbers.
+
+    Args:
+        result(ValidationResult)
+    Return:
+        tuple: The exception class name, the code & the path, or None if the
+            result passed.
+    """
+    exc = result.exception
+    if exc is None:
+        return None
+    code, path = cause_signature(exc.__cause__)
+    if code is None:
+        code = _NUMBER.sub("#", _QUOTED.sub("'…'", str(exc))) or None
+    return type(exc).__name__, code, path
+
+
+class ErrorSummary(object):
+    """Group failing ValidationResults by the signature of their error.
+
+    Each group keeps a count, the messages of its first result and the first
+    max_files filenames, hence its size is independent of the files failing.
+
+    Kwargs:
+        max_files(int): The most filenames kept per group.
+
+    Methods:
+        add
+        extend
+        groups
+        write
+    """
+
+    def __init__(self, max_files=20):
+        self.max_files = max_files
+        self._groups = {}
+
+    def __len__(self):
+        return len(self._groups)
+
+    def add(self, result):
+        """Count a result under the signature of its error.
+
+        Args:
+            result(ValidationResult)
+        Return:
+            tuple or None: The signature, None if the result passed.
+        """
+        signature = error_signature(result)
+        if signature is None:
+            return None
+        group = self._groups.get(signature)
+        if group is None:
+            exc = result.exception
+            cause = exc.__cause__
+            group = self._groups[signature] = {
+                "exception": signature[0], "code": signature[1],
+                "path": signature[2], "count": 0,
+                "message": str(exc) or None,
+                "cause_message": None if cause is None else str(cause),
+                "files": []}
+        group["count"] += 1
+        if len(group["files"]) < self.max_files:
+            group["files"].append(str(result.filename))
+        return signature
+
+    def extend(self, results):
+        """Count each of an iterable of ValidationResults, see add."""
+        for result in results:
+            self.add(result)
+
+    def groups(self):
+        """Get the groups, the most common first.
+
+        Return:
+            list: dict with exception, code, path, count, message,
+                cause_message & files (at most max_files) keys.
+        """
+        return sorted(self._groups.values(),
+                      key=lambda group: group["count"], reverse=True)
+
+    def write(self, filename):
+        """Write the groups to a file, one JSON object a line.
+
+        Args:
+            filename(str, pathlib.Path)
+        """
+        with open(filename, mode="w", encoding="utf-8") as handle:
+            for group in self.groups():
+                handle.write(json.dumps(group, ensure_ascii=False) + "\n")
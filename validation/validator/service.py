@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+"""A local HTTP service validating XML bodies on a bounded worker pool.
+
+POST an XML document to /validate, optionally naming it by a name query
+parameter, and the reply is the JSON record of its ValidationResult, see
+report.result_to_record. GET /health reports the requests in flight.
+
+The documents are validated by a pool of worker processes, each compiling the
+schema once from a snapshot of the settings, see helpers.settings_handler. At
+most workers + queue_size documents are admitted at a time; beyond that a
+request is refused at once with 503 & a Retry-After header, rather than queued
+without limit, hence the latency of admitted requests stays predictable. A
+document whose validation fails in its worker gets 500, and a pool broken by a
+worker that died is replaced by a new one.
+
+Classes:
+    ValidationService
+
+Functions:
+    main
+
+Copyright Ian Vermes 2019
+"""
+
+from checker import Checker
+from core import CORE_SETTINGS_FILENAME
+from report import result_to_record
+from helpers.enum import Mode
+from helpers.path import expandpath
+from helpers.settings_handler import (Settings, SettingsSnapshot,
+                                      install_snapshot)
+
+import argparse
+import concurrent.futures
+import concurrent.futures.process
+import http.server
+import json
+import multiprocessing
+import sys
+import threading
+import urllib.parse
+
+# The Checker of a worker process, set once by _init_worker.
+_WORKER_CHECKER = None
+
+
+class ValidationService(object):
+    """Validate XML posted over HTTP, with a bounded number in flight.
+
+    Kwargs:
+        host(str): Address to listen on, localhost by default.
+        port(int): Port to listen on, 0 picks a free port.
+        workers(int): Number of worker processes.
+        queue_size(int): Documents admitted beyond those being validated.
+        testmode(bool): Use the Mode.TEST settings.
+        stream(bool): Validate without holding whole documents in memory.
+        max_body(int): The largest document accepted, in bytes.
+        timeout(float): The most seconds a request waits on its verdict.
+
+    Methods:
+        start
+        serve_forever
+        shutdown
+        submit
+
+    Attrs:
+        server_address
+        in_flight
+        capacity
+    """
+
+    def __init__(self, host="127.0.0.1", port=8000, workers=2, queue_size=8,
+                 testmode=False, stream=False, max_body=64 << 20,
+                 timeout=30.0):
+        if workers < 1 or queue_size < 0:
+            raise ValueError(f"Expected a positive number of workers and a "
+                             f"queue size of at least 0, got {workers} & "
+                             f"{queue_size}.")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.mode = Mode.TEST if testmode else Mode.LIVE
+        self.stream = stream
+        self.max_body = max_body
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._snapshot = None
+        self._pool = None
+        self._server = None
+
+    @property
+    def server_address(self):
+        """The (host, port) listened on, once started."""
+        return None if self._server is None else self._server.server_address
+
+    @property
+    def in_flight(self):
+        """The number of documents admitted and not yet validated."""
+        return self._in_flight
+
+    def start(self):
+        """Compile the schema in every worker and bind the server.
+
+        Return:
+            tuple: The (host, port) listened on.
+        Exceptions:
+            exceptions.SchemaSetupFailed
+        """
+        self._snapshot = self._setup()
+        self._pool = self._make_pool()
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.service = self
+        return self.server_address
+
+    def serve_forever(self):
+        """Serve requests until shutdown, starting first if need be."""
+        if self._server is None:
+            self.start()
+        self._server.serve_forever()
+
+    def shutdown(self):
+        """Stop serving and stop the workers."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def submit(self, data, name=None):
+        """Admit a document for validation, unless the service is full.
+
+        Args:
+            data(bytes)
+        Kwargs:
+            name(str, None): The filename of the result.
+        Return:
+            concurrent.futures.Future or None: The future ValidationResult,
+                None if workers + queue_size documents are already admitted.
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._in_flight += 1
+        try:
+            pool = self._pool
+            try:
+                future = pool.submit(_validate, data, name)
+            except concurrent.futures.process.BrokenProcessPool:
+                future = self._restart_pool(pool).submit(_validate, data, name)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _restart_pool(self, broken):
+        # Replace a pool broken by a worker that died, once however many
+        # requests find it broken.
+        with self._pool_lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._make_pool()
+            return self._pool
+
+    def _make_pool(self):
+        # Workers are spawned, as forking a process running threads is unsafe.
+        context = multiprocessing.get_context("spawn")
+        pool = concurrent.futures.ProcessPoolExecutor(
+            self.workers, mp_context=context, initializer=_init_worker,
+            initargs=(self._snapshot, self.stream))
+        # Start every worker now rather than on the first requests.
+        for future in [pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        return pool
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _setup(self):
+        ini_file = expandpath(CORE_SETTINGS_FILENAME, exists=True)
+        settings = Settings(ini_file, mode=self.mode)
+        return SettingsSnapshot.from_settings(settings)
+
+
+class _Server(http.server.ThreadingHTTPServer):
+
+    daemon_threads = True
+    # The default backlog of 5 drops connections in a burst, which clients
+    # retry a second later; refusing with 503 is left to the service.
+    request_queue_size = 128
+    service = None
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path != "/health":
+            self._reply(404, {"error": "Not found."})
+            return
+        service = self.server.service
+        self._reply(200, {"status": "ok", "in_flight": service.in_flight,
+                          "capacity": service.capacity})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        service = self.server.service
+        length = self.headers.get("Content-Length")
+        # A body left unread cannot be followed by another request.
+        if url.path != "/validate":
+            self.close_connection = True
+            self._reply(404, {"error": "Not found."})
+            return
+        if length is None or not length.isdigit():
+            self.close_connection = True
+            self._reply(411, {"error": "A Content-Length is required."})
+            return
+        length = int(length)
+        if length > service.max_body:
+            self.close_connection = True
+            self._reply(413, {"error": f"The body exceeds "
+                                       f"{service.max_body} bytes."})
+            return
+        data = self.rfile.read(length)
+        name = urllib.parse.parse_qs(url.query).get("name", [None])[0]
+        future = service.submit(data, name=name)
+        if future is None:
+            self._reply(503, {"error": "The service is at capacity."},
+                        headers={"Retry-After": "1"})
+            return
+        try:
+            result = future.result(timeout=service.timeout)
+        except concurrent.futures.TimeoutError:
+            self._reply(504, {"error": "Validation timed out."})
+        except Exception as err:
+            # A broken pool is replaced by the next submit.
+            self._reply(500, {"error": f"Validation failed: "
+                                       f"{type(err).__name__}: {err}"})
+        else:
+            self._reply(200, result_to_record(result))
+
+    def _reply(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Requests are not logged, upstream systems log their own.
+        pass
+
+
+def _init_worker(snapshot, stream):
+    global _WORKER_CHECKER
+    if snapshot is not None:
+        install_snapshot(snapshot)
+    _WORKER_CHECKER = Checker(stream=stream)
+
+
+def _ping():
+    return True
+
+
+def _validate(data, name):
+    return _WORKER_CHECKER.validate_bytes(data, name=name)
+
+
+def main(argv=None):
+    """Run the validation service until it is interrupted."""
+    description = "Validate XML posted over HTTP to /validate."
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", dest="host", default="127.0.0.1",
+                        help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", dest="port", default=8000, type=int,
+                        help="Port to listen on (default: 8000)")
+    parser.add_argument("-w", "--workers", dest="workers", metavar="N",
+                        default=2, type=int,
+                        help="Validate with N worker processes (default: 2)")
+    parser.add_argument("--queue", dest="queue_size", metavar="N", default=8,
+                        type=int,
+                        help=("Admit N documents beyond those being "
+                              "validated, refusing more with 503 "
+                              "(default: 8)"))
+    parser.add_argument("-t", "--test", dest="testmode", action="store_true",
+                        help="If provided run in testmode")
+    parser.add_argument("--stream", dest="stream", action="store_true",
+                        help=("Validate without holding whole documents in "
+                              "memory, for very large files"))
+    args = parser.parse_args(argv)
+    service = ValidationService(host=args.host, port=args.port,
+                                workers=args.workers,
+                                queue_size=args.queue_size,
+                                testmode=args.testmode, stream=args.stream)
+    host, port = service.start()
+    print(f"Validating on http://{host}:{port}/validate")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())